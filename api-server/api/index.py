@@ -1,12 +1,14 @@
 import json
+from collections import defaultdict, deque
 from flask import Flask, Request, Response, jsonify, request, make_response
 import dotenv
-from modules import db, llm, emb, instruments
+from modules import cost_ledger, db, llm, emb, instruments, model_router, schema_index
+from modules import sql_generation
 from modules.turbo4 import Turbo4
 
 import os
 
-from modules.models import TurboTool
+from modules.models import MAX_ROUTE_LATENCIES, TurboTool
 from psycopg2 import Error as PostgresError
 
 app = Flask(__name__)
@@ -24,6 +26,23 @@ assert os.environ.get(
 DB_URL = os.environ.get("DATABASE_URL")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
+# prebuilt by the index_schema script, loaded once per process
+PRELOADED_TABLE_DEFS = schema_index.load_table_definitions(
+    os.environ.get("SCHEMA_INDEX_DIR")
+)
+
+# model per pipeline step, with per-route stats served on /routes
+ROUTER = model_router.router_from_env()
+
+# one round trip by default - tool_call or code_block, two_step is the old flow
+SQL_GENERATION_PATH = os.environ.get(
+    "SQL_GENERATION_PATH", sql_generation.PATH_TOOL_CALL
+)
+
+# path -> end to end SQL generation latencies of its recent calls, served on /routes
+map_sql_path_to_latencies_ms = defaultdict(lambda: deque(maxlen=MAX_ROUTE_LATENCIES))
+map_sql_path_to_calls = defaultdict(int)
+
 # ---------------- Cors Helper ----------------
 
 
@@ -31,7 +50,7 @@ def make_cors_response():
     # Set CORS headers for the preflight request
     response = make_response()
     response.headers.add("Access-Control-Allow-Origin", "*")
-    response.headers.add("Access-Control-Allow-Headers", "Content-Type,Authorization")
+    response.headers.add("Access-Control-Allow-Headers", "Content-Type,Authorization,X-Tenant-Id")
     response.headers.add("Access-Control-Allow-Methods", "GET,PUT,POST,DELETE,OPTIONS")
     return response
 
@@ -78,7 +97,9 @@ def self_correcting_assistant(
 
     assistant_name = "SQL Self Correction"
 
-    turbo4_assistant = Turbo4().get_or_create_assistant(assistant_name)
+    turbo4_assistant = Turbo4().get_or_create_assistant(
+        assistant_name, model=ROUTER.model_for(model_router.ROUTE_SELF_CORRECTION)
+    )
 
     print(f"Generated Assistant: {assistant_name}")
 
@@ -126,19 +147,29 @@ def prompt():
     if request.method == "OPTIONS":
         return response
 
+    # usage of every OpenAI call below is attributed to the caller's tenant
+    tenant = request.headers.get("X-Tenant-Id")
+
+    # per request override, to compare the paths on live traffic
+    sql_path = request.json.get("sql_path", SQL_GENERATION_PATH)
+    if sql_path not in sql_generation.PATHS:
+        response.status_code = 400
+        response.data = f"Unknown sql_path: {sql_path}. Use one of {sql_generation.PATHS}"
+        return response
+
     # Get access to db, state, and functions
     with instruments.PostgresAgentInstruments(DB_URL, "prompt-endpoint") as (
         agent_instruments,
         db,
-    ):
+    ), cost_ledger.scope(team="prompt-endpoint", tenant=tenant):
         # ---------------- Build Prompt ----------------
 
         base_prompt = request.json["prompt"]
 
         # simple word match for now - dropped embeddings for deployment size
-        similar_tables = emb.DatabaseEmbedder(db).get_similar_table_defs_for_prompt(
-            base_prompt
-        )
+        similar_tables = emb.DatabaseEmbedder(
+            db, PRELOADED_TABLE_DEFS
+        ).get_similar_table_defs_for_prompt(base_prompt)
 
         if len(similar_tables) == 0:
             print(f"No similar tables found for prompt: {base_prompt}")
@@ -158,33 +189,44 @@ def prompt():
             similar_tables,
         )
 
-        # ---------------- Run 2 Agent Team - Generate SQL & Results ----------------
+        # ---------------- Generate SQL & Results - one round trip unless the response can't be parsed ----------------
 
         tools = [
             TurboTool("run_sql", llm.run_sql_tool_config, agent_instruments.run_sql),
         ]
 
-        sql_response = llm.prompt(
-            prompt,
-            model="gpt-4-1106-preview",
-            instructions="You're an elite SQL developer. You generate the most concise and performant SQL queries.",
-        )
+        sql_model = ROUTER.model_for(model_router.ROUTE_SQL_GENERATION)
         try:
-            llm.prompt_func(
-                "Use the run_sql function to run the SQL you've just generated: "
-                + sql_response,
-                model="gpt-4-1106-preview",
-                instructions="You're an elite SQL developer. You generate the most concise and performant SQL queries.",
-                turbo_tools=tools,
+            with ROUTER.track(model_router.ROUTE_SQL_GENERATION, sql_model) as sql_attempt:
+                sql_result = sql_generation.generate_and_run_sql(
+                    prompt,
+                    tools[0],
+                    path=sql_path,
+                    model=sql_model,
+                    # echoing the SQL into a tool call is a simple step - a fast model does it
+                    tool_model=ROUTER.model_for(model_router.ROUTE_TOOL_DISPATCH),
+                )
+                sql_attempt.succeeded, _ = agent_instruments.validate_run_sql()
+
+            path_key = sql_result.path + ("_fallback" if sql_result.fell_back else "")
+            map_sql_path_to_latencies_ms[path_key].append(sql_result.latency_ms)
+            map_sql_path_to_calls[path_key] += 1
+            print(
+                f"⚡ SQL via {path_key}: {sql_result.round_trips} round trips, {sql_result.latency_ms:.0f}ms"
             )
-            agent_instruments.validate_run_sql()
         except PostgresError as e:
             print(
                 f"Received PostgresError -> Running Self Correction Team To Resolve: {e}"
             )
 
             # ---------------- Run Self Correction Team - Diagnosis, Generate New SQL, Retry ----------------
-            self_correcting_assistant(db, agent_instruments, tools, e)
+            # escalation - the self correction route runs on the strongest tier
+            with ROUTER.track(
+                model_router.ROUTE_SELF_CORRECTION,
+                ROUTER.model_for(model_router.ROUTE_SELF_CORRECTION),
+            ) as correction_attempt:
+                self_correcting_assistant(db, agent_instruments, tools, e)
+                correction_attempt.succeeded, _ = agent_instruments.validate_run_sql()
 
             print(f"Self Correction Team Complete.")
 
@@ -201,11 +243,34 @@ def prompt():
 
         print("response_obj", response_obj)
 
+        if tenant:
+            tenant_usage = llm.usage_ledger.map_tenant_to_totals[tenant]
+            print(f"💰 Tenant {tenant} cost: {tenant_usage.cost:.4f}, tokens: {tenant_usage.tokens}")
+
         response.data = json.dumps(response_obj)
 
         return response
 
 
+@app.route("/routes", methods=["GET"])
+def routes():
+    """
+    Latency, cost and success stats per pipeline step, for tuning the model routes,
+    and p50/p95 latency of each SQL generation path.
+    """
+    response = make_cors_response()
+    sql_paths = {
+        path: {
+            "calls": map_sql_path_to_calls[path],
+            "p50_ms": round(model_router.percentile(latencies_ms, 50), 1),
+            "p95_ms": round(model_router.percentile(latencies_ms, 95), 1),
+        }
+        for path, latencies_ms in map_sql_path_to_latencies_ms.items()
+    }
+    response.data = json.dumps({"routes": ROUTER.stats(), "sql_paths": sql_paths})
+    return response
+
+
 if __name__ == "__main__":
     port = 3000
     print(f"Starting server on port {port}")
@@ -1,5 +1,6 @@
 from datetime import datetime
 import json
+from typing import Dict
 import psycopg2
 from psycopg2.sql import SQL, Identifier
 
@@ -82,11 +83,21 @@ class PostgresManager:
 
     def get_all_table_names(self):
         """
-        Get all table names in the database
+        Get all table names in the database, partitions and inheritance children left out
+        """
+        get_all_tables_stmt = """
+        SELECT tablename
+        FROM pg_tables
+        WHERE schemaname = 'public'
+            AND NOT EXISTS (
+                SELECT 1
+                FROM pg_inherits
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                JOIN pg_namespace ns ON ns.oid = child.relnamespace
+                WHERE child.relname = pg_tables.tablename
+                    AND ns.nspname = 'public'
+            );
         """
-        get_all_tables_stmt = (
-            "SELECT tablename FROM pg_tables WHERE schemaname = 'public';"
-        )
         self.cur.execute(get_all_tables_stmt)
         return [row[0] for row in self.cur.fetchall()]
 
@@ -110,47 +121,80 @@ class PostgresManager:
             definitions[table_name] = self.get_table_definition(table_name)
         return definitions
 
+    def get_partition_roots(self) -> Dict[str, str]:
+        """
+        Top level parent of every partition / inheritance child.
+
+        {'events_2023_01': 'events', 'events_2023_01_eu': 'events'}
+        """
+        self.cur.execute(
+            """
+            SELECT parent.relname, child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+            WHERE ns.nspname = 'public'
+                AND parent.relkind IN ('r', 'p');
+            """
+        )
+        map_child_to_parent = {child: parent for parent, child in self.cur.fetchall()}
+
+        map_child_to_root = {}
+        for child in map_child_to_parent:
+            root = child
+            while root in map_child_to_parent:
+                root = map_child_to_parent[root]
+            map_child_to_root[child] = root
+        return map_child_to_root
+
     def get_related_tables(self, table_list, n=2):
         """
         Get tables that have foreign keys referencing the given table
+        Partitions and inheritance children are replaced by their top level parent.
         """
 
+        map_child_to_root = self.get_partition_roots()
+
+        def top_n(table_names):
+            # children map onto their parent before the limit, so they can't push it out
+            roots = {map_child_to_root.get(name, name) for name in table_names}
+            return sorted(roots)[:n]
+
         related_tables_dict = {}
 
         for table in table_list:
             # Query to fetch tables that have foreign keys referencing the given table
             self.cur.execute(
                 """
-                SELECT 
+                SELECT DISTINCT
                     a.relname AS table_name
                 FROM 
                     pg_constraint con 
                     JOIN pg_class a ON a.oid = con.conrelid 
                 WHERE 
-                    confrelid = (SELECT oid FROM pg_class WHERE relname = %s)
-                LIMIT %s;
+                    confrelid = (SELECT oid FROM pg_class WHERE relname = %s);
                 """,
-                (table, n),
+                (table,),
             )
 
-            related_tables = [row[0] for row in self.cur.fetchall()]
+            related_tables = top_n(row[0] for row in self.cur.fetchall())
 
             # Query to fetch tables that the given table references
             self.cur.execute(
                 """
-                SELECT 
+                SELECT DISTINCT
                     a.relname AS referenced_table_name
                 FROM 
                     pg_constraint con 
                     JOIN pg_class a ON a.oid = con.confrelid 
                 WHERE 
-                    conrelid = (SELECT oid FROM pg_class WHERE relname = %s)
-                LIMIT %s;
+                    conrelid = (SELECT oid FROM pg_class WHERE relname = %s);
                 """,
-                (table, n),
+                (table,),
             )
 
-            related_tables += [row[0] for row in self.cur.fetchall()]
+            related_tables += top_n(row[0] for row in self.cur.fetchall())
 
             related_tables_dict[table] = related_tables
 
@@ -159,7 +203,8 @@ class PostgresManager:
         for table, related_tables in related_tables_dict.items():
             related_tables_list += related_tables
 
-        related_tables_list = list(set(related_tables_list))
+        # sorted so the same tables always come back in the same order
+        related_tables_list = sorted(set(related_tables_list))
 
         return related_tables_list
 
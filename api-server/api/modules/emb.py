@@ -1,4 +1,5 @@
 from modules.db import PostgresManager
+from modules.word_match import TableNameMatcher
 
 
 class DatabaseEmbedder:
@@ -7,13 +8,20 @@ class DatabaseEmbedder:
     computing similarity between user queries and table definitions.
     """
 
-    def __init__(self, db: PostgresManager):
+    def __init__(self, db: PostgresManager, map_table_name_to_table_def: dict = None):
         self.map_name_to_embeddings = {}
         self.map_name_to_table_def = {}
+        # compiled lazily from the table names, reset whenever a new table is added
+        self.word_matcher = None
+        # table definitions from a prebuilt schema index - skips the per request crawl
+        self.preloaded_table_defs = map_table_name_to_table_def
         self.db = db
 
     def get_similar_table_defs_for_prompt(self, prompt: str, n_similar=5, n_foreign=0):
-        map_table_name_to_table_def = self.db.get_table_definition_map_for_embeddings()
+        map_table_name_to_table_def = (
+            self.preloaded_table_defs
+            or self.db.get_table_definition_map_for_embeddings()
+        )
         for name, table_def in map_table_name_to_table_def.items():
             self.add_table(name, table_def)
 
@@ -22,7 +30,7 @@ class DatabaseEmbedder:
         table_definitions = self.get_table_definitions_from_names(similar_tables)
 
         if n_foreign > 0:
-            foreign_table_names = self.db.get_foreign_tables(similar_tables, n=3)
+            foreign_table_names = self.db.get_related_tables(similar_tables, n=3)
 
             table_definitions = self.get_table_definitions_from_names(
                 foreign_table_names + similar_tables
@@ -35,6 +43,9 @@ class DatabaseEmbedder:
         Add a table to the database embedder.
         Map the table name to its embedding and text representation.
         """
+        if table_name not in self.map_name_to_table_def:
+            self.word_matcher = None
+
         self.map_name_to_embeddings[table_name] = self.compute_embeddings(
             text_representation
         )
@@ -64,14 +75,10 @@ class DatabaseEmbedder:
         """
         if any word in our query is a table name, add the table to a list
         """
+        if self.word_matcher is None:
+            self.word_matcher = TableNameMatcher(self.map_name_to_table_def.keys())
 
-        tables = []
-
-        for table_name in self.map_name_to_table_def.keys():
-            if table_name.lower() in query.lower():
-                tables.append(table_name)
-
-        return tables
+        return self.word_matcher.match(query)
 
     def get_similar_tables(self, query: str, n=3):
         """
@@ -5,22 +5,41 @@ Purpose:
 """
 
 import json
+import re
 import sys
 from dotenv import load_dotenv
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 import openai
 
 from modules.models import TurboTool
+from modules import cost_ledger, llm_cache, openai_replay, rate_limit
 
 # load .env file
 load_dotenv()
 
-assert os.environ.get("OPENAI_API_KEY")
+# serve recorded API sessions from a cassette (or record them), see openai_replay.
+# started before the api key is read - replay runs without one
+replay_server = openai_replay.server_from_env()
 
 # get openai api key
 openai.api_key = os.environ.get("OPENAI_API_KEY")
 
+# persistent response cache, enabled by setting LLM_CACHE_PATH
+response_cache = llm_cache.cache_from_env()
+
+# rpm / tpm budgets and retries shared by every OpenAI call, see rate_limit
+request_scheduler = rate_limit.scheduler_from_env()
+
+# usage and cost of every API call, see cost_ledger
+usage_ledger = cost_ledger.ledger_from_env()
+
+# the scheduler retries, so the client must not retry on its own as well
+openai.max_retries = 0
+
+# completion tokens reserved for a request until its actual usage is known
+COMPLETION_TOKEN_ALLOWANCE = 500
+
 
 run_sql_tool_config = {
     "type": "function",
@@ -65,6 +84,48 @@ def response_parser(response: Dict[str, Any]):
     return safe_get(response, "choices.0.message.content")
 
 
+def create_chat_completion(use_cache: bool = True, **request) -> Dict[str, Any]:
+    """
+    openai.chat.completions.create, returned as a dict and served from the
+    response cache when an identical request was answered before.
+    """
+    if response_cache is None or not use_cache:
+        return send_chat_completion(request)
+
+    key = llm_cache.make_cache_key(request)
+    response = response_cache.get(key)
+    if response is None:
+        response = send_chat_completion(request)
+        response_cache.put(key, request["model"], response)
+    return response
+
+
+def send_chat_completion(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    openai.chat.completions.create through the rate limit scheduler, usage recorded in the ledger.
+    """
+    response = request_scheduler.submit(
+        lambda: openai.chat.completions.create(**request).model_dump(),
+        estimated_tokens=estimate_request_tokens(request),
+    )
+    usage_ledger.record_response(response)
+    return response
+
+
+def extract_code_block(text: str, language: str = "sql") -> Optional[str]:
+    """
+    Pull the first fenced code block out of a model response.
+    "Here you go:\n```sql\nSELECT 1;\n```" -> "SELECT 1;"
+    Returns None when the response has no fenced block.
+    """
+    if not text:
+        return None
+    match = re.search(rf"```(?:{language})?[ \t]*\n(.*?)```", text, re.DOTALL | re.IGNORECASE)
+    if not match:
+        return None
+    return match.group(1).strip() or None
+
+
 # ------------------ content generators ------------------
 
 
@@ -72,9 +133,11 @@ def prompt(
     prompt: str,
     model: str = "gpt-4-1106-preview",
     instructions: str = "You are a helpful assistant.",
+    use_cache: bool = True,
 ) -> str:
     """
     Generate a response from a prompt using the OpenAI API.
+    use_cache=False always calls the API, see create_chat_completion.
     """
 
     if not openai.api_key:
@@ -86,7 +149,8 @@ Example bash command:
             """
         )
 
-    response = openai.chat.completions.create(
+    response = create_chat_completion(
+        use_cache=use_cache,
         model=model,
         messages=[
             {
@@ -100,7 +164,7 @@ Example bash command:
         ],
     )
 
-    return response_parser(response.model_dump())
+    return response_parser(response)
 
 
 def prompt_func(
@@ -108,10 +172,12 @@ def prompt_func(
     turbo_tools: List[TurboTool],
     model: str = "gpt-4-1106-preview",
     instructions: str = "You are a helpful assistant.",
+    use_cache: bool = True,
 ) -> str:
     """
     Generate a response from a prompt using the OpenAI API.
     Force function calls to the provided turbo tools.
+    A cached response replays the tool calls - the tools still run every time.
 
     :param prompt: The prompt to send to the model.
     :param turbo_tools: List of TurboTool objects each containing the tool's name, configuration, and function.
@@ -131,12 +197,16 @@ def prompt_func(
     messages.insert(
         0, {"role": "system", "content": instructions}
     )  # Insert instructions as the first system message
-    response = openai.chat.completions.create(
-        model=model, messages=messages, tools=tools, tool_choice=tool_choice
+    response = create_chat_completion(
+        use_cache=use_cache,
+        model=model,
+        messages=messages,
+        tools=tools,
+        tool_choice=tool_choice,
     )
 
-    response_message = response.choices[0].message
-    tool_calls = response_message.tool_calls
+    response_message = safe_get(response, "choices.0.message")
+    tool_calls = response_message.get("tool_calls")
 
     func_responses = []
 
@@ -145,15 +215,15 @@ def prompt_func(
 
         for tool_call in tool_calls:
             for turbo_tool in turbo_tools:
-                if tool_call.function.name == turbo_tool.name:
+                if tool_call["function"]["name"] == turbo_tool.name:
                     function_response = turbo_tool.function(
-                        **json.loads(tool_call.function.arguments)
+                        **json.loads(tool_call["function"]["arguments"])
                     )
 
                     func_responses.append(function_response)
 
                     message_to_append = {
-                        "tool_call_id": tool_call.id,
+                        "tool_call_id": tool_call["id"],
                         "role": "tool",
                         "name": turbo_tool.name,
                         "content": function_response,
@@ -168,9 +238,11 @@ def prompt_json_response(
     prompt: str,
     model: str = "gpt-4-1106-preview",
     instructions: str = "You are a helpful assistant.",
+    use_cache: bool = True,
 ) -> str:
     """
     Generate a response from a prompt using the OpenAI API.
+    use_cache=False always calls the API, see create_chat_completion.
 
     Example:
         res = llm.prompt_json_response(
@@ -189,7 +261,8 @@ Example bash command:
             """
         )
 
-    response = openai.chat.completions.create(
+    response = create_chat_completion(
+        use_cache=use_cache,
         model=model,
         messages=[
             {
@@ -204,7 +277,7 @@ Example bash command:
         response_format={"type": "json_object"},
     )
 
-    return response_parser(response.model_dump())
+    return response_parser(response)
 
 
 def add_cap_ref(
@@ -232,6 +305,25 @@ def count_tokens(text: str):
     return len(text) * 1.3
 
 
+def count_request_tokens(request: Dict[str, Any]) -> int:
+    """
+    Prompt tokens of a chat completion request - message contents plus tool definitions.
+    """
+    text = "".join(str(message.get("content") or "") for message in request["messages"])
+    if request.get("tools"):
+        text += json.dumps(request["tools"])
+    return int(count_tokens(text))
+
+
+def estimate_request_tokens(request: Dict[str, Any]) -> int:
+    """
+    Tokens a request is charged against the tpm budget before it's sent.
+    """
+    return count_request_tokens(request) + request.get(
+        "max_tokens", COMPLETION_TOKEN_ALLOWANCE
+    )
+
+
 map_model_to_cost_per_1k_tokens = {
     "gpt-4": 0.075,  # ($0.03 Input Tokens + $0.06 Output Tokens) / 2
     "gpt-4-1106-preview": 0.02,  # ($0.01 Input Tokens + $0.03 Output Tokens) / 2
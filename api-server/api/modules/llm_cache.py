@@ -0,0 +1,180 @@
+"""
+Clone of da_ai_agent/modules/llm_cache.py
+
+Purpose:
+    Persistent cache of OpenAI chat completion responses in a SQLite file.
+    Keyed on a canonical hash of model, messages, tools, tool_choice and
+    response_format. Entries expire after a TTL, and least recently used
+    entries are evicted past a size cap.
+
+    Shared by da_ai_agent/modules/llm.py and the api server's llm.py - both
+    write the same format, so they can point at the same file.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def make_cache_key(request: Dict[str, Any]) -> str:
+    """
+    sha256 of the request with sorted keys and no whitespace, so equal requests
+    hash equally regardless of dict ordering. None values are dropped.
+    """
+    canonical = json.dumps(
+        {key: value for key, value in request.items() if value is not None},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite backed LRU cache with a TTL.
+    Safe to share between threads, and between processes through the file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_responses_last_access ON llm_responses (last_access)"
+            )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self.conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE llm_responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+        self.hits += 1
+        return json.loads(response)
+
+    def put(self, key: str, model: str, response: Dict[str, Any]):
+        serialized = json.dumps(response, default=str)
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_responses (key, model, response, size, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (key, model, serialized, len(serialized), now, now),
+            )
+            self.evict()
+
+    def evict(self):
+        """
+        Drop expired entries, then least recently used ones until under both caps.
+        Called with the lock held.
+        """
+        self.conn.execute(
+            "DELETE FROM llm_responses WHERE created_at < ?",
+            (time.time() - self.ttl_seconds,),
+        )
+        n_entries, n_bytes = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+        ).fetchone()
+
+        while n_entries > self.max_entries or n_bytes > self.max_bytes:
+            key, size = self.conn.execute(
+                "SELECT key, size FROM llm_responses ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            self.conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            n_entries -= 1
+            n_bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM llm_responses")
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            n_entries, n_bytes = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+            ).fetchone()
+        return {
+            "entries": n_entries,
+            "bytes": n_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+def cache_from_env() -> Optional[ResponseCache]:
+    """
+    ResponseCache configured from LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES and LLM_CACHE_MAX_MB. None when LLM_CACHE_PATH is unset.
+    """
+    path = os.environ.get("LLM_CACHE_PATH")
+    if not path:
+        return None
+    return ResponseCache(
+        path,
+        ttl_seconds=float(os.environ.get("LLM_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+        max_bytes=int(float(os.environ.get("LLM_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 1024 / 1024)) * 1024 * 1024),
+    )
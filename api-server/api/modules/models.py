@@ -1,6 +1,7 @@
+from collections import deque
 from dataclasses import dataclass, field
 import time
-from typing import Callable
+from typing import Callable, Deque, Dict, List, Optional
 
 
 @dataclass
@@ -16,3 +17,80 @@ class Chat:
     to_name: str
     message: str
     created: int = field(default_factory=time.time)
+
+
+@dataclass
+class UsageRecord:
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+    team: Optional[str] = None
+    session_id: Optional[str] = None
+    tenant: Optional[str] = None
+    # pipeline step, see model_router
+    route: Optional[str] = None
+    created: float = field(default_factory=time.time)
+
+
+@dataclass
+class UsageTotals:
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, record: UsageRecord):
+        self.calls += 1
+        self.prompt_tokens += record.prompt_tokens
+        self.completion_tokens += record.completion_tokens
+        self.cost += record.cost
+
+
+@dataclass
+class RouteAttempt:
+    route: str
+    model: str
+    # 0 for the route's own tier, n after n escalations
+    escalation: int
+    succeeded: bool = False
+    latency_ms: float = 0.0
+    cost: float = 0.0
+
+
+# p50/p95 are reported over the most recent attempts of a route
+MAX_ROUTE_LATENCIES = 1000
+
+
+@dataclass
+class RouteStats:
+    calls: int = 0
+    successes: int = 0
+    escalations: int = 0
+    cost: float = 0.0
+    latencies_ms: Deque[float] = field(
+        default_factory=lambda: deque(maxlen=MAX_ROUTE_LATENCIES)
+    )
+    map_model_to_calls: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, attempt: RouteAttempt):
+        self.calls += 1
+        self.successes += int(attempt.succeeded)
+        self.escalations += int(attempt.escalation > 0)
+        self.cost += attempt.cost
+        self.latencies_ms.append(attempt.latency_ms)
+        self.map_model_to_calls[attempt.model] = self.map_model_to_calls.get(attempt.model, 0) + 1
+
+
+@dataclass
+class SQLGenerationResult:
+    # path that produced the SQL run: tool_call, code_block or two_step
+    path: str
+    round_trips: int
+    latency_ms: float
+    # the fast path failed to parse and the two step flow took over
+    fell_back: bool = False
@@ -0,0 +1,49 @@
+"""
+Clone of da_ai_agent/modules/schema_index.py
+
+Purpose:
+    Load the table definitions of a prebuilt schema index (see index_schema).
+    The api server only uses word matching, so vectors are not loaded and
+    numpy is not needed.
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+ARTIFACT_FORMAT_VERSION = 1
+LATEST_FILE = "LATEST"
+
+DATABASE_POSTGRES = "postgres"
+
+
+def load_table_definitions(index_dir: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    Table definitions from the latest Postgres artifact in index_dir,
+    or None when there is no usable artifact.
+    """
+    if not index_dir:
+        return None
+
+    latest_path = os.path.join(index_dir, LATEST_FILE)
+    if not os.path.exists(latest_path):
+        print(f"⚠️ No schema index found in {index_dir}")
+        return None
+
+    with open(latest_path) as f:
+        version_dir = os.path.join(index_dir, f.read().strip())
+
+    with open(os.path.join(version_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    if (
+        manifest["format_version"] != ARTIFACT_FORMAT_VERSION
+        or manifest["database"] != DATABASE_POSTGRES
+    ):
+        print(f"⚠️ Schema index {version_dir} is not a v{ARTIFACT_FORMAT_VERSION} postgres index - ignoring")
+        return None
+
+    with open(os.path.join(version_dir, "tables.json")) as f:
+        map_table_name_to_table_def = json.load(f)["table_defs"]
+
+    print(f"📂 Loaded schema index {os.path.basename(version_dir)}: {len(map_table_name_to_table_def)} tables")
+    return map_table_name_to_table_def
@@ -0,0 +1,121 @@
+"""
+Clone of da_ai_agent/modules/sql_generation.py
+
+Purpose:
+    Generate SQL for a prompt and run it, in as few model round trips as possible.
+
+    tool_call   one round trip - the model answers with a forced run_sql tool call
+    code_block  one round trip - the SQL is pulled out of a fenced code block locally
+    two_step    two round trips - generate SQL, then have the model echo it into run_sql
+
+    The fast paths fall back to the second hop of two_step only when the
+    response can't be parsed. SQL errors are raised as usual.
+"""
+
+import json
+import time
+from typing import Optional
+
+from modules.models import SQLGenerationResult, TurboTool
+from modules import llm
+
+PATH_TOOL_CALL = "tool_call"
+PATH_CODE_BLOCK = "code_block"
+PATH_TWO_STEP = "two_step"
+
+PATHS = [PATH_TOOL_CALL, PATH_CODE_BLOCK, PATH_TWO_STEP]
+
+SQL_INSTRUCTIONS = "You're an elite SQL developer. You generate the most concise and performant SQL queries."
+CODE_BLOCK_INSTRUCTIONS = SQL_INSTRUCTIONS + " Respond with a single ```sql code block."
+RUN_SQL_PROMPT = "Use the run_sql function to run the SQL you've just generated: "
+
+def generate_and_run_sql(
+    prompt: str,
+    run_sql_tool: TurboTool,
+    path: str = PATH_TOOL_CALL,
+    model: str = "gpt-4-1106-preview",
+    tool_model: str = "gpt-4-1106-preview",
+    use_cache: bool = True,
+) -> SQLGenerationResult:
+    """
+    Generate SQL for the prompt and run it with run_sql_tool.
+    model generates the SQL, tool_model does the run_sql hop of the two step flow.
+    """
+    if path not in PATHS:
+        raise ValueError(f"Unknown SQL generation path: {path}. Use one of {PATHS}")
+
+    start = time.perf_counter()
+    round_trips = 0
+    sql_response = None
+
+    if path == PATH_TOOL_CALL:
+        round_trips += 1
+        response = llm.create_chat_completion(
+            use_cache=use_cache,
+            model=model,
+            messages=[
+                {"role": "system", "content": SQL_INSTRUCTIONS},
+                {"role": "user", "content": prompt},
+            ],
+            tools=[run_sql_tool.config],
+            tool_choice={"type": "function", "function": {"name": run_sql_tool.name}},
+        )
+        sql = parse_tool_call_sql(response, run_sql_tool.name)
+        if sql:
+            # errors raised by the query itself are not a parse failure, they propagate
+            run_sql_tool.function(sql=sql)
+            return SQLGenerationResult(path, round_trips, elapsed_ms(start))
+        print("❌ No usable run_sql tool call in the response")
+
+    if path == PATH_CODE_BLOCK:
+        round_trips += 1
+        sql_response = llm.prompt(
+            prompt, model=model, instructions=CODE_BLOCK_INSTRUCTIONS, use_cache=use_cache
+        )
+        sql = llm.extract_code_block(sql_response)
+        if sql:
+            run_sql_tool.function(sql=sql)
+            return SQLGenerationResult(path, round_trips, elapsed_ms(start))
+        print("❌ No ```sql code block in the response")
+
+    # two step flow, or the fallback of a fast path that didn't parse
+    if sql_response is None:
+        round_trips += 1
+        sql_response = llm.prompt(
+            prompt, model=model, instructions=SQL_INSTRUCTIONS, use_cache=use_cache
+        )
+
+    round_trips += 1
+    llm.prompt_func(
+        RUN_SQL_PROMPT + sql_response,
+        turbo_tools=[run_sql_tool],
+        model=tool_model,
+        instructions=SQL_INSTRUCTIONS,
+        use_cache=use_cache,
+    )
+
+    return SQLGenerationResult(
+        path, round_trips, elapsed_ms(start), fell_back=path != PATH_TWO_STEP
+    )
+
+
+def parse_tool_call_sql(response: dict, tool_name: str) -> Optional[str]:
+    """
+    The sql argument of the first tool_name call in a chat completion response.
+    None when there's no such call or its arguments aren't a json object with a non empty "sql" string.
+    """
+    for tool_call in llm.safe_get(response, "choices.0.message.tool_calls") or []:
+        if llm.safe_get(tool_call, "function.name") != tool_name:
+            continue
+        try:
+            arguments = json.loads(llm.safe_get(tool_call, "function.arguments") or "")
+        except json.JSONDecodeError as error:
+            print(f"❌ {tool_name} tool call arguments are not valid json: {error}")
+            return None
+        sql = arguments.get("sql") if isinstance(arguments, dict) else None
+        return sql if isinstance(sql, str) and sql.strip() else None
+    return None
+
+
+def elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
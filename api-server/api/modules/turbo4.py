@@ -14,8 +14,8 @@ from openai.types.beta import Thread, Assistant
 from openai.types import FileObject
 from openai.types.beta.threads.thread_message import ThreadMessage
 from openai.types.beta.threads.run_submit_tool_outputs_params import ToolOutput
-from modules import llm
-from modules.models import Chat, TurboTool
+from modules import cost_ledger, llm
+from modules.models import Chat, TurboTool, UsageTotals
 
 dotenv.load_dotenv()
 
@@ -27,7 +27,8 @@ class Turbo4:
 
     def __init__(self):
         openai.api_key = os.environ.get("OPENAI_API_KEY")
-        self.client: openai = OpenAI()
+        # retries are handled by llm.request_scheduler, see call_api
+        self.client: openai = OpenAI(max_retries=0)
 
         self.map_function_tools: Dict[str, TurboTool] = {}
         self.current_thread_id = None
@@ -39,6 +40,10 @@ class Turbo4:
             0.5  # Interval in seconds to poll the API for thread run completion
         )
         self.model = "gpt-4-1106-preview"
+        # usage reported on completed runs, see record_run_usage
+        self.usage = UsageTotals()
+        # tokens charged to the rate limit budget for the current run until it reports usage
+        self.run_estimated_tokens = 0
 
     @property
     def chat_messages(self) -> List[Chat]:
@@ -58,6 +63,14 @@ class Turbo4:
 
     # ------------- Additional Utility Functions -----------------
 
+    def call_api(self, api_function: Callable, estimated_tokens: int = 0, **kwargs):
+        """
+        Send one Assistants API request through the shared rate limit scheduler.
+        """
+        return llm.request_scheduler.submit(
+            lambda: api_function(**kwargs), estimated_tokens=estimated_tokens
+        )
+
     def run_validation(self, validation_func: Callable):
         print(f"run_validation({validation_func.__name__})")
         validation_func()
@@ -75,7 +88,8 @@ class Turbo4:
 
     def get_costs_and_tokens(self, output_file: str) -> Tuple[float, float]:
         """
-        Get the estimated cost and token usage for the current thread.
+        Get the cost and token usage for the current thread, from the usage
+        reported on its runs. Estimated when the API reported none.
 
         https://openai.com/pricing
 
@@ -85,19 +99,25 @@ class Turbo4:
         retrival_costs = 0
         code_interpreter_costs = 0
 
-        msgs = [
-            llm.safe_get(msg.model_dump(), "content.0.text.value")
-            for msg in self.thread_messages
-        ]
-        joined_msgs = " ".join(msgs)
+        if self.usage.calls:
+            msg_cost, tokens = round(self.usage.cost, 4), self.usage.tokens
+        else:
+            # the API reported no run usage - estimate from the thread, priced for this model
+            msgs = [
+                llm.safe_get(msg.model_dump(), "content.0.text.value")
+                for msg in self.thread_messages
+            ]
+            joined_msgs = " ".join(msgs)
 
-        msg_cost, tokens = llm.estimate_price_and_tokens(joined_msgs, self.model)
+            msg_cost, tokens = llm.estimate_price_and_tokens(joined_msgs, self.model)
 
         with open(output_file, "w") as f:
             json.dump(
                 {
                     "cost": msg_cost,
                     "tokens": tokens,
+                    "prompt_tokens": self.usage.prompt_tokens,
+                    "completion_tokens": self.usage.completion_tokens,
                 },
                 f,
                 indent=2,
@@ -110,7 +130,7 @@ class Turbo4:
     def get_or_create_assistant(self, name: str, model: str = "gpt-4-1106-preview"):
         print(f"get_or_create_assistant({name}, {model})")
         # Retrieve the list of existing assistants
-        assistants: List[Assistant] = self.client.beta.assistants.list().data
+        assistants: List[Assistant] = self.call_api(self.client.beta.assistants.list).data
 
         # Check if an assistant with the given name already exists
         for assistant in assistants:
@@ -120,12 +140,13 @@ class Turbo4:
                 # update model if different
                 if assistant.model != model:
                     print(f"Updating assistant model from {assistant.model} to {model}")
-                    self.client.beta.assistants.update(
+                    self.call_api(
+                        self.client.beta.assistants.update,
                         assistant_id=self.assistant_id, model=model
                     )
                 break
         else:  # If no assistant was found with the name, create a new one
-            assistant = self.client.beta.assistants.create(model=model, name=name)
+            assistant = self.call_api(self.client.beta.assistants.create, model=model, name=name)
             self.assistant_id = assistant.id
 
         self.model = model
@@ -139,7 +160,8 @@ class Turbo4:
                 "No assistant has been created or retrieved. Call get_or_create_assistant() first."
             )
         # Update the assistant with the new instructions
-        updated_assistant = self.client.beta.assistants.update(
+        updated_assistant = self.call_api(
+            self.client.beta.assistants.update,
             assistant_id=self.assistant_id, instructions=instructions
         )
         return self
@@ -158,7 +180,8 @@ class Turbo4:
 
         if equip_on_assistant:
             # Update the assistant with the new list of tools, replacing any existing tools
-            updated_assistant = self.client.beta.assistants.update(
+            updated_assistant = self.call_api(
+                self.client.beta.assistants.update,
                 tools=self.tool_config, assistant_id=self.assistant_id
             )
 
@@ -172,9 +195,10 @@ class Turbo4:
                 "No assistant has been created. Call create_assistant() first."
             )
 
-        response = self.client.beta.threads.create()
+        response = self.call_api(self.client.beta.threads.create)
         self.current_thread_id = response.id
         self.thread_messages = []
+        self.usage = UsageTotals()
         return self
 
     def add_message(
@@ -185,7 +209,8 @@ class Turbo4:
     ):
         print(f"add_message(message={message}, file_ids={file_ids})")
         self.local_messages.append(message)
-        self.client.beta.threads.messages.create(
+        self.call_api(
+            self.client.beta.threads.messages.create,
             thread_id=self.current_thread_id,
             content=message,
             role="user",
@@ -196,13 +221,15 @@ class Turbo4:
         return self
 
     def load_threads(self):
-        self.thread_messages = self.client.beta.threads.messages.list(
+        self.thread_messages = self.call_api(
+            self.client.beta.threads.messages.list,
             thread_id=self.current_thread_id
         ).data
 
     def list_steps(self):
         print(f"list_steps()")
-        steps = self.client.beta.threads.runs.steps.list(
+        steps = self.call_api(
+            self.client.beta.threads.runs.steps.list,
             thread_id=self.current_thread_id,
             run_id=self.run_id,
         )
@@ -232,7 +259,14 @@ class Turbo4:
         self.load_threads()
 
         # Start the thread running
-        run = self.client.beta.threads.runs.create(
+        # the run reads the whole thread. Its usage is only reported once it completes,
+        # so the estimate is settled then, see record_run_usage
+        self.run_estimated_tokens = (
+            llm.count_tokens(" ".join(self.local_messages)) + llm.COMPLETION_TOKEN_ALLOWANCE
+        )
+        run = self.call_api(
+            self.client.beta.threads.runs.create,
+            estimated_tokens=self.run_estimated_tokens,
             thread_id=self.current_thread_id,
             assistant_id=self.assistant_id,
             tools=tools,
@@ -243,7 +277,8 @@ class Turbo4:
         while True:
             # self.list_steps()
 
-            run_status = self.client.beta.threads.runs.retrieve(
+            run_status = self.call_api(
+                self.client.beta.threads.runs.retrieve,
                 thread_id=self.current_thread_id, run_id=self.run_id
             )
             if run_status.status == "requires_action":
@@ -273,17 +308,35 @@ class Turbo4:
                     )
 
                 # Submit the tool outputs back to the API
-                self.client.beta.threads.runs.submit_tool_outputs(
+                self.call_api(
+                    self.client.beta.threads.runs.submit_tool_outputs,
                     thread_id=self.current_thread_id,
                     run_id=self.run_id,
                     tool_outputs=[to for to in tool_outputs],
                 )
             elif run_status.status == "completed":
+                self.record_run_usage(run_status)
                 self.load_threads()
                 return self
 
             time.sleep(self.polling_interval)  # Wait a little before polling again
 
+    def record_run_usage(self, run):
+        """
+        Record the tokens a completed run used, when the API reports them, and
+        replace the run's estimate in the rate limit budget with them.
+        """
+        usage = getattr(run, "usage", None)
+        if usage is None:
+            return
+        prompt_tokens, completion_tokens = cost_ledger.read_usage(usage)
+        llm.request_scheduler.settle(self.run_estimated_tokens, prompt_tokens + completion_tokens)
+        self.run_estimated_tokens = 0
+        record = llm.usage_ledger.record(
+            getattr(run, "model", None) or self.model, prompt_tokens, completion_tokens
+        )
+        self.usage.add(record)
+
     def enable_retrieval(self):
         print(f"enable_retrieval()")
         if self.assistant_id is None:
@@ -292,7 +345,8 @@ class Turbo4:
             )
 
         # Update the assistant with the new list of tools, replacing any existing tools
-        updated_assistant = self.client.beta.assistants.update(
+        updated_assistant = self.call_api(
+            self.client.beta.assistants.update,
             tools=[{"type": "retrieval"}], assistant_id=self.assistant_id
         )
 
@@ -320,7 +374,7 @@ class Turbo4:
                 "No assistant has been created or retrieved. Call get_or_create_assistant() first."
             )
 
-        existing_files: List[FileObject] = self.client.files.list().data
+        existing_files: List[FileObject] = self.call_api(self.client.files.list).data
 
         print("existing_files", existing_files)
 
@@ -346,8 +400,9 @@ class Turbo4:
                     # check if file has changed - delete and reupload if so
                     if existing_file.bytes != local_file_size:
                         print(f"File {file_name} has changed - updating")
-                        self.client.files.delete(file_id=existing_file)
-                        updated_file_object: FileObject = self.client.files.create(
+                        self.call_api(self.client.files.delete, file_id=existing_file)
+                        updated_file_object: FileObject = self.call_api(
+                            self.client.files.create,
                             file=file_object,
                             purpose="assistants",
                         )
@@ -357,7 +412,8 @@ class Turbo4:
             # If the file was not found, create it
             if not file_found:
                 print(f"Creating file {file_name}")
-                new_file_object: FileObject = self.client.files.create(
+                new_file_object: FileObject = self.call_api(
+                    self.client.files.create,
                     file=file_object,
                     purpose="assistants",
                 )
@@ -370,7 +426,7 @@ class Turbo4:
 
     def get_files(self, file_ids: Optional[List[str]] = None):
         print(f"list_files()")
-        files = self.client.files.list().data
+        files = self.call_api(self.client.files.list).data
         if file_ids is not None:
             print(f"filtering files by {file_ids}")
             files = [file for file in files if file.id in file_ids]
@@ -379,7 +435,7 @@ class Turbo4:
 
     def get_files_by_name(self, file_names: List[str]):
         print(f"get_files_by_name({file_names})")
-        files: List[FileObject] = self.client.files.list().data
+        files: List[FileObject] = self.call_api(self.client.files.list).data
 
         output_files = []
 
@@ -1,5 +1,7 @@
 import autogen
 
+from da_ai_agent.modules import rate_limit
+
 
 # Build the GPT_Configuration object
 # Base Configuration
@@ -8,8 +10,28 @@ base_config = {
     "temperature": 0,
     "config_list": autogen.config_list_from_models(["gpt-4"]),
     "request_timeout": 120,
+    # autogen owns its openai client, so it can't share llm.request_scheduler -
+    # the client retries 429s and 5xx with backoff, honoring retry-after
+    "max_retries": rate_limit.DEFAULT_MAX_RETRIES,
 }
 
+
+def with_model(config: dict, model: str = None) -> dict:
+    """
+    Copy of an llm_config that runs on the given model, e.g. one picked by model_router.
+    """
+    if not model:
+        return config
+    return {**config, "config_list": autogen.config_list_from_models([model])}
+
+
+def model_of(config: dict) -> str:
+    """
+    Model an llm_config runs on - the first of its config_list.
+    """
+    return config["config_list"][0]["model"]
+
+
 # Configuration with "run_sql"
 run_sql_config = {
     **base_config,  # Inherit base configuration
@@ -1,15 +1,16 @@
 from typing import Optional, List, Dict, Any
 from da_ai_agent.agents.instruments import PostgresAgentInstruments
+from da_ai_agent.modules import llm
 from da_ai_agent.modules import orchestrator
 from da_ai_agent.agents import agent_config
+import re
 import autogen
-import guidance
 
 # ------------------------ PROMPTS ------------------------
 USER_PROXY_PROMPT = ("A human admin. Interact with the Product Manager to discuss the plan. Plan execution needs to be approved by this admin.")
 DATA_ENGINEER_PROMPT = ("A Data Engineer. Generate the initial SQL based on the requirements provided. Send it to the Sr Data Analyst to be executed.")
 SR_DATA_ANALYST_PROMPT = ("Sr Data Analyst. You run the SQL query using the run_sql function, send the raw response to the data viz team. You use the run_sql function exclusively.")
-GUIDANCE_SCRUM_MASTER_SQL_NLQ_PROMPT = """
+SCRUM_MASTER_SQL_NLQ_PROMPT = """
 Is the following block of text a SQL Natural Language Query (NLQ)? Please rank from 1 to 5, where:
 1: Definitely not NLQ
 2: Likely not NLQ
@@ -17,24 +18,16 @@ Is the following block of text a SQL Natural Language Query (NLQ)? Please rank f
 4: Likely NLQ
 5: Definitely NLQ
 
-Return the rank as a number exclusively using the rank variable to be casted as an integer.
-
-Block of Text: {{potential_nlq}}
-{{#select "rank" logprobs='logprobs'}} 1{{or}} 2{{or}} 3{{or}} 4{{or}} 5{{/select}}
+Return the rank as a number exclusively, a single digit from 1 to 5.
 """
 
-DATA_INSIGHTS_GUIDANCE_PROMPT = """
-You're a data innovator. You analyze SQL databases table structure and generate 3 novel insights for your team to reflect on and query. 
-Format your insights in JSON format.
-```json
-[{{#geneach 'insight' num_iterations=3 join=','}}
-{
-    "insight": "{{gen 'insight' temperature=0.7}}",
-    "actionable_business_value": "{{gen 'actionable_value' temperature=0.7}}",
-    "sql": "{{gen 'new_query' temperature=0.7}}"
-}
-{{/geneach}}]
-```"""
+DATA_INSIGHTS_PROMPT = """
+You're a data innovator. You analyze SQL databases table structure and generate 3 novel insights for your team to reflect on and query.
+Format your insights in JSON format, exclusively a json list like this:
+[
+    {"insight": "<insight>", "actionable_business_value": "<actionable value>", "sql": "<new query>"},
+    ...
+]"""
 
 
 INSIGHTS_FILE_REPORTER_PROMPT = "You are a data reporter. You write json data you receive directly into a file using the write_innovation_file function."
@@ -53,7 +46,7 @@ YML_REPORT_ANALYST_PROMPT = "Yaml Report Analyst. You exclusively use the write_
 # ------------------------ BUILD AGENT TEAMS ------------------------
 
 
-def build_data_eng_team(instruments: PostgresAgentInstruments):
+def build_data_eng_team(instruments: PostgresAgentInstruments, model: Optional[str] = None):
     """
     Build a team of agents that can generate, execute, and report an SQL query
     """
@@ -71,7 +64,7 @@ def build_data_eng_team(instruments: PostgresAgentInstruments):
     # Data engineer agent - generates the sql query
     data_engineer = autogen.AssistantAgent(
         name="Engineer",
-        llm_config=agent_config.base_config,
+        llm_config=agent_config.with_model(agent_config.base_config, model),
         system_message=DATA_ENGINEER_PROMPT,
         code_execution_config=False,
         human_input_mode="NEVER",
@@ -79,7 +72,7 @@ def build_data_eng_team(instruments: PostgresAgentInstruments):
 
     sr_data_analyst = autogen.AssistantAgent(
         name="Sr_Data_Analyst",
-        llm_config=agent_config.run_sql_config,
+        llm_config=agent_config.with_model(agent_config.run_sql_config, model),
         system_message=SR_DATA_ANALYST_PROMPT,
         code_execution_config=False,
         human_input_mode="NEVER",
@@ -96,7 +89,7 @@ def build_data_eng_team(instruments: PostgresAgentInstruments):
     ]
 
 
-def build_data_viz_team(instruments: PostgresAgentInstruments):
+def build_data_viz_team(instruments: PostgresAgentInstruments, model: Optional[str] = None):
     # admin user proxy agent - takes in the prompt and manages the group chat
     user_proxy = autogen.UserProxyAgent(
         name="Admin",
@@ -108,7 +101,7 @@ def build_data_viz_team(instruments: PostgresAgentInstruments):
     # text report analyst - writes a summary report of the results and saves them to a local text file
     text_report_analyst = autogen.AssistantAgent(
         name="Text_Report_Analyst",
-        llm_config=agent_config.write_file_config,
+        llm_config=agent_config.with_model(agent_config.write_file_config, model),
         system_message=TEXT_REPORT_ANALYST_PROMPT,
         human_input_mode="NEVER",
         function_map={
@@ -119,7 +112,7 @@ def build_data_viz_team(instruments: PostgresAgentInstruments):
     # json report analyst - writes a summary report of the results and saves them to a local json file
     json_report_analyst = autogen.AssistantAgent(
         name="Json_Report_Analyst",
-        llm_config=agent_config.write_json_file_config,
+        llm_config=agent_config.with_model(agent_config.write_json_file_config, model),
         system_message=JSON_REPORT_ANALYST_PROMPT,
         human_input_mode="NEVER",
         function_map={
@@ -129,7 +122,7 @@ def build_data_viz_team(instruments: PostgresAgentInstruments):
 
     yaml_report_analyst = autogen.AssistantAgent(
         name="Yml_Report_Analyst",
-        llm_config=agent_config.write_yaml_file_config,
+        llm_config=agent_config.with_model(agent_config.write_yaml_file_config, model),
         system_message=YML_REPORT_ANALYST_PROMPT,
         human_input_mode="NEVER",
         function_map={
@@ -145,7 +138,7 @@ def build_data_viz_team(instruments: PostgresAgentInstruments):
     ]
 
 
-def build_scrum_master_team():
+def build_scrum_master_team(model: Optional[str] = None):
     user_proxy = autogen.UserProxyAgent(
         name="Admin",
         system_message=USER_PROXY_PROMPT,
@@ -155,15 +148,15 @@ def build_scrum_master_team():
 
     scrum_agent = DefensiveScrumMasterAgent(
         name="Scrum_Master",
-        llm_config=agent_config.base_config,
-        system_message=GUIDANCE_SCRUM_MASTER_SQL_NLQ_PROMPT,
+        llm_config=agent_config.with_model(agent_config.base_config, model),
+        system_message=SCRUM_MASTER_SQL_NLQ_PROMPT,
         human_input_mode="NEVER",
     )
 
     return [user_proxy, scrum_agent]
 
 
-def build_insights_team(instruments: PostgresAgentInstruments):
+def build_insights_team(instruments: PostgresAgentInstruments, model: Optional[str] = None):
     user_proxy = autogen.UserProxyAgent(
         name="Admin",
         system_message=USER_PROXY_PROMPT,
@@ -173,14 +166,14 @@ def build_insights_team(instruments: PostgresAgentInstruments):
 
     insights_agent = InsightsAgent(
         name="Insights",
-        llm_config=agent_config.base_config,
-        system_message=DATA_INSIGHTS_GUIDANCE_PROMPT,
+        llm_config=agent_config.with_model(agent_config.base_config, model),
+        system_message=DATA_INSIGHTS_PROMPT,
         human_input_mode="NEVER",
     )
 
     insights_data_reporter = autogen.AssistantAgent(
         name="Insights_Data_Reporter",
-        llm_config=agent_config.write_innovation_file_config,
+        llm_config=agent_config.with_model(agent_config.write_innovation_file_config, model),
         system_message=INSIGHTS_FILE_REPORTER_PROMPT,
         human_input_mode="NEVER",
         function_map={
@@ -199,38 +192,41 @@ def build_team_orchestrator(
     team: str,
     agent_instruments: PostgresAgentInstruments,
     validate_results: callable = None,
+    model: Optional[str] = None,
 ) -> orchestrator.Orchestrator:
     """
     Based on a team name, build a team of agents and return an orchestrator.
 
     The function now accepts an instance of AgentInstruments, which can be either
     PostgresAgentInstruments or PrestoAgentInstruments.
+
+    model overrides the model of every agent in the team, see model_router.
     """
 
     if team == "data_eng":
         return orchestrator.Orchestrator(
             name="data_eng_team",
-            agents=build_data_eng_team(agent_instruments),
+            agents=build_data_eng_team(agent_instruments, model),
             instruments=agent_instruments,
             validate_results_func=validate_results,
         )
     elif team == "data_viz":
         return orchestrator.Orchestrator(
             name="data_viz_team",
-            agents=build_data_viz_team(agent_instruments),
+            agents=build_data_viz_team(agent_instruments, model),
             validate_results_func=validate_results,
         )
     elif team == "scrum_master":
         return orchestrator.Orchestrator(
             name="scrum_master_team",
-            agents=build_scrum_master_team(),
+            agents=build_scrum_master_team(model),
             instruments=agent_instruments,
             validate_results_func=validate_results,
         )
     elif team == "data_insights":
         return orchestrator.Orchestrator(
             name="data_insights_team",
-            agents=build_insights_team(agent_instruments),
+            agents=build_insights_team(agent_instruments, model),
             instruments=agent_instruments,
             validate_results_func=validate_results,
         )
@@ -243,7 +239,7 @@ def build_team_orchestrator(
 
 class DefensiveScrumMasterAgent(autogen.ConversableAgent):
     """
-    Custom agent that uses the guidance function to determine if a message is a SQL NLQ
+    Custom agent that ranks how likely a message is a SQL NLQ
     """
 
     def __init__(self, *args, **kwargs):
@@ -260,21 +256,24 @@ class DefensiveScrumMasterAgent(autogen.ConversableAgent):
         # Check the last received message
         last_message = messages[-1]["content"]
 
-        # Use the guidance string to determine if the message is a SQL NLQ
-        response = guidance(
-            GUIDANCE_SCRUM_MASTER_SQL_NLQ_PROMPT, potential_nlq=last_message
+        # goes through llm so the call is rate limited and lands in the usage ledger,
+        # on the agent's (routed) model
+        response = llm.prompt(
+            f"Block of Text: {last_message}",
+            model=agent_config.model_of(self.llm_config),
+            instructions=SCRUM_MASTER_SQL_NLQ_PROMPT,
         )
 
-        # You can return the exact response or just a simplified version,
-        # here we are just returning the rank for simplicity
-        rank = response.get("choices", [{}])[0].get("rank", "3")
+        # just the rank - anything else is returned as is and fails the gate check
+        match = re.search(r"\b[1-5]\b", response or "")
+        rank = match.group(0) if match else (response or "").strip()
 
         return True, rank
 
 
 class InsightsAgent(autogen.ConversableAgent):
     """
-    Custom agent that uses the guidance function to generate insights in JSON format
+    Custom agent that generates insights in JSON format
     """
 
     def __init__(self, *args, **kwargs):
@@ -287,5 +286,9 @@ class InsightsAgent(autogen.ConversableAgent):
         sender: Optional[autogen.Agent] = None,
         config: Optional[Any] = None,
     ):
-        insights = guidance(DATA_INSIGHTS_GUIDANCE_PROMPT)
+        insights = llm.prompt(
+            messages[-1]["content"],
+            model=agent_config.model_of(self.llm_config),
+            instructions=DATA_INSIGHTS_PROMPT,
+        )
         return True, insights
@@ -9,8 +9,8 @@ from openai.types.beta import Thread, Assistant
 from openai.types import FileObject
 from openai.types.beta.threads.thread_message import ThreadMessage
 from openai.types.beta.threads.run_submit_tool_outputs_params import ToolOutput
-from da_ai_agent.modules import llm
-from da_ai_agent.data_types import Chat, TurboTool
+from da_ai_agent.modules import cost_ledger, llm
+from da_ai_agent.data_types import Chat, TurboTool, UsageTotals
 
 dotenv.load_dotenv()
 
@@ -22,7 +22,8 @@ class Turbo4:
 
     def __init__(self, agent_instruments=None):
         openai.api_key = os.environ.get("OPENAI_API_KEY")
-        self.client = openai.OpenAI()
+        # retries are handled by llm.request_scheduler, see call_api
+        self.client = openai.OpenAI(max_retries=0)
         self.agent_instruments = agent_instruments
         self.map_function_tools: Dict[str, TurboTool] = {}
         self.current_thread_id = None
@@ -33,6 +34,10 @@ class Turbo4:
             0.5  # Interval in seconds to poll the API for thread run completion
         )
         self.model = "gpt-4-1106-preview"
+        # usage reported on completed runs, see record_run_usage
+        self.usage = UsageTotals()
+        # tokens charged to the rate limit budget for the current run until it reports usage
+        self.run_estimated_tokens = 0
 
     @property
     def chat_messages(self) -> List[Chat]:
@@ -52,6 +57,14 @@ class Turbo4:
 
     # ------------- Additional Utility Functions -----------------
 
+    def call_api(self, api_function: Callable, estimated_tokens: int = 0, **kwargs):
+        """
+        Send one Assistants API request through the shared rate limit scheduler.
+        """
+        return llm.request_scheduler.submit(
+            lambda: api_function(**kwargs), estimated_tokens=estimated_tokens
+        )
+
     def run_validation(self, validation_func: Callable):
         print(f"run_validation({validation_func.__name__})")
         validation_func()
@@ -105,7 +118,8 @@ class Turbo4:
 
     def get_costs_and_tokens(self, output_file: str) -> Tuple[float, float]:
         """
-        Get the estimated cost and token usage for the current thread.
+        Get the cost and token usage for the current thread, from the usage
+        reported on its runs. Estimated when the API reported none.
 
         https://openai.com/pricing
 
@@ -115,19 +129,25 @@ class Turbo4:
         retrival_costs = 0
         code_interpreter_costs = 0
 
-        msgs = [
-            llm.safe_get(msg.model_dump(), "content.0.text.value")
-            for msg in self.thread_messages
-        ]
-        joined_msgs = " ".join(msgs)
+        if self.usage.calls:
+            msg_cost, tokens = round(self.usage.cost, 4), self.usage.tokens
+        else:
+            # the API reported no run usage - estimate from the thread, priced for this model
+            msgs = [
+                llm.safe_get(msg.model_dump(), "content.0.text.value")
+                for msg in self.thread_messages
+            ]
+            joined_msgs = " ".join(msgs)
 
-        msg_cost, tokens = llm.estimate_price_and_tokens(joined_msgs)
+            msg_cost, tokens = llm.estimate_price_and_tokens(joined_msgs, self.model)
 
         with open(output_file, "w") as f:
             json.dump(
                 {
                     "cost": msg_cost,
                     "tokens": tokens,
+                    "prompt_tokens": self.usage.prompt_tokens,
+                    "completion_tokens": self.usage.completion_tokens,
                 },
                 f,
                 indent=2,
@@ -140,7 +160,7 @@ class Turbo4:
     def get_or_create_assistant(self, name: str, model: str = "gpt-4-1106-preview"):
         print(f"get_or_create_assistant({name}, {model})")
         # Retrieve the list of existing assistants
-        assistants: List[Assistant] = self.client.beta.assistants.list().data
+        assistants: List[Assistant] = self.call_api(self.client.beta.assistants.list).data
 
         # Check if an assistant with the given name already exists
         for assistant in assistants:
@@ -150,12 +170,13 @@ class Turbo4:
                 # update model if different
                 if assistant.model != model:
                     print(f"Updating assistant model from {assistant.model} to {model}")
-                    self.client.beta.assistants.update(
+                    self.call_api(
+                        self.client.beta.assistants.update,
                         assistant_id=self.assistant_id, model=model
                     )
                 break
         else:  # If no assistant was found with the name, create a new one
-            assistant = self.client.beta.assistants.create(model=model, name=name)
+            assistant = self.call_api(self.client.beta.assistants.create, model=model, name=name)
             self.assistant_id = assistant.id
 
         self.model = model
@@ -169,7 +190,8 @@ class Turbo4:
                 "No assistant has been created or retrieved. Call get_or_create_assistant() first."
             )
         # Update the assistant with the new instructions
-        updated_assistant = self.client.beta.assistants.update(
+        updated_assistant = self.call_api(
+            self.client.beta.assistants.update,
             assistant_id=self.assistant_id, instructions=instructions
         )
         return self
@@ -188,7 +210,8 @@ class Turbo4:
 
         if equip_on_assistant:
             # Update the assistant with the new list of tools, replacing any existing tools
-            updated_assistant = self.client.beta.assistants.update(
+            updated_assistant = self.call_api(
+                self.client.beta.assistants.update,
                 tools=self.tool_config, assistant_id=self.assistant_id
             )
 
@@ -202,15 +225,17 @@ class Turbo4:
                 "No assistant has been created. Call create_assistant() first."
             )
 
-        response = self.client.beta.threads.create()
+        response = self.call_api(self.client.beta.threads.create)
         self.current_thread_id = response.id
         self.thread_messages = []
+        self.usage = UsageTotals()
         return self
 
     def add_message(self, message: str, refresh_threads: bool = False):
         print(f"add_message({message})")
         self.local_messages.append(message)
-        self.client.beta.threads.messages.create(
+        self.call_api(
+            self.client.beta.threads.messages.create,
             thread_id=self.current_thread_id, content=message, role="user"
         )
         if refresh_threads:
@@ -218,13 +243,15 @@ class Turbo4:
         return self
 
     def load_threads(self):
-        self.thread_messages = self.client.beta.threads.messages.list(
+        self.thread_messages = self.call_api(
+            self.client.beta.threads.messages.list,
             thread_id=self.current_thread_id
         ).data
 
     def list_steps(self):
         print(f"list_steps()")
-        steps = self.client.beta.threads.runs.steps.list(
+        steps = self.call_api(
+            self.client.beta.threads.runs.steps.list,
             thread_id=self.current_thread_id,
             run_id=self.run_id,
         )
@@ -254,7 +281,14 @@ class Turbo4:
         self.load_threads()
 
         # Start the thread running
-        run = self.client.beta.threads.runs.create(
+        # the run reads the whole thread. Its usage is only reported once it completes,
+        # so the estimate is settled then, see record_run_usage
+        self.run_estimated_tokens = (
+            llm.count_tokens(" ".join(self.local_messages)) + llm.COMPLETION_TOKEN_ALLOWANCE
+        )
+        run = self.call_api(
+            self.client.beta.threads.runs.create,
+            estimated_tokens=self.run_estimated_tokens,
             thread_id=self.current_thread_id,
             assistant_id=self.assistant_id,
             tools=tools,
@@ -265,7 +299,8 @@ class Turbo4:
 
         # Polling mechanism to wait for thread's run completion or required actions
         while True:
-            run_status = self.client.beta.threads.runs.retrieve(
+            run_status = self.call_api(
+                self.client.beta.threads.runs.retrieve,
                 thread_id=self.current_thread_id, run_id=self.run_id
             )
             if run_status.status == "requires_action":
@@ -292,12 +327,14 @@ class Turbo4:
                         ToolOutput(tool_call_id=tool_call.id, output=function_output)
                     )
 
-                self.client.beta.threads.runs.submit_tool_outputs(
+                self.call_api(
+                    self.client.beta.threads.runs.submit_tool_outputs,
                     thread_id=self.current_thread_id,
                     run_id=self.run_id,
                     tool_outputs=tool_outputs,
                 )
             elif run_status.status == "completed":
+                self.record_run_usage(run_status)
                 self.load_threads()
 
                 # Store SQL results if available
@@ -308,6 +345,22 @@ class Turbo4:
 
             time.sleep(self.polling_interval)
 
+    def record_run_usage(self, run):
+        """
+        Record the tokens a completed run used, when the API reports them, and
+        replace the run's estimate in the rate limit budget with them.
+        """
+        usage = getattr(run, "usage", None)
+        if usage is None:
+            return
+        prompt_tokens, completion_tokens = cost_ledger.read_usage(usage)
+        llm.request_scheduler.settle(self.run_estimated_tokens, prompt_tokens + completion_tokens)
+        self.run_estimated_tokens = 0
+        record = llm.usage_ledger.record(
+            getattr(run, "model", None) or self.model, prompt_tokens, completion_tokens
+        )
+        self.usage.add(record)
+
     def enable_retrieval(self):
         print(f"enable_retrieval()")
         if self.assistant_id is None:
@@ -316,7 +369,8 @@ class Turbo4:
             )
 
         # Update the assistant with the new list of tools, replacing any existing tools
-        updated_assistant = self.client.beta.assistants.update(
+        updated_assistant = self.call_api(
+            self.client.beta.assistants.update,
             tools=[{"type": "retrieval"}], assistant_id=self.assistant_id
         )
 
@@ -1,4 +1,5 @@
-from typing import Callable, List
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
 from dataclasses import dataclass, field
 import time
 
@@ -26,3 +27,175 @@ class TurboTool:
     name: str
     config: dict
     function: Callable
+
+
+@dataclass
+class ColumnSchema:
+    table_name: str
+    name: str
+    data_type: str
+    hints: str = ""
+
+
+@dataclass
+class TableCandidate:
+    table_name: str
+    score: float
+    # provenance - 'embedding', 'hybrid', 'lexical' and/or 'fk'
+    sources: List[str] = field(default_factory=list)
+
+
+@dataclass
+class SchemaCandidate:
+    table_name: str
+    score: float
+    full_definition: str
+    pruned_definition: Optional[str] = None
+
+
+@dataclass
+class PackedSchema:
+    table_definitions: str
+    full_tables: List[str]
+    pruned_tables: List[str]
+    dropped_tables: List[str]
+    tokens_per_stage: Dict[str, int]
+    token_budget: int
+
+
+@dataclass
+class LabeledPrompt:
+    prompt: str
+    expected_tables: List[str]
+    expected_sql: Optional[str] = None
+
+
+@dataclass
+class SchemaDiff:
+    # keys are table names, or (table, column) pairs for column diffs
+    added: List = field(default_factory=list)
+    dropped: List = field(default_factory=list)
+    altered: List = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.dropped or self.altered)
+
+
+@dataclass
+class SyntheticTable:
+    name: str
+    # natural language noun the table stores, e.g. 'customer order'
+    entity: str
+    columns: List[ColumnSchema]
+    # fk column name -> referenced table name
+    foreign_keys: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class ParaphrasePair:
+    prompt: str
+    paraphrase: str
+    # True when both prompts should be answered by the same SQL
+    equivalent: bool
+
+
+@dataclass
+class SQLCacheHit:
+    entry_id: int
+    prompt: str
+    # the earlier prompt the SQL was generated for
+    cached_prompt: str
+    sql: str
+    similarity: float
+    # sampled for audit - the caller should also generate fresh SQL and compare
+    audit: bool = False
+
+
+@dataclass
+class StreamMetrics:
+    model: str
+    started_at: float
+    # time to first content or tool call delta
+    ttft_ms: Optional[float] = None
+    total_ms: float = 0.0
+    completion_tokens: int = 0
+    tokens_per_second: float = 0.0
+    cached: bool = False
+
+
+@dataclass
+class UsageRecord:
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+    team: Optional[str] = None
+    session_id: Optional[str] = None
+    tenant: Optional[str] = None
+    # pipeline step, see model_router
+    route: Optional[str] = None
+    created: float = field(default_factory=time.time)
+
+
+@dataclass
+class UsageTotals:
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    @property
+    def tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, record: UsageRecord):
+        self.calls += 1
+        self.prompt_tokens += record.prompt_tokens
+        self.completion_tokens += record.completion_tokens
+        self.cost += record.cost
+
+
+@dataclass
+class RouteAttempt:
+    route: str
+    model: str
+    # 0 for the route's own tier, n after n escalations
+    escalation: int
+    succeeded: bool = False
+    latency_ms: float = 0.0
+    cost: float = 0.0
+
+
+# p50/p95 are reported over the most recent attempts of a route
+MAX_ROUTE_LATENCIES = 1000
+
+
+@dataclass
+class RouteStats:
+    calls: int = 0
+    successes: int = 0
+    escalations: int = 0
+    cost: float = 0.0
+    latencies_ms: Deque[float] = field(
+        default_factory=lambda: deque(maxlen=MAX_ROUTE_LATENCIES)
+    )
+    map_model_to_calls: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, attempt: RouteAttempt):
+        self.calls += 1
+        self.successes += int(attempt.succeeded)
+        self.escalations += int(attempt.escalation > 0)
+        self.cost += attempt.cost
+        self.latencies_ms.append(attempt.latency_ms)
+        self.map_model_to_calls[attempt.model] = self.map_model_to_calls.get(attempt.model, 0) + 1
+
+
+@dataclass
+class SQLGenerationResult:
+    # path that produced the SQL run: tool_call, code_block or two_step
+    path: str
+    round_trips: int
+    latency_ms: float
+    # the fast path failed to parse and the two step flow took over
+    fell_back: bool = False
@@ -0,0 +1,108 @@
+"""
+Prebuild the schema index so the first prompt doesn't pay for embedding every table.
+
+Crawls the configured Postgres (DATABASE_URL) or Presto (PRESTO_*) database and
+writes table definitions, the foreign key graph, column profiles, size and
+index hints and the embedding index to a versioned directory under --index-dir (SCHEMA_INDEX_DIR).
+
+    poetry run index_schema --database postgres --index-dir .schema_index
+"""
+
+import argparse
+import os
+
+import dotenv
+import prestodb
+
+from da_ai_agent.modules import embeddings_postgres, embeddings_presto, schema_index
+from da_ai_agent.modules.db_postgres import PostgresManager
+from da_ai_agent.modules.db_presto import PrestoManager
+
+dotenv.load_dotenv()
+
+
+def get_presto_db_config() -> dict:
+    required_env_vars = ["PRESTO_HOST", "PRESTO_PORT", "PRESTO_USER", "PRESTO_CATALOG", "PRESTO_SCHEMA", "PRESTO_HTTP_SCHEME"]
+
+    for var in required_env_vars:
+        if not os.environ.get(var):
+            raise EnvironmentError(f"{var} not found in .env file")
+
+    presto_password = os.getenv("PRESTO_PASSWORD", None)
+    auth = prestodb.auth.BasicAuthentication(os.getenv("PRESTO_USER"), presto_password) if presto_password else None
+
+    return {
+        "host": os.getenv("PRESTO_HOST"),
+        "port": int(os.getenv("PRESTO_PORT")),
+        "user": os.getenv("PRESTO_USER"),
+        "catalog": os.getenv("PRESTO_CATALOG"),
+        "schema": os.getenv("PRESTO_SCHEMA"),
+        "http_scheme": os.getenv("PRESTO_HTTP_SCHEME"),
+        "auth": auth,
+    }
+
+
+def index_postgres(args) -> str:
+    assert os.environ.get("DATABASE_URL"), "POSTGRES_CONNECTION_URL not found in .env file"
+
+    with PostgresManager() as db:
+        db.connect_with_url(os.environ.get("DATABASE_URL"))
+
+        embedder = embeddings_postgres.DatabaseEmbedder(db, quantize=args.quantize_embeddings)
+        embedder.add_tables(db.get_table_definition_map_for_embeddings())
+        embedder.index_columns(with_profiles=not args.no_profiles)
+        embedder.load_size_hints()
+
+        return schema_index.save_index(
+            embedder,
+            args.index_dir,
+            schema_index.DATABASE_POSTGRES,
+            foreign_key_graph=db.get_foreign_key_graph(),
+        )
+
+
+def index_presto(args) -> str:
+    with PrestoManager() as db:
+        db.connect_with_url(get_presto_db_config())
+
+        embedder = embeddings_presto.DatabaseEmbedder(db, quantize=args.quantize_embeddings)
+        embedder.add_tables(db.get_table_definitions_map_for_embeddings())
+
+        # presto has no foreign keys, relationships live in custom_relationships_table
+        return schema_index.save_index(embedder, args.index_dir, schema_index.DATABASE_PRESTO)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--database",
+        choices=[schema_index.DATABASE_POSTGRES, schema_index.DATABASE_PRESTO],
+        default=schema_index.DATABASE_POSTGRES,
+    )
+    parser.add_argument(
+        "--index-dir",
+        default=os.environ.get("SCHEMA_INDEX_DIR", schema_index.DEFAULT_INDEX_DIR),
+        help="Directory the versioned index artifacts are written to",
+    )
+    parser.add_argument(
+        "--quantize-embeddings",
+        action="store_true",
+        help="Build vectors with the int8 model - load them with --quantize-embeddings too",
+    )
+    parser.add_argument(
+        "--no-profiles",
+        action="store_true",
+        help="Skip pg_stats column profiles",
+    )
+    args = parser.parse_args()
+
+    if args.database == schema_index.DATABASE_POSTGRES:
+        version_dir = index_postgres(args)
+    else:
+        version_dir = index_presto(args)
+
+    print(f"✅ Schema index written to {version_dir}")
+
+
+if __name__ == "__main__":
+    main()
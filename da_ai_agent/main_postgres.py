@@ -5,11 +5,18 @@ Heads up: in v7 pyautogen doesn't work with the latest openai version so this fi
 import os
 from da_ai_agent.agents.instruments import PostgresAgentInstruments
 from da_ai_agent.modules.db_postgres import PostgresManager
+from da_ai_agent.modules import cost_ledger
 from da_ai_agent.modules import llm
+from da_ai_agent.modules import model_router
 from da_ai_agent.modules import orchestrator
 from da_ai_agent.modules import rand
+from da_ai_agent.modules import rate_limit
 from da_ai_agent.modules import file
 from da_ai_agent.modules import embeddings_postgres
+from da_ai_agent.modules import schema_index
+from da_ai_agent.modules import schema_render
+from da_ai_agent.modules import schema_packing
+from da_ai_agent.modules import sql_cache
 from da_ai_agent.agents import agents_postgres
 import dotenv
 import argparse
@@ -42,6 +49,65 @@ def main():
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--prompt", help="The prompt for the AI")
+    parser.add_argument(
+        "--quantize-embeddings",
+        action="store_true",
+        help="Run the table embedding model with int8 quantization (faster on CPU)",
+    )
+    parser.add_argument(
+        "--max-columns",
+        type=int,
+        default=None,
+        help="Prune each table definition to its key columns plus the N most relevant columns",
+    )
+    parser.add_argument(
+        "--hybrid-retrieval",
+        action="store_true",
+        help="Rank tables with BM25 over identifiers fused with embedding similarity",
+    )
+    parser.add_argument(
+        "--pgvector-store",
+        action="store_true",
+        help="Keep table and column embeddings in a shared pgvector table",
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=None,
+        help="Max prompt tokens for table definitions - prunes columns, then drops the least relevant tables",
+    )
+    parser.add_argument(
+        "--schema-dialect",
+        choices=schema_render.DIALECTS,
+        default=schema_render.DIALECT_DDL,
+        help="How table definitions are rendered in the prompt",
+    )
+    parser.add_argument(
+        "--size-hints",
+        action="store_true",
+        help="Add row count estimates and indexed columns under each table definition",
+    )
+    parser.add_argument(
+        "--sql-cache",
+        default=os.environ.get("SQL_CACHE_PATH"),
+        help="Reuse SQL of earlier similar prompts, stored in this SQLite file",
+    )
+    parser.add_argument(
+        "--no-sql-cache",
+        action="store_true",
+        help="Bypass the SQL cache for this prompt - always generate SQL",
+    )
+    parser.add_argument(
+        "--sql-cache-threshold",
+        type=float,
+        default=None,
+        help="Min cosine similarity between prompts to reuse cached SQL - defaults to the threshold calibrated by scripts/calibrate_sql_cache.py",
+    )
+    parser.add_argument(
+        "--schema-index",
+        default=os.environ.get("SCHEMA_INDEX_DIR"),
+        help="Load the prebuilt schema index from this directory (see index_schema)",
+    )
     args = parser.parse_args()
 
     if not args.prompt:
@@ -54,24 +120,36 @@ def main():
 
     session_id = rand.generate_session_id(raw_prompt)
 
+    router = model_router.router_from_env()
+
     # ---------------- Create Agent Instruments And Build Database Connection ----------------
 
-    with PostgresAgentInstruments(DB_URL, session_id) as (agent_instruments, db):
+    # every llm.* call and agent reply in the block counts toward the session
+    with cost_ledger.scope(session_id=session_id), PostgresAgentInstruments(DB_URL, session_id) as (agent_instruments, db):
         # ----------- Gate Team: Prevent bad prompts from running and burning your $$$ -------------
 
-        gate_orchestrator = agents_postgres.build_team_orchestrator(
-            "scrum_master",
-            agent_instruments,
-            validate_results=lambda: (True, ""),
+        def run_gate_team(model: str) -> ConversationResult:
+            return agents_postgres.build_team_orchestrator(
+                "scrum_master",
+                agent_instruments,
+                validate_results=lambda: (True, ""),
+                model=model,
+            ).sequential_conversation(prompt)
+
+        # a reply that isn't a rank is retried one tier up
+        gate_result = router.run(
+            model_router.ROUTE_GATE,
+            run_gate_team,
+            succeeded=lambda result: result.last_message_str.strip().isdigit(),
         )
 
-        gate_orchestrator: ConversationResult = (
-            gate_orchestrator.sequential_conversation(prompt)
-        )
+        print("gate_result.last_message_str", gate_result.last_message_str)
 
-        print("gate_orchestrator.last_message_str", gate_orchestrator.last_message_str)
+        if not gate_result.last_message_str.strip().isdigit():
+            print("❌ Gate Team Rejected - Invalid response on every model")
+            return
 
-        nlq_confidence = int(gate_orchestrator.last_message_str)
+        nlq_confidence = int(gate_result.last_message_str)
 
         match nlq_confidence:
             case (1 | 2):
@@ -87,24 +165,80 @@ def main():
 
         map_table_name_to_table_def = db.get_table_definition_map_for_embeddings()
 
-        database_embedder = embeddings_postgres.DatabaseEmbedder()
+        database_embedder = embeddings_postgres.DatabaseEmbedder(
+            db,
+            quantize=args.quantize_embeddings,
+            use_pgvector=args.pgvector_store,
+            dialect=args.schema_dialect,
+            size_hints=args.size_hints,
+        )
 
-        for name, table_def in map_table_name_to_table_def.items():
-            database_embedder.add_table(name, table_def)
+        if args.schema_index:
+            schema_index.load_index(
+                database_embedder, args.schema_index, schema_index.DATABASE_POSTGRES
+            )
 
-        similar_tables = database_embedder.get_similar_tables(raw_prompt, n=5)
+        database_embedder.add_tables(map_table_name_to_table_def)
 
-        table_definitions = database_embedder.get_table_definitions_from_names(
-            similar_tables
+        table_candidates = database_embedder.get_table_candidates(
+            raw_prompt, n=5, hybrid=args.hybrid_retrieval, n_foreign=3
         )
 
-        related_table_names = db.get_related_tables(similar_tables, n=3)
+        for candidate in table_candidates:
+            print(
+                f"🔎 {candidate.table_name} ({candidate.score:.3f}, {'+'.join(candidate.sources)})"
+            )
 
-        core_and_related_table_definitions = (
-            database_embedder.get_table_definitions_from_names(
-                related_table_names + similar_tables
+        similar_tables = [
+            candidate.table_name
+            for candidate in table_candidates
+            if candidate.sources != [embeddings_postgres.SOURCE_FK]
+        ]
+
+        # deduplicated, core tables first then related tables
+        core_and_related_tables = [candidate.table_name for candidate in table_candidates]
+
+        if args.token_budget:
+            # with --max-columns every table is pruned up front, the budget only drops tables
+            n_columns = args.max_columns or embeddings_postgres.PACKING_N_COLUMNS
+            always_prune = args.max_columns is not None
+            packed_core = database_embedder.pack_table_definitions(
+                raw_prompt,
+                [
+                    candidate
+                    for candidate in table_candidates
+                    if candidate.sources != [embeddings_postgres.SOURCE_FK]
+                ],
+                args.token_budget,
+                n_columns,
+                always_prune,
+            )
+            packed_core_and_related = database_embedder.pack_table_definitions(
+                raw_prompt, table_candidates, args.token_budget, n_columns, always_prune
+            )
+            print(f"📦 Core tables {schema_packing.format_packing_report(packed_core)}")
+            print(
+                f"📦 Core + related tables {schema_packing.format_packing_report(packed_core_and_related)}"
+            )
+            table_definitions = packed_core.table_definitions
+            core_and_related_table_definitions = packed_core_and_related.table_definitions
+        else:
+            column_subsets = None
+            if args.max_columns:
+                database_embedder.index_columns()
+                column_subsets = database_embedder.get_similar_columns(
+                    raw_prompt, core_and_related_tables, args.max_columns
+                )
+
+            table_definitions = database_embedder.get_table_definitions_from_names(
+                similar_tables, column_subsets
+            )
+
+            core_and_related_table_definitions = (
+                database_embedder.get_table_definitions_from_names(
+                    core_and_related_tables, column_subsets
+                )
             )
-        )
 
         prompt = llm.add_cap_ref(
             prompt,
@@ -113,32 +247,77 @@ def main():
             table_definitions,
         )
 
-        # ----------- Data Eng Team: Based on a SQL table definitions and a prompt create an sql statement and execute it -------------
+        # ----------- SQL Cache: Reuse the SQL of an earlier, similar prompt -------------
 
-        data_eng_orchestrator = agents_postgres.build_team_orchestrator(
-            "data_eng",
-            agent_instruments,
-            validate_results=agent_instruments.validate_run_sql,
-        )
+        semantic_sql_cache = None
+        sql_cache_hit = None
+        cached_results = None
 
-        data_eng_conversation_result: ConversationResult = (
-            data_eng_orchestrator.sequential_conversation(prompt)
-        )
+        if args.sql_cache:
+            semantic_sql_cache = sql_cache.SemanticSQLCache(
+                database_embedder, args.sql_cache, threshold=args.sql_cache_threshold
+            )
+            sql_cache_hit = semantic_sql_cache.lookup(raw_prompt, bypass=args.no_sql_cache)
 
-        match data_eng_conversation_result:
-            case ConversationResult(
-                success=True, cost=data_eng_cost, tokens=data_eng_tokens
-            ):
-                print(
-                    f"✅ Orchestrator was successful. Team: {data_eng_orchestrator.name}"
-                )
-                print(
-                    f"💰📊🤖 {data_eng_orchestrator.name} Cost: {data_eng_cost}, tokens: {data_eng_tokens}"
-                )
-            case _:
-                print(
-                    f"❌ Orchestrator failed. Team: {data_eng_orchestrator.name} Failed"
-                )
+        if sql_cache_hit:
+            print(
+                f"⚡ SQL cache hit ({sql_cache_hit.similarity:.3f}) for '{sql_cache_hit.cached_prompt}' - skipping SQL generation"
+            )
+            try:
+                agent_instruments.run_sql(sql_cache_hit.sql)
+                with open(agent_instruments.run_sql_results_file) as f:
+                    cached_results = f.read()
+            except Exception as error:
+                print(f"❌ Cached SQL failed, generating new SQL: {error}")
+                db.roll_back()
+                semantic_sql_cache.flag_false_positive(sql_cache_hit)
+                sql_cache_hit = None
+
+        # ----------- Data Eng Team: Based on a SQL table definitions and a prompt create an sql statement and execute it -------------
+
+        if sql_cache_hit is None or sql_cache_hit.audit:
+            def run_data_eng_team(model: str) -> ConversationResult:
+                # a failed attempt may leave the transaction aborted
+                db.roll_back()
+                return agents_postgres.build_team_orchestrator(
+                    "data_eng",
+                    agent_instruments,
+                    validate_results=agent_instruments.validate_run_sql,
+                    model=model,
+                ).sequential_conversation(prompt)
+
+            # a stronger model takes over when the SQL doesn't validate
+            data_eng_conversation_result: ConversationResult = router.run(
+                model_router.ROUTE_SQL_GENERATION,
+                run_data_eng_team,
+                succeeded=lambda result: result.success,
+            )
+
+            match data_eng_conversation_result:
+                case ConversationResult(
+                    success=True, cost=data_eng_cost, tokens=data_eng_tokens
+                ):
+                    print(
+                        "✅ Orchestrator was successful. Team: data_eng_team"
+                    )
+                    print(
+                        f"💰📊🤖 data_eng_team Cost: {data_eng_cost}, tokens: {data_eng_tokens}"
+                    )
+                    if semantic_sql_cache and sql_cache_hit:
+                        with open(agent_instruments.run_sql_results_file) as f:
+                            agreed = sql_cache.results_match(f.read(), cached_results)
+                        semantic_sql_cache.record_audit(sql_cache_hit, agreed)
+                        print(f"🔍 SQL cache audit: {'agreed' if agreed else 'false positive, entry evicted'}")
+                    elif semantic_sql_cache:
+                        with open(agent_instruments.sql_query_file) as f:
+                            semantic_sql_cache.store(raw_prompt, f.read())
+                case _:
+                    print(
+                        "❌ Orchestrator failed. Team: data_eng_team Failed"
+                    )
+
+        if semantic_sql_cache:
+            print(f"⚡ SQL cache {semantic_sql_cache.stats()}")
 
         # ----------- Data Insights Team: Based on sql table definitions and a prompt generate novel insights -------------
 
@@ -151,33 +330,46 @@ def main():
             core_and_related_table_definitions,
         )
 
-        data_insights_orchestrator = agents_postgres.build_team_orchestrator(
-            "data_insights",
-            agent_instruments,
-            validate_results=agent_instruments.validate_innovation_files,
-        )
-
-        data_insights_conversation_result: ConversationResult = (
-            data_insights_orchestrator.round_robin_conversation(
-                insights_prompt, loops=1
+        def run_data_insights_team(model: str) -> ConversationResult:
+            return agents_postgres.build_team_orchestrator(
+                "data_insights",
+                agent_instruments,
+                validate_results=agent_instruments.validate_innovation_files,
+                model=model,
+            ).round_robin_conversation(insights_prompt, loops=1)
+
+        # insights are background work: the Insights agent's completions (llm.*) wait behind
+        # interactive requests in llm.request_scheduler. The reporter agent's autogen client
+        # doesn't go through the scheduler, see agent_config
+        with rate_limit.priority(rate_limit.PRIORITY_INSIGHTS):
+            data_insights_conversation_result: ConversationResult = router.run(
+                model_router.ROUTE_INSIGHTS,
+                run_data_insights_team,
+                succeeded=lambda result: result.success,
             )
-        )
 
         match data_insights_conversation_result:
             case ConversationResult(
                 success=True, cost=data_insights_cost, tokens=data_insights_tokens
             ):
                 print(
-                    f"✅ Orchestrator was successful. Team: {data_insights_orchestrator.name}"
+                    "✅ Orchestrator was successful. Team: data_insights_team"
                 )
                 print(
-                    f"💰📊🤖 {data_insights_orchestrator.name} Cost: {data_insights_cost}, tokens: {data_insights_tokens}"
+                    f"💰📊🤖 data_insights_team Cost: {data_insights_cost}, tokens: {data_insights_tokens}"
                 )
             case _:
                 print(
-                    f"❌ Orchestrator failed. Team: {data_insights_orchestrator.name} Failed"
+                    "❌ Orchestrator failed. Team: data_insights_team Failed"
                 )
 
+        print(f"🔀 Model routes\n{router.format_stats()}")
+
+        session_usage = llm.usage_ledger.map_session_to_totals[session_id]
+        print(
+            f"💰📊 Session cost: {session_usage.cost:.4f}, prompt tokens: {session_usage.prompt_tokens}, completion tokens: {session_usage.completion_tokens}"
+        )
+
 
 if __name__ == "__main__":
     main()
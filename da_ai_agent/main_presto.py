@@ -8,10 +8,13 @@ from da_ai_agent.agents import agents_presto
 from da_ai_agent.agents.instruments import PrestoAgentInstruments
 from da_ai_agent.modules.db_presto import PrestoManager
 from da_ai_agent.modules import llm
+from da_ai_agent.modules import model_router
 from da_ai_agent.modules import orchestrator
 from da_ai_agent.modules import rand
+from da_ai_agent.modules import rate_limit
 from da_ai_agent.modules import file
 from da_ai_agent.modules import embeddings_presto
+from da_ai_agent.modules import schema_index
 import prestodb
 import dotenv
 import argparse
@@ -55,6 +58,11 @@ def main():
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--prompt", help="The prompt for the AI")
+    parser.add_argument(
+        "--schema-index",
+        default=os.environ.get("SCHEMA_INDEX_DIR"),
+        help="Load the prebuilt schema index from this directory (see index_schema)",
+    )
     args = parser.parse_args()
 
     if not args.prompt:
@@ -67,6 +75,8 @@ def main():
 
     session_id = rand.generate_session_id(raw_prompt)
 
+    router = model_router.router_from_env()
+
     # ---------------- Create Agent Instruments And Build Database Connection ----------------
 
     with PrestoAgentInstruments(PRESTO_DB_CONFIG, session_id) as (agent_instruments, db):
@@ -74,19 +84,28 @@ def main():
 
         # ----------- Gate Team: Prevent bad prompts from running and burning your $$$ -------------
 
-        gate_orchestrator = agents_presto.build_team_orchestrator(
-            "scrum_master",
-            agent_instruments,
-            validate_results=lambda: (True, ""),
+        def run_gate_team(model: str) -> ConversationResult:
+            return agents_presto.build_team_orchestrator(
+                "scrum_master",
+                agent_instruments,
+                validate_results=lambda: (True, ""),
+                model=model,
+            ).sequential_conversation(prompt)
+
+        # a reply that isn't a rank is retried one tier up
+        gate_result = router.run(
+            model_router.ROUTE_GATE,
+            run_gate_team,
+            succeeded=lambda result: result.last_message_str.strip().isdigit(),
         )
 
-        gate_orchestrator: ConversationResult = (
-            gate_orchestrator.sequential_conversation(prompt)
-        )
+        print("gate_result.last_message_str", gate_result.last_message_str)
 
-        print("gate_orchestrator.last_message_str", gate_orchestrator.last_message_str)
+        if not gate_result.last_message_str.strip().isdigit():
+            print("❌ Gate Team Rejected - Invalid response on every model")
+            return
 
-        nlq_confidence = int(gate_orchestrator.last_message_str)
+        nlq_confidence = int(gate_result.last_message_str)
 
         match nlq_confidence:
             case (1 | 2):
@@ -100,12 +119,16 @@ def main():
 
         # -------- BUILD TABLE DEFINITIONS -----------
         # TODO: Set up table definitions so they work with PrestoDB db_presto.py file methods
-        map_table_name_to_table_def = db.get_table_definition_map_for_embeddings()
+        map_table_name_to_table_def = db.get_table_definitions_map_for_embeddings()
 
-        database_embedder = embeddings_presto.DatabaseEmbedder()
+        database_embedder = embeddings_presto.DatabaseEmbedder(db)
 
-        for name, table_def in map_table_name_to_table_def.items():
-            database_embedder.add_table(name, table_def)
+        if args.schema_index:
+            schema_index.load_index(
+                database_embedder, args.schema_index, schema_index.DATABASE_PRESTO
+            )
+
+        database_embedder.add_tables(map_table_name_to_table_def)
 
         similar_tables = database_embedder.get_similar_tables(raw_prompt, n=5)
 
@@ -130,14 +153,19 @@ def main():
 
         # ----------- Data Eng Team: Based on a SQL table definitions and a prompt create an sql statement and execute it -------------
 
-        data_eng_orchestrator = agents_presto.build_team_orchestrator(
-            "data_eng",
-            agent_instruments,
-            validate_results=agent_instruments.validate_run_sql,
-        )
-
-        data_eng_conversation_result: ConversationResult = (
-            data_eng_orchestrator.sequential_conversation(prompt)
+        def run_data_eng_team(model: str) -> ConversationResult:
+            return agents_presto.build_team_orchestrator(
+                "data_eng",
+                agent_instruments,
+                validate_results=agent_instruments.validate_run_sql,
+                model=model,
+            ).sequential_conversation(prompt)
+
+        # a stronger model takes over when the SQL doesn't validate
+        data_eng_conversation_result: ConversationResult = router.run(
+            model_router.ROUTE_SQL_GENERATION,
+            run_data_eng_team,
+            succeeded=lambda result: result.success,
         )
 
         match data_eng_conversation_result:
@@ -145,14 +173,14 @@ def main():
                 success=True, cost=data_eng_cost, tokens=data_eng_tokens
             ):
                 print(
-                    f"✅ Orchestrator was successful. Team: {data_eng_orchestrator.name}"
+                    "✅ Orchestrator was successful. Team: data_eng_team"
                 )
                 print(
-                    f"💰📊🤖 {data_eng_orchestrator.name} Cost: {data_eng_cost}, tokens: {data_eng_tokens}"
+                    f"💰📊🤖 data_eng_team Cost: {data_eng_cost}, tokens: {data_eng_tokens}"
                 )
             case _:
                 print(
-                    f"❌ Orchestrator failed. Team: {data_eng_orchestrator.name} Failed"
+                    "❌ Orchestrator failed. Team: data_eng_team Failed"
                 )
 
         # ----------- Data Insights Team: Based on sql table definitions and a prompt generate novel insights -------------
@@ -166,31 +194,35 @@ def main():
             core_and_related_table_definitions,
         )
 
-        data_insights_orchestrator = agents_presto.build_team_orchestrator(
-            "data_insights",
-            agent_instruments,
-            validate_results=agent_instruments.validate_innovation_files,
-        )
-
-        data_insights_conversation_result: ConversationResult = (
-            data_insights_orchestrator.round_robin_conversation(
-                insights_prompt, loops=1
+        def run_data_insights_team(model: str) -> ConversationResult:
+            return agents_presto.build_team_orchestrator(
+                "data_insights",
+                agent_instruments,
+                validate_results=agent_instruments.validate_innovation_files,
+                model=model,
+            ).round_robin_conversation(insights_prompt, loops=1)
+
+        # the Insights agent's completions wait behind interactive requests, see main_postgres
+        with rate_limit.priority(rate_limit.PRIORITY_INSIGHTS):
+            data_insights_conversation_result: ConversationResult = router.run(
+                model_router.ROUTE_INSIGHTS,
+                run_data_insights_team,
+                succeeded=lambda result: result.success,
             )
-        )
 
         match data_insights_conversation_result:
             case ConversationResult(
                 success=True, cost=data_insights_cost, tokens=data_insights_tokens
             ):
                 print(
-                    f"✅ Orchestrator was successful. Team: {data_insights_orchestrator.name}"
+                    "✅ Orchestrator was successful. Team: data_insights_team"
                 )
                 print(
-                    f"💰📊🤖 {data_insights_orchestrator.name} Cost: {data_insights_cost}, tokens: {data_insights_tokens}"
+                    f"💰📊🤖 data_insights_team Cost: {data_insights_cost}, tokens: {data_insights_tokens}"
                 )
             case _:
                 print(
-                    f"❌ Orchestrator failed. Team: {data_insights_orchestrator.name} Failed"
+                    "❌ Orchestrator failed. Team: data_insights_team Failed"
                 )
 
 
@@ -0,0 +1,176 @@
+"""
+Purpose:
+    Shared helpers for the retrieval benchmarks in scripts/.
+    Load labeled prompt sets, time calls and score ranked table lists.
+"""
+
+import json
+import time
+from typing import Callable, Dict, List, Tuple
+
+from da_ai_agent.data_types import LabeledPrompt, ParaphrasePair
+
+
+def load_labeled_prompts(fname: str) -> List[LabeledPrompt]:
+    """
+    Load a labeled prompt set.
+
+    Expected file format ("sql" is optional, used to score generated SQL):
+        [{"prompt": "how many users signed up last week", "tables": ["users"], "sql": "SELECT ..."}, ...]
+    """
+    with open(fname, "r") as f:
+        rows = json.load(f)
+
+    return [
+        LabeledPrompt(
+            prompt=row["prompt"],
+            expected_tables=row["tables"],
+            expected_sql=row.get("sql"),
+        )
+        for row in rows
+    ]
+
+
+def load_paraphrase_pairs(fname: str) -> List[ParaphrasePair]:
+    """
+    Load a paraphrase set for calibrating the semantic SQL cache.
+
+    Expected file format ("equivalent" - both prompts are answered by the same SQL):
+        [{"prompt": "top 5 customers by revenue", "paraphrase": "5 biggest customers by sales", "equivalent": true},
+         {"prompt": "top 5 customers by revenue", "paraphrase": "top 5 products by revenue", "equivalent": false}, ...]
+    """
+    with open(fname, "r") as f:
+        rows = json.load(f)
+
+    return [
+        ParaphrasePair(
+            prompt=row["prompt"],
+            paraphrase=row["paraphrase"],
+            equivalent=bool(row["equivalent"]),
+        )
+        for row in rows
+    ]
+
+
+def timed(func: Callable, *args, **kwargs) -> Tuple[object, float]:
+    """
+    Call func and return (result, elapsed milliseconds).
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return result, elapsed_ms
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile, pct in [0, 100].
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def recall_at_k(ranked_tables: List[str], expected_tables: List[str], k: int) -> float:
+    """
+    Fraction of the expected tables found in the top k ranked tables.
+    """
+    if not expected_tables:
+        return 1.0
+    top_k = set(ranked_tables[:k])
+    return sum(1 for table in expected_tables if table in top_k) / len(expected_tables)
+
+
+def reciprocal_rank(ranked_tables: List[str], expected_tables: List[str]) -> float:
+    """
+    1 / rank of the first expected table in the ranking, 0 if none is ranked.
+    """
+    expected = set(expected_tables)
+    for rank, table in enumerate(ranked_tables, start=1):
+        if table in expected:
+            return 1 / rank
+    return 0.0
+
+
+def mean_reciprocal_rank(
+    rankings: List[List[str]], labeled_prompts: List[LabeledPrompt]
+) -> float:
+    """
+    MRR over a labeled prompt set.
+    """
+    if not labeled_prompts:
+        return 0.0
+    return sum(
+        reciprocal_rank(ranked, labeled_prompt.expected_tables)
+        for ranked, labeled_prompt in zip(rankings, labeled_prompts)
+    ) / len(labeled_prompts)
+
+
+def save_labeled_prompts(fname: str, labeled_prompts: List[LabeledPrompt]):
+    """
+    Write a labeled prompt set in the format load_labeled_prompts reads.
+    """
+    rows = []
+    for labeled_prompt in labeled_prompts:
+        row = {"prompt": labeled_prompt.prompt, "tables": labeled_prompt.expected_tables}
+        if labeled_prompt.expected_sql:
+            row["sql"] = labeled_prompt.expected_sql
+        rows.append(row)
+
+    with open(fname, "w") as f:
+        json.dump(rows, f, indent=2)
+
+
+def overlap_at_k(ranked_a: List[str], ranked_b: List[str], k: int) -> float:
+    """
+    Fraction of the top k of ranked_a that also appears in the top k of ranked_b.
+    """
+    top_a = set(ranked_a[:k])
+    if not top_a:
+        return 1.0
+    return len(top_a & set(ranked_b[:k])) / len(top_a)
+
+
+def mean_recall_at_k(
+    rankings: List[List[str]], labeled_prompts: List[LabeledPrompt], k: int
+) -> float:
+    """
+    recall@k averaged over a labeled prompt set.
+    """
+    if not labeled_prompts:
+        return 0.0
+    return sum(
+        recall_at_k(ranked, labeled_prompt.expected_tables, k)
+        for ranked, labeled_prompt in zip(rankings, labeled_prompts)
+    ) / len(labeled_prompts)
+
+
+def min_k_for_recall(
+    rankings: List[List[str]],
+    labeled_prompts: List[LabeledPrompt],
+    target_recall: float,
+    max_k: int,
+) -> int:
+    """
+    Smallest k whose mean recall@k reaches target_recall, or -1 if none up to max_k.
+    """
+    for k in range(1, max_k + 1):
+        if mean_recall_at_k(rankings, labeled_prompts, k) >= target_recall:
+            return k
+    return -1
+
+
+def mean_prompt_tokens_at_k(
+    rankings: List[List[str]], map_name_to_tokens: Dict[str, int], k: int
+) -> float:
+    """
+    Average tokens of the table definitions sent to the model when sending the top k.
+    """
+    if not rankings:
+        return 0.0
+    return sum(
+        sum(map_name_to_tokens.get(name, 0) for name in ranked[:k])
+        for ranked in rankings
+    ) / len(rankings)
@@ -0,0 +1,86 @@
+"""
+Purpose:
+    Lexical BM25 index over table and column identifiers.
+    Score fusion helpers to combine lexical and embedding rankings.
+"""
+
+import math
+from collections import Counter
+from typing import Dict, List
+
+from da_ai_agent.modules.word_match import tokenize
+
+# reciprocal rank fusion damping constant, 60 is the value from the original paper
+RRF_K = 60
+
+
+class BM25Index:
+    """
+    Okapi BM25 over identifier tokens.
+    Identifiers are split on underscores and camelCase and singularized,
+    so 'customerOrders' in a prompt matches a 'customer_order_id' column.
+    """
+
+    def __init__(self, documents: Dict[str, str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.map_name_to_term_counts: Dict[str, Counter] = {}
+        self.map_name_to_length: Dict[str, int] = {}
+        document_frequency = Counter()
+
+        for name, text in documents.items():
+            tokens = tokenize(text)
+            term_counts = Counter(tokens)
+            self.map_name_to_term_counts[name] = term_counts
+            self.map_name_to_length[name] = len(tokens)
+            document_frequency.update(term_counts.keys())
+
+        n_documents = len(documents)
+        self.avg_length = (
+            sum(self.map_name_to_length.values()) / n_documents if n_documents else 0
+        )
+        self.idf = {
+            term: math.log(1 + (n_documents - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def score(self, query: str) -> Dict[str, float]:
+        """
+        BM25 score of every document with at least one query term.
+        """
+        scores = {}
+        query_terms = set(tokenize(query))
+
+        for name, term_counts in self.map_name_to_term_counts.items():
+            length_norm = self.k1 * (
+                1 - self.b + self.b * self.map_name_to_length[name] / (self.avg_length or 1)
+            )
+            score = 0.0
+            for term in query_terms:
+                tf = term_counts.get(term)
+                if not tf:
+                    continue
+                score += self.idf[term] * tf * (self.k1 + 1) / (tf + length_norm)
+            if score > 0:
+                scores[name] = score
+
+        return scores
+
+    def rank(self, query: str) -> List[str]:
+        scores = self.score(query)
+        return sorted(scores, key=lambda name: (-scores[name], name))
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[str]], weights: List[float] = None, k: int = RRF_K
+) -> Dict[str, float]:
+    """
+    Fuse several rankings into one score per item: sum(weight / (k + rank)).
+    Rank based, so BM25 and cosine scores don't need to share a scale.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, name in enumerate(ranking, start=1):
+            fused[name] = fused.get(name, 0.0) + weight / (k + rank)
+    return fused
@@ -0,0 +1,187 @@
+"""
+Purpose:
+    Usage and cost ledger built from the token usage the API reports.
+    Every call is priced for the model that actually served it, with separate
+    input and output rates, and rolled up per team, session, tenant, route and model
+    as it's recorded - no transcripts are re-tokenized.
+
+Example:
+    with cost_ledger.scope(team="data_eng", session_id=session_id):
+        llm.prompt(prompt)
+    print(llm.usage_ledger.map_team_to_totals["data_eng"].cost)
+"""
+
+import dataclasses
+import json
+import os
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from da_ai_agent.data_types import UsageRecord, UsageTotals
+
+# (input, output) USD per 1k tokens - https://openai.com/pricing
+map_model_to_price_per_1k_tokens: Dict[str, Tuple[float, float]] = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-32k": (0.06, 0.12),
+    "gpt-4-1106-preview": (0.01, 0.03),
+    "gpt-4-1106-vision-preview": (0.01, 0.03),
+    "gpt-3.5-turbo": (0.0015, 0.002),
+    "gpt-3.5-turbo-1106": (0.001, 0.002),
+}
+
+# priced like gpt-4 when the model is unknown, the conservative choice
+FALLBACK_PRICING_MODEL = "gpt-4"
+
+# most recent records kept in memory - the totals cover every record, the path file keeps them all
+DEFAULT_MAX_RECORDS = 1000
+
+current_scope: ContextVar[Dict[str, Optional[str]]] = ContextVar(
+    "usage_scope", default={}
+)
+# extra totals every record is also added to, see collect
+current_collectors: ContextVar[Tuple[UsageTotals, ...]] = ContextVar(
+    "usage_collectors", default=()
+)
+
+
+@contextmanager
+def scope(**labels: Optional[str]):
+    """
+    Attribute the usage recorded inside the block to a team, session_id, tenant and/or route.
+    Nested scopes inherit the labels they don't override.
+    """
+    token = current_scope.set({**current_scope.get(), **labels})
+    try:
+        yield
+    finally:
+        current_scope.reset(token)
+
+
+@contextmanager
+def collect(totals: UsageTotals):
+    """
+    Also add the usage recorded inside the block to totals, e.g. one orchestrator's own count.
+    """
+    token = current_collectors.set(current_collectors.get() + (totals,))
+    try:
+        yield
+    finally:
+        current_collectors.reset(token)
+
+
+def resolve_pricing_model(model: str) -> str:
+    """
+    'gpt-4-0613' -> 'gpt-4', 'gpt-3.5-turbo-16k-0613' -> 'gpt-3.5-turbo'
+    Longest known model name the served model starts with.
+    """
+    if model in map_model_to_price_per_1k_tokens:
+        return model
+    matches = [name for name in map_model_to_price_per_1k_tokens if model and model.startswith(name)]
+    return max(matches, key=len) if matches else FALLBACK_PRICING_MODEL
+
+
+def price(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    input_price, output_price = map_model_to_price_per_1k_tokens[resolve_pricing_model(model)]
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1000
+
+
+def read_usage(usage: Any) -> Tuple[int, int]:
+    """
+    (prompt_tokens, completion_tokens) of a usage dict or object.
+    """
+    if usage is None:
+        return 0, 0
+    if isinstance(usage, dict):
+        return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0
+    return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+
+
+class CostLedger:
+    """
+    Records one UsageRecord per API call, totals are updated in O(1) per record.
+    Only the last max_records records are kept, so a long running server stays
+    bounded. Set path to also append every record to a jsonl file.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_records: int = DEFAULT_MAX_RECORDS):
+        self.path = path
+        self.lock = threading.Lock()
+        self.records: Deque[UsageRecord] = deque(maxlen=max_records)
+        self.totals = UsageTotals()
+        self.map_team_to_totals: Dict[str, UsageTotals] = defaultdict(UsageTotals)
+        self.map_session_to_totals: Dict[str, UsageTotals] = defaultdict(UsageTotals)
+        self.map_tenant_to_totals: Dict[str, UsageTotals] = defaultdict(UsageTotals)
+        self.map_route_to_totals: Dict[str, UsageTotals] = defaultdict(UsageTotals)
+        self.map_model_to_totals: Dict[str, UsageTotals] = defaultdict(UsageTotals)
+
+    def record(
+        self, model: str, prompt_tokens: int, completion_tokens: int, **labels: Optional[str]
+    ) -> UsageRecord:
+        """
+        Record the usage of one call. Labels (team, session_id, tenant, route) default to the current scope.
+        """
+        labels = {**current_scope.get(), **labels}
+        record = UsageRecord(
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost=price(model, prompt_tokens, completion_tokens),
+            team=labels.get("team"),
+            session_id=labels.get("session_id"),
+            tenant=labels.get("tenant"),
+            route=labels.get("route"),
+        )
+
+        with self.lock:
+            self.records.append(record)
+            self.totals.add(record)
+            self.map_model_to_totals[model].add(record)
+            if record.team:
+                self.map_team_to_totals[record.team].add(record)
+            if record.session_id:
+                self.map_session_to_totals[record.session_id].add(record)
+            if record.tenant:
+                self.map_tenant_to_totals[record.tenant].add(record)
+            if record.route:
+                self.map_route_to_totals[record.route].add(record)
+            for totals in current_collectors.get():
+                totals.add(record)
+
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(dataclasses.asdict(record)) + "\n")
+
+        return record
+
+    def record_response(self, response: Dict[str, Any], **labels: Optional[str]) -> Optional[UsageRecord]:
+        """
+        Record a chat completion response (dict). None when it carries no usage.
+        """
+        usage = response.get("usage")
+        if not usage:
+            return None
+        prompt_tokens, completion_tokens = read_usage(usage)
+        return self.record(response.get("model"), prompt_tokens, completion_tokens, **labels)
+
+    def summary(self) -> Dict[str, Any]:
+        def as_dict(totals: UsageTotals):
+            return {**dataclasses.asdict(totals), "cost": round(totals.cost, 4)}
+
+        return {
+            "total": as_dict(self.totals),
+            "teams": {name: as_dict(totals) for name, totals in self.map_team_to_totals.items()},
+            "sessions": {name: as_dict(totals) for name, totals in self.map_session_to_totals.items()},
+            "tenants": {name: as_dict(totals) for name, totals in self.map_tenant_to_totals.items()},
+            "routes": {name: as_dict(totals) for name, totals in self.map_route_to_totals.items()},
+            "models": {name: as_dict(totals) for name, totals in self.map_model_to_totals.items()},
+        }
+
+
+def ledger_from_env() -> CostLedger:
+    """
+    Ledger that also appends records to LLM_LEDGER_PATH (jsonl) when set.
+    """
+    return CostLedger(os.environ.get("LLM_LEDGER_PATH"))
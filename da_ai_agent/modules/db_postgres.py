@@ -2,6 +2,10 @@ from datetime import datetime
 import json
 import psycopg2
 from psycopg2.sql import SQL, Identifier
+from typing import Dict, List, Tuple
+
+from da_ai_agent.data_types import ColumnSchema
+from da_ai_agent.modules import schema_render
 
 
 class PostgresManager:
@@ -54,9 +58,12 @@ class PostgresManager:
             return obj.isoformat()
         return str(obj)  # or just return the object unchanged, or another default value
 
-    def get_table_definition(self, table_name):
+    def get_table_definition(
+        self, table_name, dialect=schema_render.DIALECT_DDL, notes: List[str] = None
+    ):
         """
         Generate the 'create' definition for a table
+        notes - extra comment lines, see get_table_notes
         """
 
         get_def_stmt = """
@@ -73,83 +80,382 @@ class PostgresManager:
         """
         self.cur.execute(get_def_stmt, (table_name,))
         rows = self.cur.fetchall()
-        create_table_stmt = "CREATE TABLE {} (\n".format(table_name)
-        for row in rows:
-            create_table_stmt += "{} {},\n".format(row[2], row[3])
-        create_table_stmt = create_table_stmt.rstrip(",\n") + "\n);"
-        return create_table_stmt
+        columns = [ColumnSchema(table_name, row[2], row[3]) for row in rows]
+        return schema_render.render_table(table_name, columns, dialect, notes=notes)
 
     def get_all_table_names(self):
         """
-        Get all table names in the database
+        Get all table names in the database.
+        Partitions and inheritance children are left out - they are described
+        by a partition summary on their parent, see get_partition_summaries.
+        """
+        get_all_tables_stmt = """
+        SELECT tablename
+        FROM pg_tables
+        WHERE schemaname = 'public'
+            AND NOT EXISTS (
+                SELECT 1
+                FROM pg_inherits
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                JOIN pg_namespace ns ON ns.oid = child.relnamespace
+                WHERE child.relname = pg_tables.tablename
+                    AND ns.nspname = 'public'
+            );
         """
-        get_all_tables_stmt = (
-            "SELECT tablename FROM pg_tables WHERE schemaname = 'public';"
-        )
         self.cur.execute(get_all_tables_stmt)
         return [row[0] for row in self.cur.fetchall()]
 
-    def get_table_definitions_for_prompt(self):
+    def get_partition_summaries(self) -> Dict[str, str]:
+        """
+        One line summary of the partitions / inheritance children of every parent table.
+        Nested partitions are counted under their top level parent.
+
+        {'events': 'partitioned by RANGE (created_at), 36 partitions: events_2021_01 .. events_2023_12'}
+        """
+        self.cur.execute(
+            """
+            SELECT parent.relname, child.relname, pg_get_partkeydef(parent.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+            WHERE ns.nspname = 'public'
+                -- partitioned indexes are in pg_inherits too
+                AND parent.relkind IN ('r', 'p')
+            ORDER BY parent.relname, child.relname;
+            """
+        )
+        rows = self.cur.fetchall()
+
+        map_child_to_parent = {child: parent for parent, child, _ in rows}
+        map_parent_to_partition_key = {parent: key for parent, _, key in rows}
+
+        def root_of(table_name):
+            while table_name in map_child_to_parent:
+                table_name = map_child_to_parent[table_name]
+            return table_name
+
+        map_root_to_children = {}
+        for parent, child, _ in rows:
+            map_root_to_children.setdefault(root_of(parent), []).append(child)
+
+        summaries = {}
+        for root, children in map_root_to_children.items():
+            children = sorted(children)
+            span = children[0] if len(children) == 1 else f"{children[0]} .. {children[-1]}"
+            partition_key = map_parent_to_partition_key.get(root)
+            if partition_key:
+                summaries[root] = f"partitioned by {partition_key}, {len(children)} partitions: {span}"
+            else:
+                summaries[root] = f"{len(children)} inheritance children: {span}"
+        return summaries
+
+    def get_partition_roots(self) -> Dict[str, str]:
+        """
+        Top level parent of every partition / inheritance child.
+
+        {'events_2023_01': 'events', 'events_2023_01_eu': 'events'}
+        """
+        self.cur.execute(
+            """
+            SELECT parent.relname, child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+            WHERE ns.nspname = 'public'
+                AND parent.relkind IN ('r', 'p');
+            """
+        )
+        map_child_to_parent = {child: parent for parent, child in self.cur.fetchall()}
+
+        map_child_to_root = {}
+        for child in map_child_to_parent:
+            root = child
+            while root in map_child_to_parent:
+                root = map_child_to_parent[root]
+            map_child_to_root[child] = root
+        return map_child_to_root
+
+    def get_table_notes(self) -> Dict[str, List[str]]:
+        """
+        Comment lines rendered under each table definition.
+        """
+        return {
+            table_name: [summary]
+            for table_name, summary in self.get_partition_summaries().items()
+        }
+
+    def get_table_size_estimates(self) -> Dict[str, Tuple[int, int]]:
+        """
+        (estimated rows, pages) per table from the planner statistics in pg_class.
+        Partitions and inheritance children are summed into their top level parent.
+        Tables that were never analyzed report 0 rows.
+        """
+        self.cur.execute(
+            """
+            SELECT pg_class.relname,
+                GREATEST(pg_class.reltuples, 0)::bigint,
+                pg_class.relpages,
+                pg_inherits.inhparent::regclass::text
+            FROM pg_class
+            JOIN pg_namespace ON pg_namespace.oid = pg_class.relnamespace
+            LEFT JOIN pg_inherits ON pg_inherits.inhrelid = pg_class.oid
+            WHERE pg_class.relkind IN ('r', 'p')
+                AND pg_namespace.nspname = 'public';
+            """
+        )
+        rows = self.cur.fetchall()
+        map_child_to_parent = {name: parent for name, _, _, parent in rows if parent}
+
+        estimates = {}
+        for table_name, reltuples, relpages, _ in rows:
+            while table_name in map_child_to_parent:
+                table_name = map_child_to_parent[table_name]
+            n_rows, n_pages = estimates.get(table_name, (0, 0))
+            estimates[table_name] = (n_rows + reltuples, n_pages + relpages)
+        return estimates
+
+    def get_index_definitions(self) -> Dict[str, List[Tuple[List[str], bool, bool]]]:
+        """
+        (indexed columns, is unique, is primary) for every index of every table.
+        Expression indexes list the expression instead of column names.
+
+        {'orders': [(['id'], True, True), (['customer_id', 'created_at'], False, False)]}
+        """
+        self.cur.execute(
+            """
+            SELECT tbl.relname,
+                ARRAY(
+                    SELECT COALESCE(att.attname, pg_get_indexdef(idx.indexrelid, key.ord::int, true))
+                    FROM unnest(idx.indkey) WITH ORDINALITY AS key(attnum, ord)
+                    LEFT JOIN pg_attribute att
+                        ON att.attrelid = tbl.oid AND att.attnum = key.attnum AND key.attnum > 0
+                    ORDER BY key.ord
+                ),
+                idx.indisunique,
+                idx.indisprimary
+            FROM pg_index idx
+            JOIN pg_class tbl ON tbl.oid = idx.indrelid
+            JOIN pg_namespace ns ON ns.oid = tbl.relnamespace
+            WHERE ns.nspname = 'public'
+                AND tbl.relkind IN ('r', 'p')
+                AND NOT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = tbl.oid)
+            ORDER BY tbl.relname, idx.indisprimary DESC, idx.indexrelid;
+            """
+        )
+
+        map_table_name_to_indexes = {}
+        for table_name, columns, is_unique, is_primary in self.cur.fetchall():
+            map_table_name_to_indexes.setdefault(table_name, []).append(
+                (list(columns), is_unique, is_primary)
+            )
+        return map_table_name_to_indexes
+
+    def get_table_size_hints(self) -> Dict[str, str]:
+        """
+        Compact size and index hint per table, for the prompt.
+
+        {'events': '~12M rows, indexed: (id) pk, (user_id), (created_at)'}
+        """
+        estimates = self.get_table_size_estimates()
+        indexes = self.get_index_definitions()
+        return {
+            table_name: schema_render.format_size_hint(n_rows, indexes.get(table_name, []))
+            for table_name, (n_rows, _) in estimates.items()
+        }
+
+    def get_table_definitions_for_prompt(self, dialect=schema_render.DIALECT_DDL):
         """
         Get all table 'create' definitions in the database
         """
         table_names = self.get_all_table_names()
+        map_table_name_to_notes = self.get_table_notes()
         definitions = []
         for table_name in table_names:
-            definitions.append(self.get_table_definition(table_name))
-        return "\n\n".join(definitions)
+            definitions.append(
+                self.get_table_definition(
+                    table_name, dialect, map_table_name_to_notes.get(table_name)
+                )
+            )
+        return schema_render.table_separator(dialect).join(definitions)
 
     def get_table_definition_map_for_embeddings(self):
         """
         Creates a map of table names to table definitions
         """
         table_names = self.get_all_table_names()
+        map_table_name_to_notes = self.get_table_notes()
         definitions = {}
         for table_name in table_names:
-            definitions[table_name] = self.get_table_definition(table_name)
+            definitions[table_name] = self.get_table_definition(
+                table_name, notes=map_table_name_to_notes.get(table_name)
+            )
         return definitions
 
+    def get_all_table_columns(self) -> Dict[str, List[ColumnSchema]]:
+        """
+        Get the columns of every table in the database in a single query
+        """
+        self.cur.execute(
+            """
+            SELECT pg_class.relname,
+                pg_attribute.attname,
+                format_type(atttypid, atttypmod)
+            FROM pg_class
+            JOIN pg_namespace ON pg_namespace.oid = pg_class.relnamespace
+            JOIN pg_attribute ON pg_attribute.attrelid = pg_class.oid
+            WHERE pg_attribute.attnum > 0
+                AND NOT pg_attribute.attisdropped
+                AND pg_class.relkind IN ('r', 'p')
+                AND pg_namespace.nspname = 'public'
+                -- partitions and inheritance children share their parent's columns
+                AND NOT EXISTS (
+                    SELECT 1 FROM pg_inherits WHERE pg_inherits.inhrelid = pg_class.oid
+                )
+            ORDER BY pg_class.relname, pg_attribute.attnum;
+            """
+        )
+
+        map_table_name_to_columns = {}
+        for table_name, column_name, data_type in self.cur.fetchall():
+            map_table_name_to_columns.setdefault(table_name, []).append(
+                ColumnSchema(table_name, column_name, data_type)
+            )
+        return map_table_name_to_columns
+
+    def get_all_key_columns(self) -> Dict[str, List[str]]:
+        """
+        Get the primary key and foreign key columns of every table.
+        Keys of partitions and inheritance children are listed under their top level parent.
+        """
+        self.cur.execute(
+            """
+            SELECT DISTINCT cls.relname, att.attname
+            FROM pg_constraint con
+            JOIN pg_class cls ON cls.oid = con.conrelid
+            JOIN pg_namespace ns ON ns.oid = cls.relnamespace
+            JOIN pg_attribute att
+                ON att.attrelid = con.conrelid AND att.attnum = ANY(con.conkey)
+            WHERE con.contype IN ('p', 'f')
+                AND ns.nspname = 'public';
+            """
+        )
+
+        rows = self.cur.fetchall()
+        map_child_to_root = self.get_partition_roots()
+
+        map_table_name_to_key_columns = {}
+        for table_name, column_name in rows:
+            key_columns = map_table_name_to_key_columns.setdefault(
+                map_child_to_root.get(table_name, table_name), []
+            )
+            if column_name not in key_columns:
+                key_columns.append(column_name)
+        return map_table_name_to_key_columns
+
+    def get_column_profiles(self) -> Dict[Tuple[str, str], str]:
+        """
+        Short per-column hints built from planner statistics (pg_stats).
+        Cheap - reads ANALYZE results instead of scanning the tables.
+
+        {('orders', 'status'): "4 distinct values, e.g. shipped, pending, cancelled"}
+        """
+        self.cur.execute(
+            """
+            SELECT tablename, attname, n_distinct, most_common_vals::text
+            FROM pg_stats
+            WHERE schemaname = 'public';
+            """
+        )
+
+        profiles = {}
+        for table_name, column_name, n_distinct, common_vals in self.cur.fetchall():
+            hints = []
+            if n_distinct == -1:
+                hints.append("unique")
+            elif n_distinct and n_distinct > 0:
+                hints.append(f"{int(n_distinct)} distinct values")
+            if common_vals:
+                examples = common_vals.strip("{}").split(",")[:3]
+                hints.append("e.g. " + ", ".join(v.strip('"') for v in examples))
+            if hints:
+                profiles[(table_name, column_name)] = ", ".join(hints)
+        return profiles
+
+    def get_foreign_key_graph(self) -> Dict[str, List[str]]:
+        """
+        Every foreign key relationship in one query, as an undirected adjacency list.
+
+        {'orders': ['customers', 'order_items'], ...}
+        """
+        self.cur.execute(
+            """
+            SELECT DISTINCT src.relname, dst.relname
+            FROM pg_constraint con
+            JOIN pg_class src ON src.oid = con.conrelid
+            JOIN pg_class dst ON dst.oid = con.confrelid
+            JOIN pg_namespace ns ON ns.oid = src.relnamespace
+            WHERE con.contype = 'f'
+                AND ns.nspname = 'public'
+                -- foreign keys of a partitioned table are cloned onto every partition
+                AND NOT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid IN (src.oid, dst.oid));
+            """
+        )
+
+        graph = {}
+        for table_name, referenced_table_name in self.cur.fetchall():
+            graph.setdefault(table_name, set()).add(referenced_table_name)
+            graph.setdefault(referenced_table_name, set()).add(table_name)
+        return {table_name: sorted(related) for table_name, related in sorted(graph.items())}
+
     def get_related_tables(self, table_list, n=2):
         """
         Get tables that have foreign keys referencing the given table
+        Partitions and inheritance children are replaced by their top level parent.
         """
 
+        map_child_to_root = self.get_partition_roots()
+
+        def top_n(table_names):
+            # children map onto their parent before the limit, so they can't push it out
+            roots = {map_child_to_root.get(name, name) for name in table_names}
+            return sorted(roots)[:n]
+
         related_tables_dict = {}
 
         for table in table_list:
             # Query to fetch tables that have foreign keys referencing the given table
             self.cur.execute(
                 """
-                SELECT 
+                SELECT DISTINCT
                     a.relname AS table_name
                 FROM 
                     pg_constraint con 
                     JOIN pg_class a ON a.oid = con.conrelid 
                 WHERE 
-                    confrelid = (SELECT oid FROM pg_class WHERE relname = %s)
-                LIMIT %s;
+                    confrelid = (SELECT oid FROM pg_class WHERE relname = %s);
                 """,
-                (table, n),
+                (table,),
             )
 
-            related_tables = [row[0] for row in self.cur.fetchall()]
+            related_tables = top_n(row[0] for row in self.cur.fetchall())
 
             # Query to fetch tables that the given table references
             self.cur.execute(
                 """
-                SELECT 
+                SELECT DISTINCT
                     a.relname AS referenced_table_name
                 FROM 
                     pg_constraint con 
                     JOIN pg_class a ON a.oid = con.confrelid 
                 WHERE 
-                    conrelid = (SELECT oid FROM pg_class WHERE relname = %s)
-                LIMIT %s;
+                    conrelid = (SELECT oid FROM pg_class WHERE relname = %s);
                 """,
-                (table, n),
+                (table,),
             )
 
-            related_tables += [row[0] for row in self.cur.fetchall()]
+            related_tables += top_n(row[0] for row in self.cur.fetchall())
 
             related_tables_dict[table] = related_tables
 
@@ -158,6 +464,10 @@ class PostgresManager:
         for table, related_tables in related_tables_dict.items():
             related_tables_list += related_tables
 
-        related_tables_list = list(set(related_tables_list))
+        # sorted so the same tables always come back in the same order
+        related_tables_list = sorted(set(related_tables_list))
 
         return related_tables_list
+
+    def roll_back(self):
+        self.conn.rollback()
@@ -2,6 +2,8 @@ import json
 import prestodb
 from datetime import datetime
 
+from da_ai_agent.modules import schema_render
+
 
 class PrestoManager:
     """
@@ -105,15 +107,22 @@ class PrestoManager:
 
         return table_definition
 
-    def get_table_definitions_for_prompt(self):
+    def get_table_definitions_for_prompt(self, dialect=schema_render.DIALECT_LINES):
         """
         Get all table 'create' definitions in the PrestoDB database
         """
         table_names = self.get_all_table_names()
         definitions = []
         for table_name in table_names:
-            definitions.append(self.get_table_definition(table_name))
-        return "\n\n".join(definitions)
+            map_column_to_type = self.get_table_definition(table_name)[table_name]
+            definitions.append(
+                schema_render.render_table(
+                    table_name,
+                    schema_render.columns_from_mapping(table_name, map_column_to_type),
+                    dialect,
+                )
+            )
+        return schema_render.table_separator(dialect).join(definitions)
 
     def get_table_definitions_map_for_embeddings(self):
         """
@@ -0,0 +1,215 @@
+"""
+Purpose:
+    Keep table and column embeddings in a pgvector table inside the analytics
+    Postgres database instead of per-process dicts.
+
+    - Many app servers share one index, no per-process warmup
+    - Top-k similarity search runs in SQL against an HNSW index
+    - Upserts are incremental: only rows whose content hash changed are rewritten
+"""
+
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from psycopg2.sql import SQL, Identifier
+
+from da_ai_agent.modules.db_postgres import PostgresManager
+
+# own schema - schema introspection only reads 'public', so the store never
+# shows up as a table of the analytics database
+DEFAULT_STORE_SCHEMA = "da_ai_agent"
+DEFAULT_STORE_TABLE = "embeddings"
+
+# where earlier versions kept the store, moved into DEFAULT_STORE_SCHEMA on first use
+LEGACY_STORE_TABLE = "da_ai_agent_embeddings"
+BERT_DIMENSIONS = 768
+
+
+def hash_text(text: str) -> str:
+    """
+    Stable content hash used to detect changed table and column definitions.
+    """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def to_vector_literal(embedding) -> str:
+    """
+    numpy vector -> pgvector text literal '[0.1,0.2,...]'
+    """
+    return "[" + ",".join(f"{float(x):.6f}" for x in embedding) + "]"
+
+
+class PgVectorEmbeddingStore:
+    """
+    pgvector backed store for DatabaseEmbedder.
+
+    Rows are keyed on (kind, table_name, column_name, model):
+        kind='table'  - whole table definition, column_name=''
+        kind='column' - a single column of a table
+    """
+
+    def __init__(
+        self,
+        db: PostgresManager,
+        model: str,
+        store_table: str = DEFAULT_STORE_TABLE,
+        store_schema: str = DEFAULT_STORE_SCHEMA,
+        dimensions: int = BERT_DIMENSIONS,
+    ):
+        self.db = db
+        self.model = model
+        self.store_table = store_table
+        self.store_schema = store_schema
+        self.dimensions = dimensions
+        self.ensure_schema()
+
+    def ensure_schema(self):
+        """
+        Create the extension, schema, table and HNSW cosine index if they don't exist.
+        """
+        table = self.table_identifier()
+        index = Identifier(f"{self.store_table}_embedding_idx")
+        self.db.cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        self.db.cur.execute(
+            SQL("CREATE SCHEMA IF NOT EXISTS {};").format(Identifier(self.store_schema))
+        )
+        self.move_legacy_store()
+        self.db.cur.execute(
+            SQL(
+                """
+                CREATE TABLE IF NOT EXISTS {} (
+                    kind text NOT NULL,
+                    table_name text NOT NULL,
+                    column_name text NOT NULL DEFAULT '',
+                    model text NOT NULL,
+                    content_hash text NOT NULL,
+                    embedding vector({}) NOT NULL,
+                    updated_at timestamptz NOT NULL DEFAULT now(),
+                    PRIMARY KEY (kind, table_name, column_name, model)
+                );
+                """
+            ).format(table, SQL(str(int(self.dimensions))))
+        )
+        self.db.cur.execute(
+            SQL(
+                "CREATE INDEX IF NOT EXISTS {} ON {} USING hnsw (embedding vector_cosine_ops);"
+            ).format(index, table)
+        )
+        self.db.conn.commit()
+
+    def move_legacy_store(self):
+        """
+        Move public.da_ai_agent_embeddings into the store schema, so it stops
+        being introspected as an analytics table. Kept as is if the store already exists.
+        """
+        self.db.cur.execute(
+            "SELECT to_regclass(%s), to_regclass(%s);",
+            (f"public.{LEGACY_STORE_TABLE}", f"{self.store_schema}.{self.store_table}"),
+        )
+        legacy, current = self.db.cur.fetchone()
+        if not legacy or current:
+            return
+        self.db.cur.execute(
+            SQL("ALTER TABLE {} SET SCHEMA {};").format(
+                Identifier("public", LEGACY_STORE_TABLE), Identifier(self.store_schema)
+            )
+        )
+        self.db.cur.execute(
+            SQL("ALTER TABLE {} RENAME TO {};").format(
+                Identifier(self.store_schema, LEGACY_STORE_TABLE), Identifier(self.store_table)
+            )
+        )
+        self.db.cur.execute(
+            SQL("ALTER INDEX IF EXISTS {} RENAME TO {};").format(
+                Identifier(self.store_schema, f"{LEGACY_STORE_TABLE}_embedding_idx"),
+                Identifier(f"{self.store_table}_embedding_idx"),
+            )
+        )
+        print(f"✅ Moved public.{LEGACY_STORE_TABLE} to {self.store_schema}.{self.store_table}")
+
+    def table_identifier(self) -> Identifier:
+        return Identifier(self.store_schema, self.store_table)
+
+    def get_content_hashes(self, kind: str) -> Dict[Tuple[str, str], str]:
+        """
+        {(table_name, column_name): content_hash} for every stored row of a kind
+        """
+        self.db.cur.execute(
+            SQL(
+                "SELECT table_name, column_name, content_hash FROM {} WHERE kind = %s AND model = %s;"
+            ).format(self.table_identifier()),
+            (kind, self.model),
+        )
+        return {(row[0], row[1]): row[2] for row in self.db.cur.fetchall()}
+
+    def upsert(self, kind: str, rows: List[Tuple[str, str, str, object]]):
+        """
+        Insert or update (table_name, column_name, content_hash, embedding) rows.
+        """
+        if not rows:
+            return
+        stmt = SQL(
+            """
+            INSERT INTO {} (kind, table_name, column_name, model, content_hash, embedding)
+            VALUES (%s, %s, %s, %s, %s, %s::vector)
+            ON CONFLICT (kind, table_name, column_name, model) DO UPDATE
+            SET content_hash = EXCLUDED.content_hash,
+                embedding = EXCLUDED.embedding,
+                updated_at = now();
+            """
+        ).format(self.table_identifier())
+        self.db.cur.executemany(
+            stmt,
+            [
+                (kind, table_name, column_name, self.model, content_hash, to_vector_literal(emb))
+                for table_name, column_name, content_hash, emb in rows
+            ],
+        )
+        self.db.conn.commit()
+
+    def delete(self, kind: str, keys: Iterable[Tuple[str, str]]):
+        """
+        Delete rows by (table_name, column_name).
+        """
+        keys = list(keys)
+        if not keys:
+            return
+        self.db.cur.executemany(
+            SQL(
+                "DELETE FROM {} WHERE kind = %s AND model = %s AND table_name = %s AND column_name = %s;"
+            ).format(self.table_identifier()),
+            [(kind, self.model, table_name, column_name) for table_name, column_name in keys],
+        )
+        self.db.conn.commit()
+
+    def search(
+        self,
+        query_embedding,
+        n: int,
+        kind: str = "table",
+        table_name: Optional[str] = None,
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Top 'n' rows by cosine similarity, computed in SQL.
+        Returns [(table_name, column_name, similarity), ...]
+        """
+        vector = to_vector_literal(query_embedding)
+        table_filter = SQL("AND table_name = %s") if table_name else SQL("")
+        params = [vector, kind, self.model]
+        if table_name:
+            params.append(table_name)
+        params += [vector, n]
+
+        self.db.cur.execute(
+            SQL(
+                """
+                SELECT table_name, column_name, 1 - (embedding <=> %s::vector) AS similarity
+                FROM {}
+                WHERE kind = %s AND model = %s {}
+                ORDER BY embedding <=> %s::vector
+                LIMIT %s;
+                """
+            ).format(self.table_identifier(), table_filter),
+            params,
+        )
+        return [(row[0], row[1], float(row[2])) for row in self.db.cur.fetchall()]
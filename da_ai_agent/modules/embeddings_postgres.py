@@ -1,7 +1,42 @@
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
-from transformers import BertTokenizer, BertModel
 
+from da_ai_agent.data_types import (
+    ColumnSchema,
+    PackedSchema,
+    SchemaCandidate,
+    TableCandidate,
+)
+from da_ai_agent.modules import bert, schema_diff, schema_packing, schema_render
+from da_ai_agent.modules.bm25 import RRF_K, BM25Index, reciprocal_rank_fusion
 from da_ai_agent.modules.db_postgres import PostgresManager
+from da_ai_agent.modules.embedding_store_pgvector import PgVectorEmbeddingStore, hash_text
+from da_ai_agent.modules.lru_cache import LRUCache
+from da_ai_agent.modules.word_match import TableNameMatcher
+
+# columns kept per table when a token budget forces pruned definitions
+PACKING_N_COLUMNS = 10
+
+# provenance of a retrieved table
+SOURCE_EMBEDDING = "embedding"
+SOURCE_HYBRID = "hybrid"
+SOURCE_LEXICAL = "lexical"
+SOURCE_FK = "fk"
+
+# a table named in the prompt outranks any similarity score
+LEXICAL_MATCH_SCORE = 1.0
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Cache key for a prompt: lowercase, collapsed whitespace, no trailing punctuation.
+    """
+    return re.sub(r"\s+", " ", prompt.lower()).strip().rstrip(".?!")
+
 
 # TODO: Set up class so it works with PrestoManager, at the moment is only importing PostgresManager. Also,
 #  make it aware of the parents component so we choose by default the right manager depending on the databaase we are
@@ -12,51 +47,464 @@ class DatabaseEmbedder:
     computing similarity between user queries and table definitions.
     """
 
-    def __init__(self, db: PostgresManager):
-        self.tokenizer = BertTokenizer.from_pretrained("bert-base-uncased")
-        self.model = BertModel.from_pretrained("bert-base-uncased")
+    def __init__(
+        self,
+        db: PostgresManager,
+        quantize: bool = False,
+        use_pgvector: bool = False,
+        cache_size: int = 256,
+        dialect: str = schema_render.DIALECT_DDL,
+        size_hints: bool = False,
+    ):
+        # quantize=True runs BERT with int8 linear layers - faster on CPU-only hosts
+        self.tokenizer, self.model = bert.load_tokenizer_and_model(quantize=quantize)
+        self.quantize = quantize
+        # use_pgvector=True keeps vectors in a shared pgvector table instead of the dicts below
+        self.store = (
+            PgVectorEmbeddingStore(db, bert.model_key(quantize)) if use_pgvector else None
+        )
         self.map_name_to_embeddings = {}
         self.map_name_to_table_def = {}
+        # compiled lazily from the table names, reset whenever a new table is added
+        self.word_matcher = None
+        # lexical index over table and column identifiers, rebuilt lazily on schema changes
+        self.bm25_index = None
+        # column level index - lets us send only the relevant columns of wide tables
+        self.map_name_to_columns: Dict[str, List[ColumnSchema]] = {}
+        self.map_name_to_key_columns: Dict[str, List[str]] = {}
+        # comment lines rendered under a table definition, e.g. its partition summary
+        self.map_name_to_table_notes: Dict[str, List[str]] = {}
+        # size_hints=True adds row count and indexed columns under each definition.
+        # Kept out of the embedded text - planner estimates drift on every ANALYZE
+        self.size_hints = size_hints
+        self.map_name_to_size_hint: Dict[str, str] = {}
+        self.map_name_to_column_embeddings = {}
+        self.columns_indexed = False
+        # foreign key graph from a prebuilt schema index, queried from the db when empty
+        self.map_name_to_related_tables: Dict[str, List[str]] = {}
+        # how table definitions are rendered into prompts, see schema_render
+        self.dialect = dialect
+        # query vectors depend only on the prompt text, ranked tables also on the schema
+        self.query_embedding_cache = LRUCache(cache_size)
+        self.similar_tables_cache = LRUCache(cache_size)
+        self._schema_version = None
+        # embeddings recomputed / entries dropped, for the last refresh and in total
+        self.last_refresh_counters = Counter()
+        self.refresh_counters = Counter()
         self.db = db
 
-    def get_similar_table_defs_for_prompt(self, prompt: str, n_similar=5, n_foreign=0):
-        map_table_name_to_table_def = self.db.get_table_definition_map_for_embeddings()
-        for name, table_def in map_table_name_to_table_def.items():
-            self.add_table(name, table_def)
+    def get_similar_table_defs_for_prompt(
+        self,
+        prompt: str,
+        n_similar=5,
+        n_foreign=0,
+        n_columns: Optional[int] = None,
+        hybrid: bool = False,
+        token_budget: Optional[int] = None,
+    ):
+        """
+        n_columns - when set, each table definition is pruned to its key columns
+        plus the n_columns columns most similar to the prompt.
+        hybrid - rank tables with BM25 + embeddings instead of embeddings alone.
+        token_budget - when set, definitions are packed under this many tokens,
+        pruning columns of the least relevant tables before dropping them.
+        """
+        self.add_tables(self.db.get_table_definition_map_for_embeddings())
 
-        similar_tables = self.get_similar_tables(prompt, n=n_similar)
+        candidates = self.get_table_candidates(
+            prompt, n=n_similar, hybrid=hybrid, n_foreign=n_foreign
+        )
+        # deduplicated, most relevant first, related (fk) tables last
+        table_names = [candidate.table_name for candidate in candidates]
 
-        table_definitions = self.get_table_definitions_from_names(similar_tables)
+        if token_budget is not None:
+            packed = self.pack_table_definitions(
+                prompt,
+                candidates,
+                token_budget,
+                n_columns or PACKING_N_COLUMNS,
+                always_prune=n_columns is not None,
+            )
+            print(f"📦 Schema packing {schema_packing.format_packing_report(packed)}")
+            return packed.table_definitions
 
-        if n_foreign > 0:
-            foreign_table_names = self.db.get_foreign_tables(similar_tables, n=3)
+        column_subsets = None
+        if n_columns is not None:
+            if not self.columns_indexed:
+                self.index_columns()
+            column_subsets = self.get_similar_columns(prompt, table_names, n_columns)
+
+        return self.get_table_definitions_from_names(table_names, column_subsets)
 
-            table_definitions = self.get_table_definitions_from_names(
-                foreign_table_names + similar_tables
+    def pack_table_definitions(
+        self,
+        prompt: str,
+        table_candidates: List[TableCandidate],
+        token_budget: int,
+        n_columns: int = PACKING_N_COLUMNS,
+        always_prune: bool = False,
+    ) -> PackedSchema:
+        """
+        Pack the definitions of table_candidates (see get_table_candidates) under
+        token_budget, keeping their retrieval scores so the lowest scoring tables
+        are pruned and dropped first.
+        Each table offers a full definition and one pruned to n_columns + key columns.
+        always_prune - start from the pruned definitions (--max-columns), only dropping tables.
+        """
+        if not self.columns_indexed:
+            self.index_columns()
+        map_name_to_score = {}
+        for table_candidate in table_candidates:
+            map_name_to_score.setdefault(table_candidate.table_name, table_candidate.score)
+        table_names = list(map_name_to_score)
+        column_subsets = self.get_similar_columns(prompt, table_names, n_columns)
+
+        candidates = []
+        for table_name in table_names:
+            pruned_definition = None
+            if table_name in column_subsets:
+                pruned_definition = self.get_table_definitions_from_names(
+                    [table_name], column_subsets
+                )
+            full_definition = self.get_table_definitions_from_names([table_name])
+            if always_prune and pruned_definition is not None:
+                full_definition, pruned_definition = pruned_definition, None
+            candidates.append(
+                SchemaCandidate(
+                    table_name=table_name,
+                    score=map_name_to_score[table_name],
+                    full_definition=full_definition,
+                    pruned_definition=pruned_definition,
+                )
             )
 
-        return table_definitions
+        return schema_packing.pack_schema(
+            candidates,
+            token_budget,
+            separator=schema_render.table_separator(self.dialect),
+        )
+
+    def add_tables(self, map_table_name_to_table_def: Dict[str, str]):
+        """
+        Sync the embedder with the current schema.
+        Only added and altered tables are embedded, dropped tables are removed.
+        Goes through the pgvector store when enabled.
+        """
+        diff = schema_diff.diff_snapshots(
+            self.map_name_to_table_def, map_table_name_to_table_def
+        )
+
+        if self.store is not None:
+            n_embedded, n_dropped = self.sync_tables_to_store(map_table_name_to_table_def)
+        else:
+            for table_name in diff.dropped:
+                self.remove_table(table_name)
+            for table_name in diff.added + diff.altered:
+                self.add_table(table_name, map_table_name_to_table_def[table_name])
+            n_embedded, n_dropped = len(diff.added) + len(diff.altered), len(diff.dropped)
+
+        self.record_refresh(tables_embedded=n_embedded, tables_dropped=n_dropped)
+
+        if diff.changed:
+            print(
+                f"🔄 Schema refresh: {schema_diff.format_diff(diff)}, {n_embedded} table embeddings recomputed"
+            )
+            # column embeddings are refreshed incrementally on the next index_columns()
+            self.columns_indexed = False
+            self.map_name_to_size_hint = {}
+
+    def record_refresh(self, **counts: int):
+        """
+        Count recomputed embeddings and dropped entries of one refresh.
+        """
+        self.last_refresh_counters = Counter(counts)
+        self.refresh_counters.update(counts)
+        self.refresh_counters["refreshes"] += 1
+
+    def get_refresh_stats(self) -> Dict[str, dict]:
+        """
+        Embeddings recomputed and entries dropped, last refresh and since startup.
+        """
+        return {
+            "last_refresh": dict(self.last_refresh_counters),
+            "total": dict(self.refresh_counters),
+        }
+
+    def get_related_tables(self, table_names: List[str], n: int = 2) -> List[str]:
+        """
+        Tables linked to table_names by a foreign key, sorted.
+        Uses the prebuilt foreign key graph when one was loaded, else asks the db.
+        """
+        if not self.map_name_to_related_tables:
+            return self.db.get_related_tables(table_names, n=n)
+
+        related = set()
+        for table_name in table_names:
+            # the db query takes n per direction, the graph is undirected
+            related.update(self.map_name_to_related_tables.get(table_name, [])[: 2 * n])
+        return sorted(related)
+
+    def remove_table(self, table_name: str):
+        """
+        Forget a dropped table and everything derived from it.
+        """
+        self.map_name_to_embeddings.pop(table_name, None)
+        self.map_name_to_table_def.pop(table_name, None)
+        self.map_name_to_columns.pop(table_name, None)
+        self.map_name_to_key_columns.pop(table_name, None)
+        self.map_name_to_table_notes.pop(table_name, None)
+        self.map_name_to_size_hint.pop(table_name, None)
+        self.map_name_to_column_embeddings.pop(table_name, None)
+        self.map_name_to_related_tables.pop(table_name, None)
+        self.invalidate_schema_caches()
+
+    def sync_tables_to_store(self, map_table_name_to_table_def: Dict[str, str]) -> Tuple[int, int]:
+        """
+        Upsert only the tables whose definition changed and drop removed tables.
+        Table definitions stay in memory, vectors live in the store.
+        Returns (tables embedded, tables dropped).
+        """
+        stored_hashes = self.store.get_content_hashes("table")
+
+        changed_rows = []
+        for table_name, table_def in map_table_name_to_table_def.items():
+            content_hash = hash_text(table_def)
+            if stored_hashes.get((table_name, "")) != content_hash:
+                changed_rows.append(
+                    (table_name, "", content_hash, self.compute_embeddings(table_def)[0])
+                )
+
+        dropped_keys = [
+            key for key in stored_hashes if key[0] not in map_table_name_to_table_def
+        ]
+        self.store.upsert("table", changed_rows)
+        self.store.delete("table", dropped_keys)
+
+        if map_table_name_to_table_def != self.map_name_to_table_def:
+            self.invalidate_schema_caches()
+        for table_name in list(self.map_name_to_columns):
+            if table_name not in map_table_name_to_table_def:
+                self.map_name_to_columns.pop(table_name)
+                self.map_name_to_key_columns.pop(table_name, None)
+        self.map_name_to_table_def = dict(map_table_name_to_table_def)
+
+        return len(changed_rows), len(dropped_keys)
+
+    def invalidate_schema_caches(self):
+        """
+        Drop everything derived from the schema: lexical indexes, the schema
+        version and cached retrieval results.
+        """
+        self.word_matcher = None
+        self.bm25_index = None
+        self._schema_version = None
+        self.similar_tables_cache.clear()
+
+    @property
+    def schema_version(self) -> str:
+        """
+        Hash of the table definitions currently loaded.
+        Columns are left out - they're only loaded for some flags (--max-columns,
+        the column index) and the definitions already list every column, so the
+        same database always gets the same version.
+        """
+        if self._schema_version is None:
+            digest = hashlib.sha1()
+            for table_name in sorted(self.map_name_to_table_def):
+                digest.update(table_name.encode("utf-8"))
+                digest.update(self.map_name_to_table_def[table_name].encode("utf-8"))
+            self._schema_version = digest.hexdigest()
+        return self._schema_version
+
+    def get_cache_stats(self) -> Dict[str, dict]:
+        """
+        Hit rate metrics for the query embedding and similar tables caches.
+        """
+        return {
+            "query_embeddings": self.query_embedding_cache.stats(),
+            "similar_tables": self.similar_tables_cache.stats(),
+        }
 
     def add_table(self, table_name: str, text_representation: str):
         """
         Add a table to the database embedder.
         Map the table name to its embedding and text representation.
         """
+        if self.map_name_to_table_def.get(table_name) != text_representation:
+            self.invalidate_schema_caches()
+
         self.map_name_to_embeddings[table_name] = self.compute_embeddings(
             text_representation
         )
 
         self.map_name_to_table_def[table_name] = text_representation
 
+    def index_columns(self, with_profiles: bool = True):
+        """
+        Embed every column of every table separately.
+        Column text is '<table> <column> <type> <profile hints>' so the relevant
+        columns of a wide table can be picked without sending the whole table.
+        On later calls only added and altered columns are embedded again.
+        """
+        map_table_name_to_columns = self.db.get_all_table_columns()
+        self.map_name_to_key_columns = self.db.get_all_key_columns()
+        self.map_name_to_table_notes = self.db.get_table_notes()
+        profiles = self.db.get_column_profiles() if with_profiles else {}
+
+        for table_name, columns in map_table_name_to_columns.items():
+            for column in columns:
+                column.hints = profiles.get((table_name, column.name), "")
+
+        if self.store is not None:
+            n_embedded, n_dropped = self.sync_columns_to_store(map_table_name_to_columns)
+        else:
+            n_embedded, n_dropped = self.refresh_columns(map_table_name_to_columns)
+
+        self.record_refresh(columns_embedded=n_embedded, columns_dropped=n_dropped)
+        self.columns_indexed = True
+
+    def refresh_columns(self, map_table_name_to_columns: Dict[str, List[ColumnSchema]]) -> Tuple[int, int]:
+        """
+        In memory column index update. Embeddings of columns whose text did not
+        change are reused. Returns (columns embedded, columns dropped).
+        """
+        old_snapshot = {
+            (table_name, column.name): self.make_column_text(column)
+            for table_name in self.map_name_to_column_embeddings
+            for column in self.map_name_to_columns.get(table_name, [])
+        }
+        new_snapshot = {
+            (table_name, column.name): self.make_column_text(column)
+            for table_name, columns in map_table_name_to_columns.items()
+            for column in columns
+        }
+        diff = schema_diff.diff_snapshots(old_snapshot, new_snapshot)
+        if not diff.changed and set(map_table_name_to_columns) == set(self.map_name_to_column_embeddings):
+            return 0, 0
+
+        for table_name in list(self.map_name_to_column_embeddings):
+            if table_name not in map_table_name_to_columns:
+                self.map_name_to_column_embeddings.pop(table_name)
+
+        n_embedded = 0
+        for table_name, columns in map_table_name_to_columns.items():
+            n_embedded += self.add_table_columns(table_name, columns)
+
+        if diff.changed:
+            print(
+                f"🔄 Column refresh: {schema_diff.format_diff(diff, 'columns')}, {n_embedded} column embeddings recomputed"
+            )
+        return n_embedded, len(diff.dropped)
+
+    def load_columns(self):
+        """
+        Load column metadata without embedding it - enough to render any dialect.
+        """
+        map_table_name_to_columns = self.db.get_all_table_columns()
+        for table_name, columns in map_table_name_to_columns.items():
+            self.map_name_to_columns.setdefault(table_name, columns)
+        self.map_name_to_table_notes = self.db.get_table_notes()
+        self.invalidate_schema_caches()
+
+    def sync_columns_to_store(
+        self, map_table_name_to_columns: Dict[str, List[ColumnSchema]]
+    ) -> Tuple[int, int]:
+        """
+        Upsert only the columns whose text changed and drop removed columns.
+        Returns (columns embedded, columns dropped).
+        """
+        stored_hashes = self.store.get_content_hashes("column")
+
+        current_keys = set()
+        changed_columns = []
+        for table_name, columns in map_table_name_to_columns.items():
+            for column in columns:
+                key = (table_name, column.name)
+                current_keys.add(key)
+                column_text = self.make_column_text(column)
+                if stored_hashes.get(key) != hash_text(column_text):
+                    changed_columns.append((key, column_text))
+
+        if changed_columns:
+            embeddings = self.compute_embeddings([text for _, text in changed_columns])
+            self.store.upsert(
+                "column",
+                [
+                    (table_name, column_name, hash_text(text), embedding)
+                    for ((table_name, column_name), text), embedding in zip(
+                        changed_columns, embeddings
+                    )
+                ],
+            )
+        dropped_keys = [key for key in stored_hashes if key not in current_keys]
+        self.store.delete("column", dropped_keys)
+
+        self.map_name_to_columns = map_table_name_to_columns
+        self.invalidate_schema_caches()
+
+        return len(changed_columns), len(dropped_keys)
+
+    def make_column_text(self, column: ColumnSchema) -> str:
+        """
+        Text embedded for a single column: '<table> <column> <type> <profile hints>'
+        """
+        return f"{column.table_name} {column.name} {column.data_type} {column.hints}".replace(
+            "_", " "
+        )
+
+    def add_table_columns(self, table_name: str, columns: List[ColumnSchema]) -> int:
+        """
+        Map each column of a table to its embedding.
+        Embeddings already computed for an identical column text are reused.
+        Returns how many column embeddings were computed.
+        """
+        map_text_to_embedding = {}
+        if table_name in self.map_name_to_column_embeddings:
+            map_text_to_embedding = {
+                self.make_column_text(column): embedding
+                for column, embedding in zip(
+                    self.map_name_to_columns.get(table_name, []),
+                    self.map_name_to_column_embeddings[table_name],
+                )
+            }
+
+        self.map_name_to_columns[table_name] = columns
+        self.invalidate_schema_caches()
+
+        if not columns:
+            self.map_name_to_column_embeddings[table_name] = []
+            return 0
+
+        column_texts = [self.make_column_text(column) for column in columns]
+        missing_texts = [
+            text for text in dict.fromkeys(column_texts) if text not in map_text_to_embedding
+        ]
+        if missing_texts:
+            map_text_to_embedding.update(
+                zip(missing_texts, self.compute_embeddings(missing_texts))
+            )
+        self.map_name_to_column_embeddings[table_name] = np.stack(
+            [map_text_to_embedding[text] for text in column_texts]
+        )
+        return len(missing_texts)
+
     def compute_embeddings(self, text):
         """
         Compute embeddings for a given text using the BERT model.
+        Long table definitions are embedded as pooled overlapping chunks, see bert.py.
         """
-        inputs = self.tokenizer(
-            text, return_tensors="pt", truncation=True, padding=True, max_length=512
-        )
-        outputs = self.model(**inputs)
-        return outputs["pooler_output"].detach().numpy()
+        return bert.compute_embeddings(self.tokenizer, self.model, text)
+
+    def embed_query(self, query: str):
+        """
+        Embedding of a user query, cached on the normalized prompt text.
+        """
+        key = normalize_prompt(query)
+        query_embedding = self.query_embedding_cache.get(key)
+        if query_embedding is None:
+            query_embedding = self.compute_embeddings(query)
+            self.query_embedding_cache.put(key, query_embedding)
+        return query_embedding
 
     def get_similar_tables_via_embeddings(self, query, n=3):
         """
@@ -69,46 +517,242 @@ class DatabaseEmbedder:
         Returns:
         - list: Top 'n' table names ranked by their similarity to the query.
         """
+        return [table for table, _ in self.rank_tables_via_embeddings(query, n)]
+
+    def rank_tables_via_embeddings(self, query, n=3) -> List[Tuple[str, float]]:
+        """
+        Top 'n' (table, cosine similarity) pairs, ties broken by table name.
+        """
         # Compute the embedding for the user's query
-        query_embedding = self.compute_embeddings(query)
+        query_embedding = self.embed_query(query)
+        # Top 'n' search runs in SQL when vectors live in pgvector
+        if self.store is not None:
+            return [(row[0], row[2]) for row in self.store.search(query_embedding[0], n)]
         # Calculate cosine similarity between the query and all tables
         similarities = {
-            table: cosine_similarity(query_embedding, emb)[0][0]
+            table: float(cosine_similarity(query_embedding, emb)[0][0])
             for table, emb in self.map_name_to_embeddings.items()
         }
         # Rank tables based on their similarity scores and return top 'n'
-        return sorted(similarities, key=similarities.get, reverse=True)[:n]
+        ranked = sorted(similarities, key=lambda table: (-similarities[table], table))
+        return [(table, similarities[table]) for table in ranked[:n]]
 
     def get_similar_table_names_via_word_match(self, query: str):
         """
         if any word in our query is a table name, add the table to a list
         """
+        if self.word_matcher is None:
+            self.word_matcher = TableNameMatcher(self.map_name_to_table_def.keys())
 
-        tables = []
+        return self.word_matcher.match(query)
 
-        for table_name in self.map_name_to_table_def.keys():
-            if table_name.lower() in query.lower():
-                tables.append(table_name)
+    def get_similar_tables_via_bm25(self, query: str, n=3):
+        """
+        Top 'n' tables by BM25 over the table name, column names and column hints.
+        """
+        if self.bm25_index is None:
+            documents = {}
+            for table_name, table_def in self.map_name_to_table_def.items():
+                column_hints = " ".join(
+                    column.hints for column in self.map_name_to_columns.get(table_name, [])
+                )
+                documents[table_name] = f"{table_name} {table_def} {column_hints}"
+            self.bm25_index = BM25Index(documents)
 
-        return tables
+        return self.bm25_index.rank(query)[:n]
 
-    def get_similar_tables(self, query: str, n=3):
+    def get_similar_tables_via_hybrid(self, query: str, n=3):
         """
-        combines results from get_similar_tables_via_embeddings and get_similar_table_names_via_word_match
+        Fuse the full embedding ranking and the BM25 ranking with reciprocal rank fusion.
+        BM25 catches exact identifier hits that BERT pooler similarity misses.
         """
+        return [table for table, _ in self.rank_tables_via_hybrid(query, n)]
 
-        similar_tables_via_embeddings = self.get_similar_tables_via_embeddings(query, n)
-        similar_tables_via_word_match = self.get_similar_table_names_via_word_match(
-            query
+    def rank_tables_via_hybrid(self, query: str, n=3) -> List[Tuple[str, float]]:
+        """
+        Top 'n' (table, fused score) pairs. Scores are scaled to [0, 1].
+        """
+        n_tables = len(self.map_name_to_table_def)
+        rankings = [
+            self.get_similar_tables_via_embeddings(query, n_tables),
+            self.get_similar_tables_via_bm25(query, n_tables),
+        ]
+        fused = reciprocal_rank_fusion(rankings)
+        # an item ranked first in every ranking
+        best_possible = len(rankings) / (RRF_K + 1)
+        ranked = sorted(fused, key=lambda name: (-fused[name], name))
+        return [(name, fused[name] / best_possible) for name in ranked[:n]]
+
+    def get_similar_tables(self, query: str, n=3, hybrid: bool = False):
+        """
+        combines results from get_similar_tables_via_embeddings (or get_similar_tables_via_hybrid)
+        and get_similar_table_names_via_word_match, deduplicated and in a stable order
+        """
+        return [
+            candidate.table_name
+            for candidate in self.get_table_candidates(query, n=n, hybrid=hybrid)
+        ]
+
+    def get_table_candidates(
+        self, query: str, n=3, hybrid: bool = False, n_foreign: int = 0
+    ) -> List[TableCandidate]:
+        """
+        Deduplicated candidate tables with their score and provenance.
+
+        Ordering is deterministic so the same prompt renders byte-identical
+        table definitions across runs (helps provider-side prompt caching):
+            1. tables found by embeddings / word match, by score then name
+            2. tables only reached through foreign keys, by name
+        """
+        cache_key = (normalize_prompt(query), self.schema_version, n, hybrid, n_foreign)
+        cached = self.similar_tables_cache.get(cache_key)
+        if cached is not None:
+            return [TableCandidate(table_name, score, list(sources)) for table_name, score, sources in cached]
+
+        map_name_to_candidate: Dict[str, TableCandidate] = {}
+
+        def add_candidate(table_name: str, score: float, source: str):
+            score = round(score, 6)
+            candidate = map_name_to_candidate.get(table_name)
+            if candidate is None:
+                map_name_to_candidate[table_name] = TableCandidate(table_name, score, [source])
+                return
+            candidate.score = max(candidate.score, score)
+            if source not in candidate.sources:
+                candidate.sources.append(source)
+
+        if hybrid:
+            for table_name, score in self.rank_tables_via_hybrid(query, n):
+                add_candidate(table_name, score, SOURCE_HYBRID)
+        else:
+            for table_name, score in self.rank_tables_via_embeddings(query, n):
+                add_candidate(table_name, score, SOURCE_EMBEDDING)
+
+        for table_name in self.get_similar_table_names_via_word_match(query):
+            add_candidate(table_name, LEXICAL_MATCH_SCORE, SOURCE_LEXICAL)
+
+        if n_foreign > 0:
+            core_table_names = sorted(map_name_to_candidate)
+            for table_name in self.get_related_tables(core_table_names, n=n_foreign):
+                if table_name in self.map_name_to_table_def:
+                    add_candidate(table_name, 0.0, SOURCE_FK)
+
+        candidates = sorted(
+            map_name_to_candidate.values(),
+            key=lambda c: (c.sources == [SOURCE_FK], -c.score, c.table_name),
+        )
+        # cached as tuples, so callers can't change a later hit by editing a candidate
+        self.similar_tables_cache.put(
+            cache_key, tuple((c.table_name, c.score, tuple(c.sources)) for c in candidates)
         )
 
-        return similar_tables_via_embeddings + similar_tables_via_word_match
+        return candidates
+
+    def get_similar_columns(
+        self, query: str, table_names: List[str], n_columns: int = 10
+    ) -> Dict[str, List[str]]:
+        """
+        For each table, return its key columns plus the 'n_columns' columns most
+        similar to the query, in table column order.
+        Tables without a column index are left out (rendered in full).
+        """
+        query_embedding = self.embed_query(query)
+
+        column_subsets = {}
+
+        for table_name in table_names:
+            columns = self.map_name_to_columns.get(table_name)
+            if not columns:
+                continue
+            if self.store is None and table_name not in self.map_name_to_column_embeddings:
+                continue
+
+            if self.store is not None:
+                selected = {
+                    row[1]
+                    for row in self.store.search(
+                        query_embedding[0], n_columns, kind="column", table_name=table_name
+                    )
+                }
+            else:
+                similarities = cosine_similarity(
+                    query_embedding, self.map_name_to_column_embeddings[table_name]
+                )[0]
+                ranked = sorted(
+                    range(len(columns)), key=lambda i: similarities[i], reverse=True
+                )
+                selected = {columns[i].name for i in ranked[:n_columns]}
+
+            selected.update(self.map_name_to_key_columns.get(table_name, []))
+
+            column_subsets[table_name] = [
+                column.name for column in columns if column.name in selected
+            ]
+
+        return column_subsets
+
+    def load_size_hints(self):
+        """
+        Row count bucket and indexed columns per table, see PostgresManager.get_table_size_hints.
+        """
+        self.map_name_to_size_hint = self.db.get_table_size_hints()
+
+    def get_table_notes(self, table_name: str) -> List[str]:
+        """
+        Comment lines rendered under a table: partition summary, then the size hint.
+        """
+        notes = list(self.map_name_to_table_notes.get(table_name, []))
+        if self.size_hints and table_name in self.map_name_to_size_hint:
+            notes.append(self.map_name_to_size_hint[table_name])
+        return notes
 
-    def get_table_definitions_from_names(self, table_names: list) -> str:
+    def get_table_definitions_from_names(
+        self,
+        table_names: list,
+        column_subsets: Optional[Dict[str, List[str]]] = None,
+        dialect: Optional[str] = None,
+    ) -> str:
         """
         Given a list of table names, return their table definitions.
+        Tables present in column_subsets are pruned to those columns.
         """
-        table_defs = [
-            self.map_name_to_table_def[table_name] for table_name in table_names
-        ]
-        return "\n\n".join(table_defs)
+        column_subsets = column_subsets or {}
+        dialect = dialect or self.dialect
+
+        if dialect != schema_render.DIALECT_DDL and any(
+            table_name not in self.map_name_to_columns for table_name in table_names
+        ):
+            self.load_columns()
+
+        if self.size_hints and not self.map_name_to_size_hint:
+            self.load_size_hints()
+
+        table_defs = []
+        for table_name in table_names:
+            size_hint = self.map_name_to_size_hint.get(table_name) if self.size_hints else None
+            if table_name in column_subsets:
+                columns = self.map_name_to_columns[table_name]
+                kept = [c for c in columns if c.name in column_subsets[table_name]]
+                table_defs.append(
+                    schema_render.render_table(
+                        table_name,
+                        kept,
+                        dialect,
+                        len(columns) - len(kept),
+                        self.get_table_notes(table_name),
+                    )
+                )
+            elif dialect == schema_render.DIALECT_DDL:
+                table_def = self.map_name_to_table_def[table_name]
+                table_defs.append(f"{table_def}\n-- {size_hint}" if size_hint else table_def)
+            else:
+                table_defs.append(
+                    schema_render.render_table(
+                        table_name,
+                        self.map_name_to_columns.get(table_name, []),
+                        dialect,
+                        notes=self.get_table_notes(table_name),
+                    )
+                )
+
+        return schema_render.table_separator(dialect).join(table_defs)
@@ -1,8 +1,9 @@
 import json
 from sklearn.metrics.pairwise import cosine_similarity
-from transformers import BertTokenizer, BertModel
 
+from da_ai_agent.modules import bert, schema_render
 from da_ai_agent.modules.db_presto import PrestoManager
+from da_ai_agent.modules.word_match import TableNameMatcher
 
 
 # TODO: Set up class so it works with PrestoManager, at the moment is only importing PostgresManager. Also,
@@ -14,24 +15,32 @@ class DatabaseEmbedder:
     computing similarity between user queries and table definitions.
     """
 
-    def __init__(self, db: PrestoManager):
-        self.tokenizer = BertTokenizer.from_pretrained("bert-base-uncased")
-        self.model = BertModel.from_pretrained("bert-base-uncased")
+    def __init__(
+        self,
+        db: PrestoManager,
+        quantize: bool = False,
+        dialect: str = schema_render.DIALECT_LINES,
+    ):
+        # quantize=True runs BERT with int8 linear layers - faster on CPU-only hosts
+        self.tokenizer, self.model = bert.load_tokenizer_and_model(quantize=quantize)
+        self.quantize = quantize
         self.map_name_to_embeddings = {}
         self.map_name_to_table_def = {}
+        # compiled lazily from the table names, reset whenever a new table is added
+        self.word_matcher = None
+        # how table definitions are rendered into prompts, see schema_render
+        self.dialect = dialect
         self.db = db
 
     def get_similar_table_defs_for_prompt(self, prompt: str, n_similar=5, n_foreign=0):
-        map_table_name_to_table_def = self.db.get_table_definitions_map_for_embeddings()
-        for name, table_def in map_table_name_to_table_def.items():
-            self.add_table(name, table_def)
+        self.add_tables(self.db.get_table_definitions_map_for_embeddings())
 
         similar_tables = self.get_similar_tables(prompt, n=n_similar)
 
         table_definitions = self.get_table_definitions_from_names(similar_tables)
 
         if n_foreign > 0:
-            foreign_table_names = self.db.get_foreign_tables(similar_tables, n=3)
+            foreign_table_names = self.db.get_related_tables(similar_tables, n=3)
 
             table_definitions = self.get_table_definitions_from_names(
                 foreign_table_names + similar_tables
@@ -39,6 +48,24 @@ class DatabaseEmbedder:
 
         return table_definitions
 
+    def add_tables(self, map_table_name_to_table_def: dict):
+        """
+        Embed the tables that are new or whose columns changed, forget dropped tables.
+        Cheap when the embedder was filled from a prebuilt schema index.
+        """
+        for table_name in list(self.map_name_to_table_def):
+            if table_name not in map_table_name_to_table_def:
+                self.map_name_to_table_def.pop(table_name)
+                self.map_name_to_embeddings.pop(table_name, None)
+                self.word_matcher = None
+
+        for table_name, table_def in map_table_name_to_table_def.items():
+            if (
+                self.map_name_to_table_def.get(table_name) != table_def
+                or table_name not in self.map_name_to_embeddings
+            ):
+                self.add_table(table_name, table_def)
+
     def add_table(self, table_name: str, table_def):
         """
         Convert table definition to a string format suitable for embedding,
@@ -47,18 +74,18 @@ class DatabaseEmbedder:
         # Correctly handle table_def as a dictionary
         col_details_str = ' '.join([f"{col_name} {data_type}" for col_name, data_type in table_def.items()])
 
+        if table_name not in self.map_name_to_table_def:
+            self.word_matcher = None
+
         self.map_name_to_embeddings[table_name] = self.compute_embeddings(col_details_str)
         self.map_name_to_table_def[table_name] = table_def  # Store the original structure
 
     def compute_embeddings(self, text):
         """
         Compute embeddings for a given text using the BERT model.
+        Long table definitions are embedded as pooled overlapping chunks, see bert.py.
         """
-        inputs = self.tokenizer(
-            text, return_tensors="pt", truncation=True, padding=True, max_length=512
-        )
-        outputs = self.model(**inputs)
-        return outputs["pooler_output"].detach().numpy()
+        return bert.compute_embeddings(self.tokenizer, self.model, text)
 
     def get_similar_tables_via_embeddings(self, query, n=3):
         """
@@ -85,14 +112,10 @@ class DatabaseEmbedder:
         """
         if any word in our query is a table name, add the table to a list
         """
+        if self.word_matcher is None:
+            self.word_matcher = TableNameMatcher(self.map_name_to_table_def.keys())
 
-        tables = []
-
-        for table_name in self.map_name_to_table_def.keys():
-            if table_name.lower() in query.lower():
-                tables.append(table_name)
-
-        return tables
+        return self.word_matcher.match(query)
 
     def get_similar_tables(self, query: str, n=3):
         """
@@ -106,32 +129,30 @@ class DatabaseEmbedder:
 
         return similar_tables_via_embeddings + similar_tables_via_word_match
 
-    def get_table_definitions_from_names(self, table_names: list):
+    def get_table_definitions_from_names(self, table_names: list, dialect: str = None):
         """
         Given a list of table names, return their table definitions in the desired format.
         Formats the table definitions as a plain text string suitable for a .txt file.
         """
-        formatted_table_defs = ""
-
-        for table_name in table_names:
-            table_def = self.map_name_to_table_def[table_name]
-            formatted_table_defs += f"{table_name}\n"
-
-            for column_name, data_type in table_def.items():
-                formatted_table_defs += f"{column_name}, {data_type}\n"
-
-            formatted_table_defs += "\n"  # Add a blank line between tables for readability
-
-        return formatted_table_defs
+        dialect = dialect or self.dialect
+
+        return schema_render.table_separator(dialect).join(
+            schema_render.render_table(
+                table_name,
+                schema_render.columns_from_mapping(
+                    table_name, self.map_name_to_table_def[table_name]
+                ),
+                dialect,
+            )
+            for table_name in table_names
+        )
 
     def get_all_table_defs(self):
         """
         Retrieve and print all table definitions.
         """
         map_table_name_to_table_def = self.db.get_table_definitions_map_for_embeddings()
-        for name, table_def in map_table_name_to_table_def.items():
-            # Pass the table definition directly to add_table
-            self.add_table(name, table_def)
+        self.add_tables(map_table_name_to_table_def)
 
         all_table_defs = self.get_table_definitions_from_names(map_table_name_to_table_def.keys())
 
@@ -0,0 +1,187 @@
+"""
+Purpose:
+    asyncio versions of llm.prompt, llm.prompt_func and llm.prompt_json_response.
+    Bounded concurrency, so independent prompts can be fanned out and awaited
+    together without tripping rate limits, and cancellation of the rest of a
+    fan out when one prompt fails or the deadline passes.
+
+Example:
+    client = llm_async.AsyncLLM(max_concurrency=4)
+    insights = await client.fan_out(
+        [client.prompt_json_response(p) for p in insight_prompts], timeout=60
+    )
+"""
+
+import asyncio
+import inspect
+import json
+from typing import Any, Awaitable, Dict, List, Optional
+
+import openai
+
+from da_ai_agent.data_types import TurboTool
+from da_ai_agent.modules import llm, llm_cache
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+
+class AsyncLLM:
+    """
+    Async OpenAI client. At most max_concurrency requests are in flight at once,
+    the rest wait their turn. Shares llm.response_cache and llm.request_scheduler
+    with the sync functions.
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        # retries are handled by llm.request_scheduler
+        self.client = openai.AsyncOpenAI(api_key=openai.api_key, max_retries=0)
+        self.max_concurrency = max_concurrency
+        # created on first use so it binds to the running event loop
+        self.semaphore: Optional[asyncio.Semaphore] = None
+
+    async def create_chat_completion(self, use_cache: bool = True, **request) -> Dict[str, Any]:
+        """
+        Async llm.create_chat_completion.
+        """
+        cache = llm.response_cache if use_cache else None
+        key = llm_cache.make_cache_key(request) if cache else None
+        if cache:
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self.semaphore:
+            response = await llm.request_scheduler.submit_async(
+                lambda: self.send_chat_completion(request),
+                estimated_tokens=llm.estimate_request_tokens(request),
+            )
+        llm.usage_ledger.record_response(response)
+
+        if cache:
+            cache.put(key, request["model"], response)
+        return response
+
+    async def send_chat_completion(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return (await self.client.chat.completions.create(**request)).model_dump()
+
+    async def prompt(
+        self,
+        prompt: str,
+        model: str = "gpt-4-1106-preview",
+        instructions: str = "You are a helpful assistant.",
+        use_cache: bool = True,
+    ) -> str:
+        """
+        Generate a response from a prompt using the OpenAI API.
+        """
+        response = await self.create_chat_completion(
+            use_cache=use_cache,
+            model=model,
+            messages=[
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": prompt},
+            ],
+        )
+        return llm.response_parser(response)
+
+    async def prompt_json_response(
+        self,
+        prompt: str,
+        model: str = "gpt-4-1106-preview",
+        instructions: str = "You are a helpful assistant.",
+        use_cache: bool = True,
+    ) -> str:
+        """
+        Generate a JSON response from a prompt using the OpenAI API.
+        """
+        response = await self.create_chat_completion(
+            use_cache=use_cache,
+            model=model,
+            messages=[
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": prompt},
+            ],
+            response_format={"type": "json_object"},
+        )
+        return llm.response_parser(response)
+
+    async def prompt_func(
+        self,
+        prompt: str,
+        turbo_tools: List[TurboTool],
+        model: str = "gpt-4-1106-preview",
+        instructions: str = "You are a helpful assistant.",
+        use_cache: bool = True,
+    ) -> list:
+        """
+        Generate a response and run the tool calls it makes, like llm.prompt_func.
+        Tool functions may be plain functions or coroutines.
+        """
+        tools = [turbo_tool.config for turbo_tool in turbo_tools]
+        tool_choice = (
+            "auto"
+            if len(turbo_tools) > 1
+            else {"type": "function", "function": {"name": turbo_tools[0].name}}
+        )
+
+        response = await self.create_chat_completion(
+            use_cache=use_cache,
+            model=model,
+            messages=[
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": prompt},
+            ],
+            tools=tools,
+            tool_choice=tool_choice,
+        )
+
+        map_name_to_tool = {turbo_tool.name: turbo_tool for turbo_tool in turbo_tools}
+        func_responses = []
+        for tool_call in llm.safe_get(response, "choices.0.message.tool_calls") or []:
+            turbo_tool = map_name_to_tool.get(tool_call["function"]["name"])
+            if turbo_tool is None:
+                continue
+            function_response = turbo_tool.function(
+                **json.loads(tool_call["function"]["arguments"])
+            )
+            if inspect.isawaitable(function_response):
+                function_response = await function_response
+            func_responses.append(function_response)
+
+        return func_responses
+
+    async def fan_out(
+        self, awaitables: List[Awaitable], timeout: Optional[float] = None
+    ) -> list:
+        """
+        Await independent requests together, results in input order.
+        If one fails or timeout (seconds) passes, the others are cancelled
+        and the error (or asyncio.TimeoutError) is raised.
+        """
+        tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+        if not tasks:
+            return []
+
+        done, pending = await asyncio.wait(
+            tasks, timeout=timeout, return_when=asyncio.FIRST_EXCEPTION
+        )
+        failed = [task for task in done if task.exception() is not None]
+
+        if pending or failed:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if failed:
+                raise failed[0].exception()
+            raise asyncio.TimeoutError(f"{len(pending)} of {len(tasks)} requests timed out after {timeout}s")
+
+        return [task.result() for task in tasks]
+
+
+def run(awaitable: Awaitable):
+    """
+    Run a coroutine from sync code, e.g. llm_async.run(client.fan_out([...])).
+    """
+    return asyncio.run(awaitable)
@@ -0,0 +1,204 @@
+"""
+Purpose:
+    Streaming chat completions.
+    Yield content and tool call deltas as they arrive, assemble the final
+    message in the same shape as the non-streaming response, and record
+    time-to-first-token and tokens/sec for every call.
+
+Example:
+    stream = llm_stream.prompt_stream("How many users signed up last week?")
+    for delta in stream:
+        print(delta.get("content") or "", end="", flush=True)
+    print(stream.metrics.ttft_ms, stream.message["content"])
+"""
+
+import dataclasses
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional
+
+import openai
+
+from da_ai_agent.data_types import StreamMetrics
+from da_ai_agent.modules import llm, llm_cache
+
+# recent calls for in-process dashboards, also appended to LLM_METRICS_PATH (jsonl) when set
+recent_stream_metrics: deque = deque(maxlen=1000)
+
+
+def record_metrics(metrics: StreamMetrics):
+    recent_stream_metrics.append(metrics)
+    metrics_path = os.environ.get("LLM_METRICS_PATH")
+    if metrics_path:
+        with open(metrics_path, "a") as f:
+            f.write(json.dumps(dataclasses.asdict(metrics)) + "\n")
+
+
+class ChatStream:
+    """
+    Iterate to receive deltas:
+        {"content": "SEL"}
+        {"tool_call": {"index": 0, "id": "call_1", "name": "run_sql", "arguments": "{\"sq"}}
+    After iteration, message holds the assembled assistant message and
+    response the full response dict, identical in shape to llm.create_chat_completion.
+    """
+
+    def __init__(self, request: Dict[str, Any], use_cache: bool = True):
+        self.request = request
+        self.use_cache = use_cache and llm.response_cache is not None
+        self.message: Optional[Dict[str, Any]] = None
+        self.response: Optional[Dict[str, Any]] = None
+        self.finish_reason: Optional[str] = None
+        self.metrics = StreamMetrics(model=request["model"], started_at=time.time())
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        start = time.perf_counter()
+        key = llm_cache.make_cache_key(self.request) if self.use_cache else None
+
+        cached = llm.response_cache.get(key) if self.use_cache else None
+        if cached is not None:
+            self.metrics.cached = True
+            self.response = cached
+            self.message = llm.safe_get(cached, "choices.0.message")
+            self.finish_reason = llm.safe_get(cached, "choices.0.finish_reason")
+            self.metrics.ttft_ms = (time.perf_counter() - start) * 1000
+            if self.message.get("content"):
+                yield {"content": self.message["content"]}
+            for index, tool_call in enumerate(self.message.get("tool_calls") or []):
+                yield {
+                    "tool_call": {
+                        "index": index,
+                        "id": tool_call["id"],
+                        "name": tool_call["function"]["name"],
+                        "arguments": tool_call["function"]["arguments"],
+                    }
+                }
+            self.finish(start)
+            return
+
+        content_parts: List[str] = []
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+        response_id = None
+        created = None
+
+        # usage isn't reported on streams, settled below once the output is counted
+        estimated_tokens = llm.estimate_request_tokens(self.request)
+        chunks = llm.request_scheduler.submit(
+            lambda: openai.chat.completions.create(stream=True, **self.request),
+            estimated_tokens=estimated_tokens,
+            get_usage=lambda stream: None,
+        )
+
+        for chunk in chunks:
+            response_id = response_id or chunk.id
+            created = created or chunk.created
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            delta = choice.delta
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+
+            if delta.content:
+                if self.metrics.ttft_ms is None:
+                    self.metrics.ttft_ms = (time.perf_counter() - start) * 1000
+                content_parts.append(delta.content)
+                yield {"content": delta.content}
+
+            for tool_call_delta in delta.tool_calls or []:
+                if self.metrics.ttft_ms is None:
+                    self.metrics.ttft_ms = (time.perf_counter() - start) * 1000
+                tool_call = tool_calls.setdefault(
+                    tool_call_delta.index,
+                    {"id": None, "type": "function", "function": {"name": "", "arguments": ""}},
+                )
+                function = tool_call_delta.function
+                if tool_call_delta.id:
+                    tool_call["id"] = tool_call_delta.id
+                if function and function.name:
+                    tool_call["function"]["name"] += function.name
+                if function and function.arguments:
+                    tool_call["function"]["arguments"] += function.arguments
+                yield {
+                    "tool_call": {
+                        "index": tool_call_delta.index,
+                        "id": tool_call_delta.id,
+                        "name": function.name if function else None,
+                        "arguments": function.arguments if function else None,
+                    }
+                }
+
+        self.message = {
+            "role": "assistant",
+            "content": "".join(content_parts) if content_parts else None,
+            "function_call": None,
+            "tool_calls": [tool_calls[index] for index in sorted(tool_calls)] or None,
+        }
+        self.response = {
+            "id": response_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": self.request["model"],
+            "choices": [
+                {"index": 0, "message": self.message, "finish_reason": self.finish_reason}
+            ],
+            "usage": None,
+        }
+        if self.use_cache:
+            llm.response_cache.put(key, self.request["model"], self.response)
+        self.finish(start)
+        # streams don't report usage - counted locally
+        prompt_tokens = llm.count_request_tokens(self.request)
+        llm.request_scheduler.settle(
+            estimated_tokens, prompt_tokens + self.metrics.completion_tokens
+        )
+        llm.usage_ledger.record(
+            self.request["model"], prompt_tokens, self.metrics.completion_tokens
+        )
+
+    def finish(self, start: float):
+        self.metrics.total_ms = (time.perf_counter() - start) * 1000
+        generated_text = (self.message.get("content") or "") + "".join(
+            tool_call["function"]["arguments"]
+            for tool_call in self.message.get("tool_calls") or []
+        )
+        self.metrics.completion_tokens = llm.count_tokens(generated_text)
+        # generation rate after the first token arrived
+        generating_ms = self.metrics.total_ms - (self.metrics.ttft_ms or 0)
+        if generating_ms > 0:
+            self.metrics.tokens_per_second = round(
+                self.metrics.completion_tokens / (generating_ms / 1000), 2
+            )
+        record_metrics(self.metrics)
+
+    @property
+    def text(self) -> Optional[str]:
+        return llm.response_parser(self.response) if self.response else None
+
+
+def prompt_stream(
+    prompt: str,
+    model: str = "gpt-4-1106-preview",
+    instructions: str = "You are a helpful assistant.",
+    tools: Optional[List[Dict[str, Any]]] = None,
+    tool_choice: Optional[Any] = None,
+    use_cache: bool = True,
+) -> ChatStream:
+    """
+    Streaming llm.prompt - iterate the returned ChatStream for deltas.
+    Pass tools / tool_choice (TurboTool configs) to stream tool call arguments.
+    """
+    request = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": prompt},
+        ],
+    }
+    if tools:
+        request["tools"] = tools
+    if tool_choice:
+        request["tool_choice"] = tool_choice
+    return ChatStream(request, use_cache=use_cache)
@@ -0,0 +1,207 @@
+"""
+Purpose:
+    Route each pipeline step to a model tier.
+    Cheap steps (the gate check, the tool dispatch hop) go to a fast model,
+    a failed step is retried one tier up, and every attempt's latency, cost
+    and outcome is tracked per route so the mapping can be tuned.
+
+    Override the tiers and routes with a json file in MODEL_ROUTER_CONFIG:
+        {"tiers": {"fast": "gpt-3.5-turbo-1106"}, "routes": {"gate": "standard"}, "max_escalations": 1}
+
+Example:
+    router = model_router.router_from_env()
+    result = router.run(
+        model_router.ROUTE_SQL_GENERATION,
+        lambda model: generate_and_run_sql(model),
+        succeeded=lambda result: result.success,
+    )
+"""
+
+import dataclasses
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from da_ai_agent.data_types import RouteAttempt, RouteStats
+from da_ai_agent.modules import bench, cost_ledger, llm
+
+ROUTE_GATE = "gate"
+ROUTE_SQL_GENERATION = "sql_generation"
+ROUTE_TOOL_DISPATCH = "tool_dispatch"
+ROUTE_INSIGHTS = "insights"
+ROUTE_SELF_CORRECTION = "self_correction"
+
+ROUTES = [
+    ROUTE_GATE,
+    ROUTE_SQL_GENERATION,
+    ROUTE_TOOL_DISPATCH,
+    ROUTE_INSIGHTS,
+    ROUTE_SELF_CORRECTION,
+]
+
+TIER_FAST = "fast"
+TIER_STANDARD = "standard"
+TIER_STRONG = "strong"
+
+# weakest to strongest, escalation moves right
+TIERS = [TIER_FAST, TIER_STANDARD, TIER_STRONG]
+
+DEFAULT_MAP_TIER_TO_MODEL = {
+    TIER_FAST: "gpt-3.5-turbo-1106",
+    TIER_STANDARD: "gpt-4-1106-preview",
+    TIER_STRONG: "gpt-4",
+}
+
+DEFAULT_MAP_ROUTE_TO_TIER = {
+    ROUTE_GATE: TIER_FAST,
+    ROUTE_SQL_GENERATION: TIER_STANDARD,
+    ROUTE_TOOL_DISPATCH: TIER_FAST,
+    ROUTE_INSIGHTS: TIER_STANDARD,
+    ROUTE_SELF_CORRECTION: TIER_STRONG,
+}
+
+DEFAULT_MAX_ESCALATIONS = 1
+
+
+class ModelRouter:
+    """
+    Maps routes to tiers and tiers to models, and keeps RouteStats per route.
+    Set stats_path to also append every attempt to a jsonl file, so stats
+    can be compared across runs.
+    """
+
+    def __init__(
+        self,
+        map_route_to_tier: Optional[Dict[str, str]] = None,
+        map_tier_to_model: Optional[Dict[str, str]] = None,
+        max_escalations: int = DEFAULT_MAX_ESCALATIONS,
+        stats_path: Optional[str] = None,
+    ):
+        self.map_route_to_tier = {**DEFAULT_MAP_ROUTE_TO_TIER, **(map_route_to_tier or {})}
+        self.map_tier_to_model = {**DEFAULT_MAP_TIER_TO_MODEL, **(map_tier_to_model or {})}
+        self.max_escalations = max_escalations
+        self.stats_path = stats_path
+        self.map_route_to_stats: Dict[str, RouteStats] = defaultdict(RouteStats)
+
+        for route, tier in self.map_route_to_tier.items():
+            if tier not in TIERS:
+                raise ValueError(f"Unknown tier '{tier}' for route '{route}'. Use one of {TIERS}")
+
+    def model_for(self, route: str, escalation: int = 0) -> str:
+        """
+        Model of the route's tier, escalation tiers up (capped at the strongest).
+        """
+        if route not in self.map_route_to_tier:
+            raise ValueError(f"Unknown route: {route}. Use one of {ROUTES}")
+        tier_index = TIERS.index(self.map_route_to_tier[route])
+        return self.map_tier_to_model[TIERS[min(tier_index + escalation, len(TIERS) - 1)]]
+
+    def escalation_chain(self, route: str) -> List[str]:
+        """
+        Models to try in order, without repeats - the route's tier then up to max_escalations stronger ones.
+        """
+        chain = []
+        for escalation in range(self.max_escalations + 1):
+            model = self.model_for(route, escalation)
+            if model not in chain:
+                chain.append(model)
+        return chain
+
+    @contextmanager
+    def track(self, route: str, model: str, escalation: int = 0) -> Iterator[RouteAttempt]:
+        """
+        Time one attempt and attribute its usage to the route.
+        Set attempt.succeeded inside the block, an exception counts as a failure.
+        """
+        attempt = RouteAttempt(route=route, model=model, escalation=escalation)
+        route_usage = llm.usage_ledger.map_route_to_totals[route]
+        cost_before = route_usage.cost
+        started = time.perf_counter()
+        try:
+            with cost_ledger.scope(route=route):
+                yield attempt
+        finally:
+            attempt.latency_ms = (time.perf_counter() - started) * 1000
+            attempt.cost = route_usage.cost - cost_before
+            self.record(attempt)
+
+    def record(self, attempt: RouteAttempt):
+        self.map_route_to_stats[attempt.route].add(attempt)
+        if self.stats_path:
+            with open(self.stats_path, "a") as f:
+                f.write(json.dumps(dataclasses.asdict(attempt)) + "\n")
+
+    def run(
+        self,
+        route: str,
+        call: Callable[[str], Any],
+        succeeded: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        call(model) on the route's model, escalating to a stronger model while
+        succeeded(result) is False or call raises. Returns the last result,
+        re-raises the last error if the strongest model raised too.
+        """
+        chain = self.escalation_chain(route)
+        result = None
+        for escalation, model in enumerate(chain):
+            with self.track(route, model, escalation) as attempt:
+                try:
+                    result = call(model)
+                    attempt.succeeded = succeeded(result) if succeeded else True
+                except Exception as error:
+                    if escalation == len(chain) - 1:
+                        raise
+                    print(f"❌ {route} raised on {model}: {error}")
+
+            if attempt.succeeded:
+                return result
+            if escalation < len(chain) - 1:
+                print(f"⬆️ {route} failed on {model} - escalating to {chain[escalation + 1]}")
+
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            route: {
+                "calls": stats.calls,
+                "success_rate": round(stats.successes / stats.calls, 3) if stats.calls else None,
+                "escalations": stats.escalations,
+                "cost": round(stats.cost, 4),
+                "p50_ms": round(bench.percentile(stats.latencies_ms, 50), 1),
+                "p95_ms": round(bench.percentile(stats.latencies_ms, 95), 1),
+                "models": stats.map_model_to_calls,
+            }
+            for route, stats in self.map_route_to_stats.items()
+        }
+
+    def format_stats(self) -> str:
+        lines = [f"{'route':<16} {'calls':>5} {'success':>8} {'escalated':>9} {'cost':>8} {'p50 ms':>9} {'p95 ms':>9}"]
+        for route, stats in self.stats().items():
+            success_rate = f"{stats['success_rate']:.0%}" if stats["success_rate"] is not None else "n/a"
+            lines.append(
+                f"{route:<16} {stats['calls']:>5} {success_rate:>8} {stats['escalations']:>9} {stats['cost']:>8.4f} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f}"
+            )
+        return "\n".join(lines)
+
+
+def router_from_env() -> ModelRouter:
+    """
+    Router configured by the json file in MODEL_ROUTER_CONFIG (if set),
+    attempts appended to MODEL_ROUTER_STATS_PATH (if set).
+    """
+    config = {}
+    config_path = os.environ.get("MODEL_ROUTER_CONFIG")
+    if config_path:
+        with open(config_path) as f:
+            config = json.load(f)
+
+    return ModelRouter(
+        map_route_to_tier=config.get("routes"),
+        map_tier_to_model=config.get("tiers"),
+        max_escalations=config.get("max_escalations", DEFAULT_MAX_ESCALATIONS),
+        stats_path=os.environ.get("MODEL_ROUTER_STATS_PATH"),
+    )
@@ -0,0 +1,355 @@
+"""
+Purpose:
+    Local OpenAI-compatible stand-in that replays recorded API sessions, so
+    pipelines can be run and timed without network or an API key.
+
+    Every client in the repo (llm, llm_async, llm_stream, turbo4's Assistants
+    threads and runs, autogen) talks to it through OPENAI_BASE_URL - nothing
+    at the call sites changes.
+
+    record  proxy every request to the real API and append the exchange to a cassette (jsonl)
+    replay  answer from the cassette, with the recorded latency (scaled) or a fixed one
+
+    Streams are replayed chunk by chunk on their recorded timing, so time to
+    first token is simulated too. A request that isn't in the cassette gets a 404.
+
+Example:
+    # .env - record once with a real key, then replay offline
+    OPENAI_REPLAY_CASSETTE=cassettes/sales.jsonl
+    OPENAI_REPLAY_MODE=record
+
+    # or serve a cassette to another process
+    poetry run openai_replay --cassette cassettes/sales.jsonl --latency-scale 0.5
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+MODE_REPLAY = "replay"
+MODE_RECORD = "record"
+
+MODES = [MODE_REPLAY, MODE_RECORD]
+
+DEFAULT_UPSTREAM = "https://api.openai.com"
+UPSTREAM_TIMEOUT_SECONDS = 600
+
+# replay needs no real key, but every openai client refuses to start without one
+PLACEHOLDER_API_KEY = "sk-replay"
+
+# request headers passed to the real API when recording
+FORWARDED_HEADERS = ["Authorization", "Content-Type", "OpenAI-Beta", "OpenAI-Organization"]
+
+# response headers kept in the cassette - rate_limit reads them on 429s
+RECORDED_HEADERS = ["retry-after", "retry-after-ms"]
+
+
+def parse_body(body: bytes) -> Any:
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return body.decode("utf-8", "replace")
+
+
+def make_request_key(method: str, path: str, body: bytes) -> str:
+    """
+    sha256 of the method, path and canonical json body, so the same request
+    matches regardless of key order or whitespace.
+    """
+    payload = parse_body(body)
+    canonical = json.dumps([method, path, payload], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+def wait_until(start: float, offset_ms: float):
+    remaining_s = (offset_ms - elapsed_ms(start)) / 1000
+    if remaining_s > 0:
+        time.sleep(remaining_s)
+
+
+class Cassette:
+    """
+    Recorded interactions, one json object per line.
+    Replay hands out the interactions of a request in recorded order - repeated
+    polls of a run see its status progress as it did - and keeps repeating the
+    last one once they run out.
+    """
+
+    def __init__(self, path: str, truncate: bool = False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.map_key_to_interactions: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.map_key_to_next: Dict[str, int] = defaultdict(int)
+
+        if truncate:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "w").close()
+        elif os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        interaction = json.loads(line)
+                        self.map_key_to_interactions[interaction["key"]].append(interaction)
+
+    def __len__(self):
+        return sum(len(interactions) for interactions in self.map_key_to_interactions.values())
+
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            interactions = self.map_key_to_interactions.get(key)
+            if not interactions:
+                return None
+            index = min(self.map_key_to_next[key], len(interactions) - 1)
+            self.map_key_to_next[key] += 1
+            return interactions[index]
+
+    def append(self, interaction: Dict[str, Any]):
+        with self.lock:
+            self.map_key_to_interactions[interaction["key"]].append(interaction)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(interaction) + "\n")
+
+
+class ReplayRequestHandler(BaseHTTPRequestHandler):
+    server: "ReplayServer"
+
+    def do_GET(self):
+        self.handle_api_request()
+
+    def do_POST(self):
+        self.handle_api_request()
+
+    def do_DELETE(self):
+        self.handle_api_request()
+
+    def handle_api_request(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        key = make_request_key(self.command, self.path, body)
+        if self.server.mode == MODE_RECORD:
+            self.record(key, body)
+        else:
+            self.replay(key)
+
+    def replay(self, key: str):
+        started = time.perf_counter()
+        interaction = self.server.cassette.next(key)
+
+        if interaction is None:
+            self.server.count("misses")
+            message = f"No recorded response for {self.command} {self.path} in {self.server.cassette.path}"
+            print(f"❌ {message}")
+            error = {"error": {"message": message, "type": "cassette_miss", "param": None, "code": None}}
+            self.send_body(404, "application/json", json.dumps(error))
+            return
+
+        self.server.count("replayed")
+        if "chunks" in interaction:
+            self.start_stream(interaction["status"], interaction["content_type"], interaction.get("headers"))
+            for offset_ms, chunk in interaction["chunks"]:
+                wait_until(started, self.server.simulated_ms(offset_ms))
+                self.wfile.write(chunk.encode("utf-8"))
+                self.wfile.flush()
+        else:
+            wait_until(started, self.server.simulated_ms(interaction["latency_ms"]))
+            self.send_body(
+                interaction["status"], interaction["content_type"], interaction["body"], interaction.get("headers")
+            )
+
+    def record(self, key: str, body: bytes):
+        headers = {name: self.headers[name] for name in FORWARDED_HEADERS if self.headers.get(name)}
+        upstream_request = urllib.request.Request(
+            self.server.upstream + self.path, data=body or None, headers=headers, method=self.command
+        )
+
+        started = time.perf_counter()
+        try:
+            response = urllib.request.urlopen(upstream_request, timeout=UPSTREAM_TIMEOUT_SECONDS)
+        except urllib.error.HTTPError as error:
+            # 4xx / 5xx are recorded too, so replay fails (or backs off) the same way
+            response = error
+        except urllib.error.URLError as error:
+            print(f"❌ Could not reach {self.server.upstream}: {error.reason}")
+            self.send_body(502, "application/json", json.dumps({"error": {"message": str(error.reason)}}))
+            return
+
+        content_type = response.headers.get("Content-Type", "application/json")
+        interaction = {
+            "key": key,
+            "method": self.command,
+            "path": self.path,
+            "request": parse_body(body),
+            "status": response.getcode(),
+            "content_type": content_type,
+            "headers": {name: response.headers[name] for name in RECORDED_HEADERS if response.headers.get(name)},
+        }
+
+        if content_type.startswith("text/event-stream"):
+            self.start_stream(interaction["status"], content_type, interaction["headers"])
+            chunks = []
+            for line in response:
+                chunks.append([elapsed_ms(started), line.decode("utf-8")])
+                self.wfile.write(line)
+                self.wfile.flush()
+            interaction["chunks"] = chunks
+        else:
+            interaction["body"] = response.read().decode("utf-8")
+            self.send_body(interaction["status"], content_type, interaction["body"], interaction["headers"])
+
+        interaction["latency_ms"] = elapsed_ms(started)
+        self.server.cassette.append(interaction)
+        self.server.count("recorded")
+
+    def send_body(self, status: int, content_type: str, body: str, headers: Optional[Dict[str, str]] = None):
+        encoded = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def start_stream(self, status: int, content_type: str, headers: Optional[Dict[str, str]] = None):
+        # no content length - the stream ends when the connection closes
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Connection", "close")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    Serves the OpenAI REST API from a cassette (replay) or proxies it into one (record).
+
+    latency_ms      fixed time to the first byte of every response, overrides the recorded timing
+    latency_scale   multiplier on the recorded timing, 0 replays as fast as possible
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        cassette_path: str,
+        mode: str = MODE_REPLAY,
+        latency_ms: Optional[float] = None,
+        latency_scale: float = 1.0,
+        upstream: str = DEFAULT_UPSTREAM,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown replay mode: {mode}. Use one of {MODES}")
+
+        super().__init__((host, port), ReplayRequestHandler)
+        self.mode = mode
+        self.latency_ms = latency_ms
+        self.latency_scale = latency_scale
+        self.upstream = upstream.rstrip("/")
+        # recording starts a fresh cassette
+        self.cassette = Cassette(cassette_path, truncate=mode == MODE_RECORD)
+        self.lock = threading.Lock()
+        self.counts = {"replayed": 0, "recorded": 0, "misses": 0}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def simulated_ms(self, recorded_ms: float) -> float:
+        if self.latency_ms is not None:
+            return self.latency_ms
+        return recorded_ms * self.latency_scale
+
+    def count(self, name: str):
+        with self.lock:
+            self.counts[name] += 1
+
+    def start(self) -> "ReplayServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        print(f"📼 OpenAI {self.mode} on {self.base_url} ({self.cassette.path}, {len(self.cassette)} interactions)")
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        print(f"📼 OpenAI {self.mode} stopped: {self.counts}")
+
+
+def server_from_env() -> Optional[ReplayServer]:
+    """
+    Start a ReplayServer for OPENAI_REPLAY_CASSETTE (if set) and point every
+    openai client created afterwards at it. Call before any client is built.
+
+    OPENAI_REPLAY_MODE           replay (default) or record
+    OPENAI_REPLAY_LATENCY_MS     fixed latency per response
+    OPENAI_REPLAY_LATENCY_SCALE  multiplier on the recorded latency (default 1)
+    OPENAI_REPLAY_UPSTREAM       API recorded from (default https://api.openai.com)
+    """
+    cassette_path = os.environ.get("OPENAI_REPLAY_CASSETTE")
+    if not cassette_path:
+        return None
+
+    latency_ms = os.environ.get("OPENAI_REPLAY_LATENCY_MS")
+    server = ReplayServer(
+        cassette_path,
+        mode=os.environ.get("OPENAI_REPLAY_MODE", MODE_REPLAY),
+        latency_ms=float(latency_ms) if latency_ms else None,
+        latency_scale=float(os.environ.get("OPENAI_REPLAY_LATENCY_SCALE", 1.0)),
+        upstream=os.environ.get("OPENAI_REPLAY_UPSTREAM", DEFAULT_UPSTREAM),
+    ).start()
+
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    if server.mode == MODE_REPLAY and not os.environ.get("OPENAI_API_KEY"):
+        os.environ["OPENAI_API_KEY"] = PLACEHOLDER_API_KEY
+
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve (or record) OpenAI API sessions from a cassette")
+    parser.add_argument("--cassette", required=True, help="Cassette file (jsonl)")
+    parser.add_argument("--record", action="store_true", help="Proxy to the real API and record into the cassette")
+    parser.add_argument("--latency-ms", type=float, default=None, help="Fixed latency per response")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier on the recorded latency")
+    parser.add_argument("--upstream", default=DEFAULT_UPSTREAM)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        args.cassette,
+        mode=MODE_RECORD if args.record else MODE_REPLAY,
+        latency_ms=args.latency_ms,
+        latency_scale=args.latency_scale,
+        upstream=args.upstream,
+        port=args.port,
+    ).start()
+    print(f"export OPENAI_BASE_URL={server.base_url}")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,10 @@
 import dataclasses
 import json
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import autogen
 from da_ai_agent.agents.instruments import AgentInstruments
-from da_ai_agent.modules import llm
-from da_ai_agent.data_types import Chat, ConversationResult
+from da_ai_agent.modules import cost_ledger, llm, token_counter
+from da_ai_agent.data_types import Chat, ConversationResult, UsageTotals
 
 
 class Orchestrator:
@@ -37,6 +37,15 @@ class Orchestrator:
         # Function to validate results at the end of every conversation
         self.validate_results_func: callable = validate_results_func
 
+        # Running token count of self.messages, updated in add_message
+        self.transcript_tokens = token_counter.TokenCounter()
+
+        # Usage reported by the API for this team's replies, see generate_reply
+        self.usage = UsageTotals()
+
+        # agent name -> model -> (prompt tokens, completion tokens) already recorded
+        self.map_agent_to_recorded_usage: Dict[str, Dict[str, Tuple[int, int]]] = {}
+
         if len(self.agents) < 2:
             raise Exception("Orchestrator needs at least two agents")
 
@@ -110,32 +119,84 @@ class Orchestrator:
         Add a message to the orchestrator
         """
         self.messages.append(message)
+        self.transcript_tokens.add(self.message_to_str(message))
+
+    @staticmethod
+    def message_to_str(message) -> str:
+        """
+        Text of a message - content, or the function call when there's no content
+        """
+        if message is None:
+            return ""
+
+        if isinstance(message, dict):
+            content_from_dict = message.get("content", None)
+            func_call_from_dict = message.get("function_call", None)
+            content = content_from_dict or func_call_from_dict
+            return str(content) if content else ""
+
+        return str(message)
 
     def get_message_as_str(self):
         """
         Get all messages as a string
         """
+        return "".join(self.message_to_str(message) for message in self.messages)
 
-        messages_as_str = ""
+    def generate_reply(
+        self, agent: autogen.ConversableAgent, sender: autogen.ConversableAgent
+    ):
+        """
+        The agent's reply to sender, with the usage it took recorded for this team.
+        Custom replies (check_sql_nlq, generate_insights) call llm.* directly -
+        those calls are labeled and counted through the ledger scope.
+        autogen's own client usage is read afterwards, see record_usage.
+        """
+        with cost_ledger.scope(team=self.name), cost_ledger.collect(self.usage):
+            reply = agent.generate_reply(sender=sender)
 
-        for message in self.messages:
-            if message is None:
-                continue
+        self.record_usage(agent)
 
-            if isinstance(message, dict):
-                content_from_dict = message.get("content", None)
-                func_call_from_dict = message.get("function_call", None)
-                content = content_from_dict or func_call_from_dict
-                if not content:
-                    continue
-                messages_as_str += str(content)
-            else:
-                messages_as_str += str(message)
+        return reply
 
-        return messages_as_str
+    def record_usage(self, agent: autogen.ConversableAgent):
+        """
+        Record the tokens the agent's last reply used in the usage ledger.
+        autogen keeps cumulative usage per model on the agent's client - the
+        difference since the last call is this reply's usage.
+        """
+        client = getattr(agent, "client", None)
+        usage_summary = getattr(client, "actual_usage_summary", None) or {}
+        recorded = self.map_agent_to_recorded_usage.setdefault(agent.name, {})
+
+        for model, model_usage in usage_summary.items():
+            if not isinstance(model_usage, dict):
+                continue  # 'total_cost'
+            prompt_tokens = model_usage.get("prompt_tokens", 0)
+            completion_tokens = model_usage.get("completion_tokens", 0)
+            recorded_prompt, recorded_completion = recorded.get(model, (0, 0))
+            if (prompt_tokens, completion_tokens) == (recorded_prompt, recorded_completion):
+                continue
+            recorded[model] = (prompt_tokens, completion_tokens)
+
+            record = llm.usage_ledger.record(
+                model,
+                prompt_tokens - recorded_prompt,
+                completion_tokens - recorded_completion,
+                team=self.name,
+                session_id=self.instruments.session_id,
+            )
+            self.usage.add(record)
 
     def get_cost_and_tokens(self):
-        return llm.estimate_price_and_tokens(self.get_message_as_str())
+        """
+        Cost and tokens from the usage the API reported.
+        Estimated from the running transcript count only when no usage was reported.
+        """
+        if self.usage.calls:
+            return round(self.usage.cost, 4), self.usage.tokens
+        tokens = self.transcript_tokens.tokens
+        return llm.estimate_price(tokens), tokens
 
     def has_functions(self, agent: autogen.ConversableAgent):
         return len(agent._function_map) > 0
@@ -150,7 +211,7 @@ class Orchestrator:
 
         self.send_message(agent_a, agent_b, message)
 
-        reply = agent_b.generate_reply(sender=agent_a)
+        reply = self.generate_reply(agent_b, agent_a)
 
         self.add_message(reply)
 
@@ -166,7 +227,7 @@ class Orchestrator:
 
         self.send_message(agent_a, agent_b, message)
 
-        reply = agent_b.generate_reply(sender=agent_a)
+        reply = self.generate_reply(agent_b, agent_a)
 
         self.send_message(agent_b, agent_b, message)
 
@@ -191,7 +252,7 @@ class Orchestrator:
 
         self.send_message(agent, agent, message)
 
-        reply = agent.generate_reply(sender=agent)
+        reply = self.generate_reply(agent, agent)
 
         self.send_message(agent, agent, message)
 
@@ -0,0 +1,296 @@
+"""
+Purpose:
+    Shared rate limit scheduler for OpenAI requests.
+    Token buckets for requests-per-minute and tokens-per-minute, charged with
+    an estimate before a request is sent and settled with the actual usage
+    after. Waiting requests are served by priority (interactive before
+    insights), and 429s, timeouts and 5xx errors are retried with jittered
+    exponential backoff that honors the retry-after headers.
+
+Example:
+    with rate_limit.priority(rate_limit.PRIORITY_INSIGHTS):
+        llm.prompt_json_response(insights_prompt)
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import openai
+
+# lower value is served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_INSIGHTS = 1
+
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 150_000
+DEFAULT_MAX_RETRIES = 6
+BASE_RETRY_DELAY_SECONDS = 1.0
+MAX_RETRY_DELAY_SECONDS = 60.0
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.InternalServerError,
+)
+
+current_priority: ContextVar[int] = ContextVar(
+    "llm_request_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+@contextmanager
+def priority(level: int):
+    """
+    Run the requests made inside the block at the given priority.
+    """
+    token = current_priority.set(level)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Seconds the API asked us to wait: retry-after-ms, or retry-after as seconds or an HTTP date.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def usage_total_tokens(response: Any) -> Optional[int]:
+    """
+    usage.total_tokens of a response dict or object, None when not reported.
+    """
+    usage = response.get("usage") if isinstance(response, dict) else getattr(response, "usage", None)
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return usage.get("total_tokens")
+    return getattr(usage, "total_tokens", None)
+
+
+class TokenBucket:
+    """
+    Refills continuously at per_minute / 60 per second, up to per_minute.
+    The level may go negative when a request used more than its estimate.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.level = float(per_minute)
+        self.refill_per_second = per_minute / 60
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        # a request larger than the whole bucket runs once the bucket is full
+        amount = min(amount, self.capacity)
+        self.refill()
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_per_second
+
+    def take(self, amount: float):
+        self.level -= amount
+
+    def give_back(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimitScheduler:
+    """
+    Thread safe, shared by every OpenAI call in the process.
+    requests_per_minute / tokens_per_minute of 0 disable that budget.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = BASE_RETRY_DELAY_SECONDS,
+        max_delay: float = MAX_RETRY_DELAY_SECONDS,
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.condition = threading.Condition()
+        # heap of (priority, arrival) tickets, only the head may take budget
+        self.queue = []
+        self.arrivals = itertools.count()
+        # a 429 pauses every caller, not just the one that received it
+        self.paused_until = 0.0
+        self.counters = Counter()
+
+    def wait_time(self, estimated_tokens: int) -> float:
+        waits = [self.paused_until - time.monotonic()]
+        if self.request_bucket:
+            waits.append(self.request_bucket.wait_time(1))
+        if self.token_bucket:
+            waits.append(self.token_bucket.wait_time(estimated_tokens))
+        return max(waits)
+
+    def acquire(self, estimated_tokens: int = 0, priority: Optional[int] = None):
+        """
+        Block until the request is first in line and both budgets allow it.
+        """
+        ticket = (current_priority.get() if priority is None else priority, next(self.arrivals))
+        started = time.monotonic()
+
+        with self.condition:
+            heapq.heappush(self.queue, ticket)
+            try:
+                while True:
+                    wait = None
+                    if self.queue[0] == ticket:
+                        wait = self.wait_time(estimated_tokens)
+                        if wait <= 0:
+                            if self.request_bucket:
+                                self.request_bucket.take(1)
+                            if self.token_bucket:
+                                self.token_bucket.take(estimated_tokens)
+                            break
+                    self.condition.wait(timeout=wait)
+            finally:
+                self.queue.remove(ticket)
+                heapq.heapify(self.queue)
+                self.condition.notify_all()
+
+            waited = time.monotonic() - started
+            self.counters["requests"] += 1
+            if waited > 0.001:
+                self.counters["throttled"] += 1
+                self.counters["throttled_ms"] += int(waited * 1000)
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """
+        Replace the estimate charged by acquire with the actual usage.
+        """
+        if not self.token_bucket or actual_tokens is None:
+            return
+        with self.condition:
+            self.token_bucket.give_back(estimated_tokens - actual_tokens)
+            self.condition.notify_all()
+
+    def backoff_delay(self, attempt: int, error: Exception) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base_delay)
+        # full jitter
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def on_retryable_error(self, attempt: int, error: Exception) -> float:
+        delay = self.backoff_delay(attempt, error)
+        with self.condition:
+            self.counters["retries"] += 1
+            if isinstance(error, openai.RateLimitError):
+                self.counters["rate_limited"] += 1
+                self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        print(
+            f"⏳ {type(error).__name__} - retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
+        )
+        return delay
+
+    def submit(
+        self,
+        call: Callable[[], Any],
+        estimated_tokens: int = 0,
+        get_usage: Callable[[Any], Optional[int]] = usage_total_tokens,
+        priority: Optional[int] = None,
+    ) -> Any:
+        """
+        Run call() within the budgets, retrying rate limit, timeout and server errors.
+        get_usage reads the actual tokens used from the result.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(estimated_tokens, priority)
+            try:
+                result = call()
+            except RETRYABLE_ERRORS as error:
+                # the rejected request did not use its tokens
+                self.settle(estimated_tokens, 0)
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.on_retryable_error(attempt, error))
+                continue
+            self.settle(estimated_tokens, get_usage(result))
+            return result
+
+    async def submit_async(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        estimated_tokens: int = 0,
+        get_usage: Callable[[Any], Optional[int]] = usage_total_tokens,
+        priority: Optional[int] = None,
+    ) -> Any:
+        """
+        submit for coroutines - waits for budget in a worker thread, backs off with asyncio.sleep.
+        """
+        priority = current_priority.get() if priority is None else priority
+        for attempt in range(self.max_retries + 1):
+            await asyncio.to_thread(self.acquire, estimated_tokens, priority)
+            try:
+                result = await call()
+            except RETRYABLE_ERRORS as error:
+                self.settle(estimated_tokens, 0)
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self.on_retryable_error(attempt, error))
+                continue
+            self.settle(estimated_tokens, get_usage(result))
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self.condition:
+            return {
+                **self.counters,
+                "queued": len(self.queue),
+                "tokens_available": int(self.token_bucket.level) if self.token_bucket else None,
+            }
+
+
+def scheduler_from_env() -> RateLimitScheduler:
+    """
+    Budgets from OPENAI_RPM, OPENAI_TPM and OPENAI_MAX_RETRIES, defaults otherwise.
+    """
+    return RateLimitScheduler(
+        requests_per_minute=int(os.environ.get("OPENAI_RPM", DEFAULT_REQUESTS_PER_MINUTE)),
+        tokens_per_minute=int(os.environ.get("OPENAI_TPM", DEFAULT_TOKENS_PER_MINUTE)),
+        max_retries=int(os.environ.get("OPENAI_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+    )
@@ -0,0 +1,31 @@
+"""
+Purpose:
+    Diff two schema snapshots so embeddings are only recomputed for what changed.
+    A snapshot maps a key (table name, or (table, column)) to the text that gets embedded.
+"""
+
+from typing import Dict, Hashable
+
+from da_ai_agent.data_types import SchemaDiff
+
+
+def diff_snapshots(old: Dict[Hashable, str], new: Dict[Hashable, str]) -> SchemaDiff:
+    """
+    Keys only in new are added, keys only in old are dropped,
+    keys in both whose text differs are altered. Each list is sorted.
+    """
+    return SchemaDiff(
+        added=sorted(key for key in new if key not in old),
+        dropped=sorted(key for key in old if key not in new),
+        altered=sorted(key for key in new if key in old and old[key] != new[key]),
+    )
+
+
+def format_diff(diff: SchemaDiff, noun: str = "tables") -> str:
+    """
+    '+2 added, -1 dropped, ~3 altered tables'
+    """
+    return (
+        f"+{len(diff.added)} added, -{len(diff.dropped)} dropped, "
+        f"~{len(diff.altered)} altered {noun}"
+    )
@@ -0,0 +1,251 @@
+"""
+Purpose:
+    Prebuilt schema index artifacts.
+    index_schema crawls the database once and writes table definitions, column
+    metadata, the foreign key graph and the embedding vectors to a versioned
+    directory. The CLIs load it at startup instead of embedding every table on
+    the first prompt - add_tables then only re-embeds what changed since.
+
+    <index dir>/
+        LATEST                      name of the newest version directory
+        v1-<schema hash>/
+            manifest.json           format version, schema hash, database, model, counts
+            tables.json             table definitions, foreign key graph, size hints
+            columns.json            columns, key columns (postgres only)
+            table_embeddings.npz    table names + one vector per table
+            column_embeddings.npz   column vectors, stacked in columns.json order
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from da_ai_agent.data_types import ColumnSchema
+from da_ai_agent.modules import bert
+
+ARTIFACT_FORMAT_VERSION = 1
+DEFAULT_INDEX_DIR = ".schema_index"
+LATEST_FILE = "LATEST"
+
+DATABASE_POSTGRES = "postgres"
+DATABASE_PRESTO = "presto"
+
+
+def compute_schema_hash(artifacts: dict, model: str) -> str:
+    """
+    Hash of every persisted json artifact (table definitions, foreign keys,
+    size hints, column text, key columns, notes) and the embedding model that
+    produced the vectors. Vectors are derived from these, so any change to
+    what would be written gets a new version directory.
+    """
+    digest = hashlib.sha1(model.encode("utf-8"))
+    digest.update(json.dumps(artifacts, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def write_json(path: str, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+
+def read_json(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_index(
+    embedder,
+    index_dir: str,
+    database: str,
+    foreign_key_graph: Optional[Dict[str, List[str]]] = None,
+) -> str:
+    """
+    Write the state of a Postgres or Presto DatabaseEmbedder to a new version
+    directory and point LATEST at it. Returns the version directory.
+    """
+    model = bert.model_key(embedder.quantize)
+
+    tables_artifact = {
+        "table_defs": embedder.map_name_to_table_def,
+        "related_tables": foreign_key_graph or {},
+        "size_hints": getattr(embedder, "map_name_to_size_hint", {}),
+    }
+
+    # column level index - only the Postgres embedder has one
+    map_name_to_column_embeddings = getattr(embedder, "map_name_to_column_embeddings", {})
+    column_tables = sorted(map_name_to_column_embeddings)
+    columns_artifact = None
+    if getattr(embedder, "columns_indexed", False):
+        columns_artifact = {
+            "columns": {
+                table_name: [
+                    {"name": c.name, "data_type": c.data_type, "hints": c.hints}
+                    for c in embedder.map_name_to_columns[table_name]
+                ]
+                for table_name in column_tables
+            },
+            "key_columns": embedder.map_name_to_key_columns,
+            "table_notes": embedder.map_name_to_table_notes,
+        }
+
+    schema_hash = compute_schema_hash(
+        {"database": database, "tables": tables_artifact, "columns": columns_artifact}, model
+    )
+    version = f"v{ARTIFACT_FORMAT_VERSION}-{schema_hash[:12]}"
+    version_dir = os.path.join(index_dir, version)
+
+    if os.path.exists(os.path.join(version_dir, "manifest.json")):
+        # same inputs, same artifacts - only LATEST needs to point here
+        print(f"✅ Schema index {version} is up to date")
+    else:
+        # written to a temporary directory and renamed into place, a version directory is never partial
+        tmp_dir = f"{version_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        write_artifacts(
+            embedder,
+            tmp_dir,
+            database,
+            model,
+            schema_hash,
+            tables_artifact,
+            columns_artifact,
+            column_tables,
+        )
+        shutil.rmtree(version_dir, ignore_errors=True)
+        os.rename(tmp_dir, version_dir)
+
+    # written last and swapped in atomically so readers never see a half written version
+    latest_tmp = os.path.join(index_dir, LATEST_FILE + ".tmp")
+    with open(latest_tmp, "w") as f:
+        f.write(version)
+    os.replace(latest_tmp, os.path.join(index_dir, LATEST_FILE))
+
+    return version_dir
+
+
+def write_artifacts(
+    embedder,
+    version_dir: str,
+    database: str,
+    model: str,
+    schema_hash: str,
+    tables_artifact: dict,
+    columns_artifact: Optional[dict],
+    column_tables: List[str],
+) -> dict:
+    """
+    Write the vectors, json artifacts and manifest of one version. Returns the manifest.
+    """
+    table_names = sorted(embedder.map_name_to_embeddings)
+    np.savez(
+        os.path.join(version_dir, "table_embeddings.npz"),
+        names=np.array(table_names),
+        embeddings=np.concatenate([embedder.map_name_to_embeddings[name] for name in table_names])
+        if table_names
+        else np.zeros((0, 0)),
+    )
+    write_json(os.path.join(version_dir, "tables.json"), tables_artifact)
+
+    n_columns = 0
+    if columns_artifact is not None:
+        write_json(os.path.join(version_dir, "columns.json"), columns_artifact)
+        map_name_to_column_embeddings = embedder.map_name_to_column_embeddings
+        column_embeddings = [
+            np.asarray(map_name_to_column_embeddings[name])
+            for name in column_tables
+            if len(map_name_to_column_embeddings[name])
+        ]
+        n_columns = sum(len(embeddings) for embeddings in column_embeddings)
+        np.savez(
+            os.path.join(version_dir, "column_embeddings.npz"),
+            embeddings=np.concatenate(column_embeddings) if column_embeddings else np.zeros((0, 0)),
+        )
+
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "schema_hash": schema_hash,
+        "database": database,
+        "model": model,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "n_tables": len(table_names),
+        "n_columns": n_columns,
+    }
+    write_json(os.path.join(version_dir, "manifest.json"), manifest)
+    return manifest
+
+
+def get_latest_version_dir(index_dir: str) -> Optional[str]:
+    latest_path = os.path.join(index_dir, LATEST_FILE)
+    if not os.path.exists(latest_path):
+        return None
+    with open(latest_path) as f:
+        return os.path.join(index_dir, f.read().strip())
+
+
+def load_index(embedder, index_dir: str, database: str) -> Optional[dict]:
+    """
+    Fill a DatabaseEmbedder from the latest artifact in index_dir.
+    Returns the manifest, or None when there is no usable artifact.
+    """
+    version_dir = get_latest_version_dir(index_dir)
+    if version_dir is None:
+        print(f"⚠️ No schema index found in {index_dir} - run index_schema to build one")
+        return None
+
+    manifest = read_json(os.path.join(version_dir, "manifest.json"))
+    model = bert.model_key(embedder.quantize)
+    if manifest["format_version"] != ARTIFACT_FORMAT_VERSION:
+        print(f"⚠️ Schema index {version_dir} has format {manifest['format_version']}, expected {ARTIFACT_FORMAT_VERSION} - ignoring")
+        return None
+    if manifest["database"] != database or manifest["model"] != model:
+        print(f"⚠️ Schema index {version_dir} was built for {manifest['database']}/{manifest['model']} - ignoring")
+        return None
+
+    tables = read_json(os.path.join(version_dir, "tables.json"))
+    table_embeddings = np.load(os.path.join(version_dir, "table_embeddings.npz"))
+    embedder.map_name_to_table_def = tables["table_defs"]
+    embedder.map_name_to_embeddings = {
+        str(name): table_embeddings["embeddings"][i : i + 1]
+        for i, name in enumerate(table_embeddings["names"])
+    }
+    embedder.word_matcher = None
+
+    if hasattr(embedder, "map_name_to_related_tables"):
+        embedder.map_name_to_related_tables = tables["related_tables"]
+    if hasattr(embedder, "map_name_to_size_hint"):
+        embedder.map_name_to_size_hint = tables.get("size_hints", {})
+
+    columns_path = os.path.join(version_dir, "columns.json")
+    if hasattr(embedder, "map_name_to_columns") and os.path.exists(columns_path):
+        columns = read_json(columns_path)
+        column_embeddings = np.load(os.path.join(version_dir, "column_embeddings.npz"))["embeddings"]
+        embedder.map_name_to_key_columns = columns["key_columns"]
+        embedder.map_name_to_table_notes = columns.get("table_notes", {})
+        embedder.map_name_to_columns = {}
+        embedder.map_name_to_column_embeddings = {}
+        offset = 0
+        for table_name, table_columns in columns["columns"].items():
+            embedder.map_name_to_columns[table_name] = [
+                ColumnSchema(table_name, c["name"], c["data_type"], c["hints"])
+                for c in table_columns
+            ]
+            embedder.map_name_to_column_embeddings[table_name] = column_embeddings[
+                offset : offset + len(table_columns)
+            ]
+            offset += len(table_columns)
+        embedder.columns_indexed = True
+
+    if hasattr(embedder, "invalidate_schema_caches"):
+        embedder.invalidate_schema_caches()
+
+    print(
+        f"📂 Loaded schema index {os.path.basename(version_dir)}: "
+        f"{manifest['n_tables']} tables, {manifest['n_columns']} columns, built {manifest['created_at']}"
+    )
+    return manifest
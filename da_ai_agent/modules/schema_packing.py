@@ -0,0 +1,91 @@
+"""
+Purpose:
+    Fit ranked table definitions into a prompt token budget.
+
+    Stages, cheapest loss of information first:
+        1. full      - every candidate with its full definition
+        2. pruned    - lowest scoring tables swap to their pruned definition
+        3. dropped   - lowest scoring tables are removed
+    The highest scoring table is never dropped.
+"""
+
+from typing import Callable, List
+
+from da_ai_agent.data_types import PackedSchema, SchemaCandidate
+from da_ai_agent.modules import token_counter
+
+
+def pack_schema(
+    candidates: List[SchemaCandidate],
+    token_budget: int,
+    count_tokens: Callable[[str], int] = token_counter.count_tokens,
+    separator: str = "\n\n",
+) -> PackedSchema:
+    """
+    Select the best subset of table definitions under token_budget.
+    """
+    ranked = sorted(candidates, key=lambda c: c.score, reverse=True)
+
+    map_name_to_full_tokens = {c.table_name: count_tokens(c.full_definition) for c in ranked}
+    map_name_to_pruned_tokens = {
+        c.table_name: count_tokens(c.pruned_definition)
+        for c in ranked
+        if c.pruned_definition is not None
+    }
+
+    pruned = set()
+    included = [c.table_name for c in ranked]
+
+    def total_tokens():
+        return sum(
+            map_name_to_pruned_tokens[name] if name in pruned else map_name_to_full_tokens[name]
+            for name in included
+        )
+
+    tokens_per_stage = {"full": total_tokens()}
+
+    # stage 2 - degrade to pruned definitions, lowest score first
+    for candidate in reversed(ranked):
+        if total_tokens() <= token_budget:
+            break
+        name = candidate.table_name
+        if map_name_to_pruned_tokens.get(name, map_name_to_full_tokens[name]) < map_name_to_full_tokens[name]:
+            pruned.add(name)
+    tokens_per_stage["pruned"] = total_tokens()
+
+    # stage 3 - drop tables, lowest score first
+    dropped = []
+    while total_tokens() > token_budget and len(included) > 1:
+        dropped.append(included.pop())
+    tokens_per_stage["dropped"] = total_tokens()
+
+    map_name_to_candidate = {c.table_name: c for c in ranked}
+    table_definitions = separator.join(
+        map_name_to_candidate[name].pruned_definition
+        if name in pruned
+        else map_name_to_candidate[name].full_definition
+        for name in included
+    )
+
+    return PackedSchema(
+        table_definitions=table_definitions,
+        full_tables=[name for name in included if name not in pruned],
+        pruned_tables=[name for name in included if name in pruned],
+        dropped_tables=dropped,
+        tokens_per_stage=tokens_per_stage,
+        token_budget=token_budget,
+    )
+
+
+def format_packing_report(packed: PackedSchema) -> str:
+    """
+    One line summary of tokens saved per stage.
+    """
+    full = packed.tokens_per_stage["full"]
+    pruned = packed.tokens_per_stage["pruned"]
+    dropped = packed.tokens_per_stage["dropped"]
+    return (
+        f"budget {packed.token_budget}: full {full} tokens"
+        f" -> pruned {pruned} (saved {full - pruned}, {len(packed.pruned_tables)} tables)"
+        f" -> dropped {dropped} (saved {pruned - dropped}, {len(packed.dropped_tables)} tables)"
+    )
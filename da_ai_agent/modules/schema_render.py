@@ -0,0 +1,160 @@
+"""
+Purpose:
+    Render table definitions for prompts in one of several dialects.
+    Shared by the Postgres and Presto managers and embedders.
+
+    ddl          CREATE TABLE orders (
+                 id integer,
+                 created_at timestamp without time zone
+                 );
+    compact      orders(id:integer,created_at:timestamp without time zone)
+    abbreviated  orders(id:int,created_at:ts)
+    lines        orders
+                 id, integer
+                 created_at, timestamp without time zone
+
+    Table notes (e.g. a partition summary) follow the definition as '-- ' comments.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from da_ai_agent.data_types import ColumnSchema
+
+DIALECT_DDL = "ddl"
+DIALECT_COMPACT = "compact"
+DIALECT_ABBREVIATED = "abbreviated"
+DIALECT_LINES = "lines"
+
+DIALECTS = [DIALECT_DDL, DIALECT_COMPACT, DIALECT_ABBREVIATED, DIALECT_LINES]
+
+TYPE_ABBREVIATIONS = {
+    "character varying": "varchar",
+    "character": "char",
+    "timestamp without time zone": "ts",
+    "timestamp with time zone": "tstz",
+    "time without time zone": "time",
+    "time with time zone": "timetz",
+    "integer": "int",
+    "smallint": "int2",
+    "bigint": "int8",
+    "double precision": "float8",
+    "real": "float4",
+    "numeric": "num",
+    "decimal": "num",
+    "boolean": "bool",
+    "jsonb": "jsonb",
+    "timestamp": "ts",
+}
+
+TYPE_MODIFIER_PATTERN = re.compile(r"\(.*\)")
+
+
+def abbreviate_type(data_type: str) -> str:
+    """
+    'character varying(255)' -> 'varchar', 'timestamp without time zone' -> 'ts'
+    """
+    base_type = TYPE_MODIFIER_PATTERN.sub("", data_type).strip().lower()
+    is_array = base_type.endswith("[]")
+    base_type = base_type.rstrip("[]")
+    abbreviated = TYPE_ABBREVIATIONS.get(base_type, base_type)
+    return abbreviated + "[]" if is_array else abbreviated
+
+
+def columns_from_mapping(table_name: str, map_column_to_type: Dict[str, str]) -> List[ColumnSchema]:
+    """
+    {'id': 'integer', ...} (Presto table definition) -> [ColumnSchema, ...]
+    """
+    return [
+        ColumnSchema(table_name, column_name, data_type)
+        for column_name, data_type in map_column_to_type.items()
+    ]
+
+
+def render_table(
+    table_name: str,
+    columns: List[ColumnSchema],
+    dialect: str = DIALECT_DDL,
+    n_omitted: int = 0,
+    notes: Optional[List[str]] = None,
+) -> str:
+    """
+    Render one table definition. n_omitted > 0 marks the definition as pruned.
+    """
+    note_lines = [f"-- {note}" for note in notes or []]
+
+    if dialect == DIALECT_DDL:
+        body = ",\n".join(f"{column.name} {column.data_type}" for column in columns)
+        if n_omitted > 0:
+            body = "\n".join(filter(None, [body, f"-- {n_omitted} more columns omitted"]))
+        definition = f"CREATE TABLE {table_name} (\n{body}\n);" if body else f"CREATE TABLE {table_name} (\n);"
+        return "\n".join([definition] + note_lines)
+
+    if dialect in (DIALECT_COMPACT, DIALECT_ABBREVIATED):
+        to_type = abbreviate_type if dialect == DIALECT_ABBREVIATED else (lambda t: t)
+        parts = [f"{column.name}:{to_type(column.data_type)}" for column in columns]
+        if n_omitted > 0:
+            parts.append(f"+{n_omitted} more")
+        definition = f"{table_name}({','.join(parts)})"
+        # one table per line in the compact dialects
+        return f"{definition} -- {'; '.join(notes)}" if notes else definition
+
+    if dialect == DIALECT_LINES:
+        lines = [table_name] + [f"{column.name}, {column.data_type}" for column in columns]
+        if n_omitted > 0:
+            lines.append(f"... {n_omitted} more columns")
+        return "\n".join(lines + note_lines)
+
+    raise ValueError(f"Unknown schema dialect: {dialect}. Use one of {DIALECTS}")
+
+
+def format_row_count(n_rows: int) -> str:
+    """
+    Order of magnitude bucket: 'empty', '<1K rows', '~40K rows', '~3M rows', '~1.2B rows'
+    """
+    if n_rows <= 0:
+        return "empty"
+    if n_rows < 1_000:
+        return "<1K rows"
+    for divisor, suffix in ((1_000_000_000, "B"), (1_000_000, "M"), (1_000, "K")):
+        # 999,999 rounds to '~1M', not '~1000K'
+        if n_rows >= divisor * 0.9995:
+            value = n_rows / divisor
+            value = f"{value:.1f}".rstrip("0").rstrip(".") if value < 10 else f"{value:.0f}"
+            return f"~{value}{suffix} rows"
+
+
+def format_size_hint(n_rows: int, indexes: List[tuple]) -> str:
+    """
+    '~12M rows, indexed: (id) pk, (user_id), (created_at, status) unique'
+    indexes - (columns, is unique, is primary) tuples, see PostgresManager.get_index_definitions
+    """
+    hint = format_row_count(n_rows)
+    if not indexes:
+        return f"{hint}, no indexes"
+
+    parts = []
+    for columns, is_unique, is_primary in indexes:
+        flag = " pk" if is_primary else " unique" if is_unique else ""
+        parts.append(f"({', '.join(columns)}){flag}")
+    return f"{hint}, indexed: {', '.join(parts)}"
+
+
+def table_separator(dialect: str) -> str:
+    """
+    Compact dialects put one table per line, the others a blank line between tables.
+    """
+    return "\n" if dialect in (DIALECT_COMPACT, DIALECT_ABBREVIATED) else "\n\n"
+
+
+def render_tables(
+    map_table_name_to_columns: Dict[str, List[ColumnSchema]],
+    dialect: str = DIALECT_DDL,
+) -> str:
+    """
+    Render several table definitions in the given dialect.
+    """
+    return table_separator(dialect).join(
+        render_table(table_name, columns, dialect)
+        for table_name, columns in map_table_name_to_columns.items()
+    )
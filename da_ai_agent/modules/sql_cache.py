@@ -0,0 +1,401 @@
+"""
+Purpose:
+    Semantic NL-to-SQL cache.
+    Prompts are embedded with the DatabaseEmbedder's BERT model. A new prompt
+    that is close enough to an earlier successful prompt (same schema version)
+    reuses that prompt's SQL and skips SQL generation.
+
+    BERT vectors are anisotropic - unrelated prompts can score above 0.9 and
+    prompts that differ only in a literal ("top 5" vs "top 10", 2022 vs 2023)
+    score close to 1.0. So a hit also needs the literals (numbers, quoted
+    strings, dates) of both prompts to match exactly, and the threshold is
+    calibrated on a paraphrase set (see calibrate) instead of fixed.
+
+    A sample of hits is flagged for audit: the caller generates SQL as usual
+    and reports whether both queries returned the same rows. Disagreements are
+    false positives and evict the entry.
+"""
+
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from da_ai_agent.data_types import ParaphrasePair, SQLCacheHit
+from da_ai_agent.modules import bert
+from da_ai_agent.modules.embeddings_postgres import DatabaseEmbedder, normalize_prompt
+
+# used until the cache file has a calibrated threshold for the embedding model
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+DEFAULT_AUDIT_RATE = 0.05
+# share of non-equivalent paraphrase pairs allowed to score above the calibrated threshold
+DEFAULT_MAX_FALSE_POSITIVE_RATE = 0.01
+
+QUOTED_PATTERN = re.compile(r"(?<!\w)'([^']+)'(?!\w)|\"([^\"]+)\"")
+DATE_PATTERN = re.compile(r"\b\d{4}-\d{1,2}-\d{1,2}\b|\b\d{1,2}/\d{1,2}/\d{2,4}\b")
+NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?")
+WORD_PATTERN = re.compile(r"[a-z]+")
+
+map_number_word_to_digits = {
+    word: str(i)
+    for i, word in enumerate(
+        "zero one two three four five six seven eight nine ten eleven twelve "
+        "thirteen fourteen fifteen sixteen seventeen eighteen nineteen twenty".split()
+    )
+}
+map_number_word_to_digits.update({"thirty": "30", "fifty": "50", "hundred": "100", "thousand": "1000"})
+
+MONTHS = [
+    "january", "february", "march", "april", "may", "june", "july",
+    "august", "september", "october", "november", "december",
+]
+map_month_to_number = {month: str(i + 1) for i, month in enumerate(MONTHS)}
+map_month_to_number.update({month[:3]: number for month, number in list(map_month_to_number.items())})
+# ordinary words too ("may I see", "mar") - May isn't recognized, March only spelled out
+for ambiguous in ["may", "mar"]:
+    map_month_to_number.pop(ambiguous)
+
+
+def extract_literals(prompt: str) -> Tuple[str, ...]:
+    """
+    Values a prompt filters or limits on, which the SQL hardcodes.
+
+    "top 5 customers in 'EMEA' since 2023-01-01" -> ('"EMEA"', '2023-01-01', '5')
+    "top five customers" -> ('5',)
+    """
+    literals = []
+
+    # quoted values keep their case, the SQL compares them as written
+    for match in QUOTED_PATTERN.finditer(prompt):
+        literals.append(f'"{match.group(1) or match.group(2)}"')
+    text = QUOTED_PATTERN.sub(" ", prompt).lower()
+
+    for match in DATE_PATTERN.finditer(text):
+        literals.append(match.group(0))
+    text = DATE_PATTERN.sub(" ", text)
+
+    literals += NUMBER_PATTERN.findall(text.replace(",", ""))
+
+    for word in WORD_PATTERN.findall(text):
+        if word in map_number_word_to_digits:
+            literals.append(map_number_word_to_digits[word])
+        elif word in map_month_to_number:
+            literals.append(f"month {map_month_to_number[word]}")
+
+    return tuple(sorted(literals))
+
+
+def results_match(results_json_a: str, results_json_b: str) -> bool:
+    """
+    Same rows, ignoring row order and column names (generated SQL often aliases differently).
+    """
+
+    def normalize(results_json):
+        return sorted(tuple(str(value) for value in row.values()) for row in json.loads(results_json))
+
+    try:
+        return normalize(results_json_a) == normalize(results_json_b)
+    except (ValueError, AttributeError):
+        return False
+
+
+class SemanticSQLCache:
+    """
+    SQLite backed (prompt embedding -> SQL) cache, searched by cosine similarity.
+    """
+
+    def __init__(
+        self,
+        embedder: DatabaseEmbedder,
+        path: str = ":memory:",
+        threshold: Optional[float] = None,
+        audit_rate: float = DEFAULT_AUDIT_RATE,
+        max_entries: int = 5_000,
+    ):
+        self.embedder = embedder
+        self.audit_rate = audit_rate
+        self.max_entries = max_entries
+        self.lookups = 0
+        self.hits = 0
+        self.bypasses = 0
+        # lookups whose best matches were all rejected for different literals
+        self.literal_rejects = 0
+        self.lock = threading.Lock()
+        # (schema version, entry ids, literals per entry, normalized embedding matrix), rebuilt after writes
+        self.index = None
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sql_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    prompt TEXT NOT NULL,
+                    sql TEXT NOT NULL,
+                    schema_version TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sql_cache_audits (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    entry_id INTEGER NOT NULL,
+                    prompt TEXT NOT NULL,
+                    cached_prompt TEXT NOT NULL,
+                    sql TEXT NOT NULL,
+                    similarity REAL NOT NULL,
+                    agreed INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sql_cache_settings (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+                """
+            )
+
+        # an explicit threshold wins over the calibrated one
+        self.threshold = threshold if threshold is not None else self.get_calibrated_threshold()
+        if self.threshold is None:
+            print(
+                f"⚠️ SQL cache threshold not calibrated for {self.threshold_key()}, using {DEFAULT_SIMILARITY_THRESHOLD}"
+                " - run scripts/calibrate_sql_cache.py"
+            )
+            self.threshold = DEFAULT_SIMILARITY_THRESHOLD
+
+    def embed(self, prompt: str) -> np.ndarray:
+        embedding = np.asarray(self.embedder.embed_query(prompt)[0], dtype=np.float32)
+        return embedding / (np.linalg.norm(embedding) or 1.0)
+
+    def threshold_key(self) -> str:
+        # similarity distributions differ per embedding model
+        return f"threshold:{bert.model_key(self.embedder.quantize)}"
+
+    def get_calibrated_threshold(self) -> Optional[float]:
+        row = self.conn.execute(
+            "SELECT value FROM sql_cache_settings WHERE key = ?", (self.threshold_key(),)
+        ).fetchone()
+        return float(row[0]) if row else None
+
+    def load_index(self, schema_version: str):
+        if self.index is not None and self.index[0] == schema_version:
+            return self.index
+        rows = self.conn.execute(
+            "SELECT id, prompt, embedding FROM sql_cache WHERE schema_version = ?",
+            (schema_version,),
+        ).fetchall()
+        ids = [row[0] for row in rows]
+        literals = [extract_literals(row[1]) for row in rows]
+        matrix = (
+            np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+            if rows
+            else None
+        )
+        self.index = (schema_version, ids, literals, matrix)
+        return self.index
+
+    def lookup(self, prompt: str, bypass: bool = False) -> Optional[SQLCacheHit]:
+        """
+        SQL of the most similar earlier prompt above the threshold whose
+        literals match the prompt's exactly, or None.
+        bypass=True skips the cache for this request (counted separately).
+        """
+        if bypass:
+            self.bypasses += 1
+            return None
+
+        embedding = self.embed(prompt)
+        literals = extract_literals(prompt)
+        with self.lock:
+            self.lookups += 1
+            _, ids, entry_literals, matrix = self.load_index(self.embedder.schema_version)
+            if matrix is None:
+                return None
+
+            similarities = matrix @ embedding
+            best = None
+            for index in np.argsort(-similarities):
+                if similarities[index] < self.threshold:
+                    break
+                if entry_literals[index] == literals:
+                    best = int(index)
+                    break
+            if best is None:
+                if similarities.max() >= self.threshold:
+                    self.literal_rejects += 1
+                return None
+
+            similarity = float(similarities[best])
+            entry_id = ids[best]
+            with self.conn:
+                cached_prompt, sql = self.conn.execute(
+                    "SELECT prompt, sql FROM sql_cache WHERE id = ?", (entry_id,)
+                ).fetchone()
+                self.conn.execute(
+                    "UPDATE sql_cache SET hits = hits + 1 WHERE id = ?", (entry_id,)
+                )
+            self.hits += 1
+
+        # identical prompts can't be false positives, don't spend an audit on them
+        audit = (
+            normalize_prompt(prompt) != normalize_prompt(cached_prompt)
+            and random.random() < self.audit_rate
+        )
+        return SQLCacheHit(entry_id, prompt, cached_prompt, sql, similarity, audit)
+
+    def store(self, prompt: str, sql: str):
+        """
+        Remember the SQL that successfully answered prompt on the current schema.
+        """
+        embedding = self.embed(prompt)
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO sql_cache (prompt, sql, schema_version, embedding, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (prompt, sql, self.embedder.schema_version, embedding.tobytes(), time.time()),
+            )
+            # oldest entries go first past the cap
+            self.conn.execute(
+                """
+                DELETE FROM sql_cache WHERE id NOT IN (
+                    SELECT id FROM sql_cache ORDER BY created_at DESC LIMIT ?
+                )
+                """,
+                (self.max_entries,),
+            )
+            self.index = None
+
+    def calibrate(
+        self,
+        pairs: List[ParaphrasePair],
+        max_false_positive_rate: float = DEFAULT_MAX_FALSE_POSITIVE_RATE,
+    ) -> Dict[str, Any]:
+        """
+        Lowest threshold at which at most max_false_positive_rate of the
+        non-equivalent pairs would be hits, saved in the cache file for the
+        current embedding model.
+
+        Non-equivalent pairs whose literals differ are never hits, so only the
+        rest count against the threshold.
+        """
+        positives = []
+        negatives = []
+        for pair in pairs:
+            similarity = float(self.embed(pair.prompt) @ self.embed(pair.paraphrase))
+            if pair.equivalent:
+                positives.append(similarity)
+            elif extract_literals(pair.prompt) == extract_literals(pair.paraphrase):
+                negatives.append(similarity)
+
+        if not positives:
+            raise ValueError("Calibration needs at least one equivalent pair")
+
+        # just above the highest negative always qualifies, so a threshold is always found
+        threshold = next(
+            candidate
+            for candidate in sorted(set(positives + [n + 1e-6 for n in negatives]))
+            if sum(similarity >= candidate for similarity in negatives)
+            <= max_false_positive_rate * len(negatives)
+        )
+
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sql_cache_settings (key, value) VALUES (?, ?)",
+                (self.threshold_key(), repr(threshold)),
+            )
+        self.threshold = threshold
+
+        return {
+            "threshold": round(threshold, 6),
+            "recall": round(sum(s >= threshold for s in positives) / len(positives), 4),
+            "false_positive_rate": round(
+                sum(s >= threshold for s in negatives) / len(negatives), 4
+            ) if negatives else 0.0,
+            "equivalent_pairs": len(positives),
+            "non_equivalent_pairs": len(negatives),
+            "literal_rejected_pairs": len(pairs) - len(positives) - len(negatives),
+        }
+
+    def record_audit(self, hit: SQLCacheHit, agreed: bool):
+        """
+        Outcome of comparing a cache hit against freshly generated SQL.
+        A disagreement is a false positive - the entry is evicted.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO sql_cache_audits
+                    (entry_id, prompt, cached_prompt, sql, similarity, agreed, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (hit.entry_id, hit.prompt, hit.cached_prompt, hit.sql, hit.similarity, int(agreed), time.time()),
+            )
+            if not agreed:
+                self.conn.execute("DELETE FROM sql_cache WHERE id = ?", (hit.entry_id,))
+                self.index = None
+
+    def flag_false_positive(self, hit: SQLCacheHit):
+        """
+        Manual report (e.g. user feedback) that a hit returned the wrong answer.
+        """
+        self.record_audit(hit, agreed=False)
+
+    def get_audits(self, limit: int = 20, false_positives_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Most recent audits, newest first.
+        """
+        where = "WHERE agreed = 0" if false_positives_only else ""
+        with self.lock:
+            rows = self.conn.execute(
+                f"""
+                SELECT prompt, cached_prompt, sql, similarity, agreed, created_at
+                FROM sql_cache_audits {where}
+                ORDER BY id DESC LIMIT ?
+                """,
+                (limit,),
+            ).fetchall()
+        return [
+            {
+                "prompt": prompt,
+                "cached_prompt": cached_prompt,
+                "sql": sql,
+                "similarity": round(similarity, 4),
+                "agreed": bool(agreed),
+                "created_at": created_at,
+            }
+            for prompt, cached_prompt, sql, similarity, agreed, created_at in rows
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            n_entries = self.conn.execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0]
+            n_audits, n_false_positives = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(1 - agreed), 0) FROM sql_cache_audits"
+            ).fetchone()
+        return {
+            "entries": n_entries,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "bypasses": self.bypasses,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "literal_rejects": self.literal_rejects,
+            "audits": n_audits,
+            "false_positives": n_false_positives,
+            "false_positive_rate": round(n_false_positives / n_audits, 4) if n_audits else 0.0,
+            "threshold": self.threshold,
+        }
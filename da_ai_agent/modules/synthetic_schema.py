@@ -0,0 +1,257 @@
+"""
+Purpose:
+    Generate synthetic Postgres-like schemas and labeled prompts so retrieval
+    can be benchmarked fully offline - no database and no LLM calls.
+
+    SyntheticDatabase mimics the read methods of PostgresManager that the
+    DatabaseEmbedder uses, so the embedder runs unchanged on top of it.
+"""
+
+import copy
+import random
+from typing import Dict, List
+
+from da_ai_agent.data_types import ColumnSchema, LabeledPrompt, SyntheticTable
+from da_ai_agent.modules import schema_render
+
+NAMING_SNAKE = "snake"
+NAMING_CAMEL = "camel"
+NAMING_ABBREVIATED = "abbreviated"
+
+NAMING_STYLES = [NAMING_SNAKE, NAMING_CAMEL, NAMING_ABBREVIATED]
+
+ENTITIES = [
+    "customer", "order", "product", "invoice", "payment", "shipment", "supplier",
+    "employee", "department", "warehouse", "inventory", "refund", "subscription",
+    "plan", "campaign", "lead", "account", "contact", "ticket", "agent", "store",
+    "region", "category", "review", "coupon", "session", "event", "device",
+    "vendor", "contract", "project", "task", "timesheet", "budget", "expense",
+    "asset", "vehicle", "route", "driver", "delivery",
+]
+
+# used to derive more tables than there are entities: 'order' -> 'order history'
+ENTITY_QUALIFIERS = ["line", "history", "snapshot", "audit", "daily summary", "archive"]
+
+ATTRIBUTES = [
+    ("status", "character varying(32)", "status"),
+    ("created at", "timestamp without time zone", "creation date"),
+    ("amount", "numeric(12,2)", "amount"),
+    ("quantity", "integer", "quantity"),
+    ("email", "character varying(255)", "email"),
+    ("name", "character varying(255)", "name"),
+    ("description", "text", "description"),
+    ("price", "numeric(12,2)", "price"),
+    ("country", "character varying(64)", "country"),
+    ("city", "character varying(64)", "city"),
+    ("score", "double precision", "score"),
+    ("is active", "boolean", "active flag"),
+    ("start date", "date", "start date"),
+    ("end date", "date", "end date"),
+    ("updated at", "timestamp without time zone", "last update"),
+    ("currency", "character(3)", "currency"),
+]
+
+ABBREVIATIONS = {
+    "customer": "cust", "order": "ord", "product": "prod", "invoice": "inv",
+    "payment": "pmt", "shipment": "shpmt", "supplier": "supp", "employee": "emp",
+    "department": "dept", "warehouse": "whse", "inventory": "invtry", "refund": "rfnd",
+    "subscription": "sub", "campaign": "cmpgn", "account": "acct", "contact": "cntct",
+    "ticket": "tkt", "category": "cat", "review": "rvw", "session": "sess",
+    "event": "evt", "device": "dvc", "vendor": "vndr", "contract": "ctrct",
+    "project": "proj", "timesheet": "tmsht", "budget": "bdgt", "expense": "exp",
+    "vehicle": "veh", "delivery": "dlvry", "history": "hist", "snapshot": "snap",
+    "summary": "smry", "archive": "arch", "audit": "aud", "line": "ln", "score": "scr", "quantity": "qty", "amount": "amt",
+    "description": "desc", "status": "stat", "created": "crtd", "updated": "upd",
+    "country": "ctry", "currency": "ccy", "active": "actv", "number": "num",
+    "metric": "mtr", "start": "strt", "date": "dt", "price": "prc",
+}
+
+
+def to_identifier(words: str, naming_style: str) -> str:
+    """
+    'customer order' -> customer_order / customerOrder / cust_ord
+    """
+    parts = words.split()
+    if naming_style == NAMING_CAMEL:
+        return parts[0] + "".join(part.capitalize() for part in parts[1:])
+    if naming_style == NAMING_ABBREVIATED:
+        return "_".join(ABBREVIATIONS.get(part, part[:4]) for part in parts)
+    return "_".join(parts)
+
+
+def pluralize(noun: str) -> str:
+    if noun.endswith("y") and noun[-2:-1] not in "aeiou":
+        return noun[:-1] + "ies"
+    if noun.endswith(("s", "x", "ch", "sh")):
+        return noun + "es"
+    return noun + "s"
+
+
+def generate_entities(n_tables: int, rng: random.Random) -> List[str]:
+    entities = list(ENTITIES)
+    for qualifier in ENTITY_QUALIFIERS:
+        entities += [f"{entity} {qualifier}" for entity in ENTITIES]
+    if n_tables > len(entities):
+        raise ValueError(f"At most {len(entities)} synthetic tables are supported")
+    # base entities first so small schemas stay readable
+    return entities[: len(ENTITIES)][:n_tables] + rng.sample(
+        entities[len(ENTITIES) :], max(0, n_tables - len(ENTITIES))
+    )
+
+
+def generate_schema(
+    n_tables: int = 40,
+    n_columns: int = 12,
+    naming_style: str = NAMING_SNAKE,
+    seed: int = 0,
+) -> List[SyntheticTable]:
+    """
+    n_tables tables of n_columns columns each (id and foreign keys included).
+    Each table references up to two earlier tables through '<entity>_id' columns.
+    Columns beyond the shared attribute pool are numbered metrics.
+    """
+    if naming_style not in NAMING_STYLES:
+        raise ValueError(f"Unknown naming style: {naming_style}. Use one of {NAMING_STYLES}")
+
+    rng = random.Random(seed)
+    tables = []
+
+    for entity in generate_entities(n_tables, rng):
+        table_name = to_identifier(entity, naming_style)
+        columns = [ColumnSchema(table_name, "id", "integer")]
+        foreign_keys = {}
+
+        for referenced in rng.sample(tables, min(len(tables), rng.randint(0, 2))):
+            fk_column = to_identifier(f"{referenced.entity} id", naming_style)
+            if fk_column in foreign_keys:
+                continue
+            foreign_keys[fk_column] = referenced.name
+            columns.append(ColumnSchema(table_name, fk_column, "integer"))
+
+        attributes = rng.sample(ATTRIBUTES, min(len(ATTRIBUTES), max(0, n_columns - len(columns))))
+        for words, data_type, _ in attributes:
+            columns.append(ColumnSchema(table_name, to_identifier(words, naming_style), data_type))
+
+        metric_number = 1
+        while len(columns) < n_columns:
+            columns.append(
+                ColumnSchema(
+                    table_name,
+                    to_identifier(f"metric number {metric_number}", naming_style),
+                    "numeric",
+                )
+            )
+            metric_number += 1
+
+        tables.append(SyntheticTable(table_name, entity, columns[:n_columns], foreign_keys))
+
+    return tables
+
+
+def generate_labeled_prompts(
+    tables: List[SyntheticTable], n_prompts: int = 50, seed: int = 0
+) -> List[LabeledPrompt]:
+    """
+    Natural language prompts with the tables needed to answer them.
+    Prompts use the entity words, not the identifiers, so abbreviated and
+    camelCase schemas are harder to match than snake_case ones.
+    """
+    rng = random.Random(seed)
+    map_name_to_table = {table.name: table for table in tables}
+    prompts = []
+
+    for _ in range(n_prompts):
+        table = rng.choice(tables)
+        plural = pluralize(table.entity)
+        attribute = rng.choice(ATTRIBUTES)[2]
+
+        if table.foreign_keys and rng.random() < 0.5:
+            referenced = map_name_to_table[rng.choice(sorted(table.foreign_keys.values()))]
+            prompts.append(
+                LabeledPrompt(
+                    prompt=f"total {attribute} of {plural} per {referenced.entity}",
+                    expected_tables=[table.name, referenced.name],
+                )
+            )
+            continue
+
+        template = rng.choice(
+            [
+                "how many {plural} were created last month",
+                "show the {attribute} of every {entity}",
+                "list the top 10 {plural} by {attribute}",
+                "average {attribute} of {plural} this year",
+            ]
+        )
+        prompts.append(
+            LabeledPrompt(
+                prompt=template.format(plural=plural, entity=table.entity, attribute=attribute),
+                expected_tables=[table.name],
+            )
+        )
+
+    return prompts
+
+
+class SyntheticDatabase:
+    """
+    In-memory stand-in for PostgresManager's schema reads, backed by a synthetic schema.
+    """
+
+    def __init__(self, tables: List[SyntheticTable]):
+        self.tables = tables
+        self.map_name_to_table = {table.name: table for table in tables}
+
+    def get_all_table_names(self) -> List[str]:
+        return [table.name for table in self.tables]
+
+    def get_table_definition(self, table_name, dialect=schema_render.DIALECT_DDL):
+        return schema_render.render_table(
+            table_name, self.map_name_to_table[table_name].columns, dialect
+        )
+
+    def get_table_definitions_for_prompt(self, dialect=schema_render.DIALECT_DDL):
+        return schema_render.table_separator(dialect).join(
+            self.get_table_definition(table_name, dialect)
+            for table_name in self.get_all_table_names()
+        )
+
+    def get_table_definition_map_for_embeddings(self) -> Dict[str, str]:
+        return {
+            table_name: self.get_table_definition(table_name)
+            for table_name in self.get_all_table_names()
+        }
+
+    def get_all_table_columns(self) -> Dict[str, List[ColumnSchema]]:
+        # copies - the embedder writes profile hints onto the columns
+        return {table.name: copy.deepcopy(table.columns) for table in self.tables}
+
+    def get_all_key_columns(self) -> Dict[str, List[str]]:
+        return {table.name: ["id"] + list(table.foreign_keys) for table in self.tables}
+
+    def get_column_profiles(self):
+        return {}
+
+    def get_table_notes(self) -> Dict[str, List[str]]:
+        return {}
+
+    def get_table_size_hints(self) -> Dict[str, str]:
+        return {}
+
+    def get_foreign_key_graph(self) -> Dict[str, List[str]]:
+        graph = {}
+        for table in self.tables:
+            for referenced_table_name in table.foreign_keys.values():
+                graph.setdefault(table.name, set()).add(referenced_table_name)
+                graph.setdefault(referenced_table_name, set()).add(table.name)
+        return {table_name: sorted(related) for table_name, related in sorted(graph.items())}
+
+    def get_related_tables(self, table_list, n=2):
+        graph = self.get_foreign_key_graph()
+        related = set()
+        for table_name in table_list:
+            related.update(graph.get(table_name, [])[: 2 * n])
+        return sorted(related)
+
+    def roll_back(self):
+        pass
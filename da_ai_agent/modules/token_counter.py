@@ -0,0 +1,60 @@
+"""
+Purpose:
+    Token accounting.
+    tiktoken encoders are built once per model and reused, and TokenCounter
+    keeps a running count of a growing transcript so budget checks cost one
+    encode of the new message instead of re-encoding the whole session.
+"""
+
+import functools
+from typing import Optional
+
+import tiktoken
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoder(model: Optional[str] = None) -> tiktoken.Encoding:
+    """
+    Encoder for the model, cl100k_base when the model is unknown or not given.
+    """
+    if model:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    return len(get_encoder(model).encode(text))
+
+
+class TokenCounter:
+    """
+    Running token count, updated as messages are appended.
+    Counts each message on its own, so the total can differ by a token or two
+    per message from encoding the joined transcript.
+    """
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model
+        self.tokens = 0
+        self.messages = 0
+
+    def add(self, text: str) -> int:
+        """
+        Count and add one message, returns its tokens.
+        """
+        tokens = count_tokens(text, self.model) if text else 0
+        self.tokens += tokens
+        self.messages += 1
+        return tokens
+
+    def fits(self, token_budget: int, text: str = "") -> bool:
+        """
+        Whether the transcript, plus text if given, is within token_budget.
+        """
+        extra = count_tokens(text, self.model) if text else 0
+        return self.tokens + extra <= token_budget
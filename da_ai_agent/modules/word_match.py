@@ -0,0 +1,106 @@
+"""
+Purpose:
+    Match table names mentioned in a natural language prompt.
+
+    Table names are split into normalized tokens (snake_case, camelCase, plurals)
+    and compiled once into a token trie. Matching a prompt is a single pass over
+    its tokens, bounded by the longest table name, instead of a substring search
+    per table.
+"""
+
+import re
+from typing import Dict, Iterable, List
+
+WORD_PATTERN = re.compile(r"[A-Za-z0-9]+")
+IDENTIFIER_PART_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+# key used to store table names on terminal trie nodes
+TABLES_KEY = ""
+
+
+def normalize_token(token: str) -> str:
+    """
+    Lowercase and stem a token so singular and plural forms match:
+    'Orders', 'order' -> 'order', 'purchases', 'purchase' -> 'purchas',
+    'matches', 'match' -> 'match', 'boxes', 'box' -> 'box',
+    'categories', 'category' -> 'categori', 'movies', 'movie' -> 'movi'.
+    A plural 'es' can't be told apart from a singular ending in 'e' plus 's'
+    (caches vs matches), so the 's' is dropped and then a trailing 'e', which
+    gives both forms the same stem. Likewise 'ies' is the plural of both 'y'
+    (category) and 'ie' (movie), so all three end up as 'i'.
+    """
+    token = token.lower()
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("y") and token[-2] not in "aeiou":
+        # 'key', 'day' keep their 'y', their plurals only add an 's'
+        return token[:-1] + "i"
+    if len(token) > 4 and token.endswith(("sses", "uses", "xes")):
+        # singulars that never end in 'e': class, status, box
+        token = token[:-2]
+    elif len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        token = token[:-1]
+    if len(token) > 4 and token.endswith("e"):
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    'OrderItems in user_accounts' -> ['order', 'item', 'in', 'user', 'account']
+    """
+    tokens = []
+    for word in WORD_PATTERN.findall(text):
+        for part in IDENTIFIER_PART_PATTERN.findall(word):
+            tokens.append(normalize_token(part))
+    return tokens
+
+
+class TableNameMatcher:
+    """
+    Precompiled multi-pattern matcher for table names.
+    Build once per schema, reuse for every prompt.
+    """
+
+    def __init__(self, table_names: Iterable[str]):
+        self.trie: Dict = {}
+        self.max_depth = 1
+
+        for table_name in table_names:
+            tokens = tokenize(table_name)
+            if not tokens:
+                continue
+            self._insert(tokens, table_name)
+            # also match the identifier written as one word, e.g. 'orderitems'
+            if len(tokens) > 1:
+                self._insert([normalize_token("".join(tokens))], table_name)
+
+    def _insert(self, tokens: List[str], table_name: str):
+        node = self.trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        tables = node.setdefault(TABLES_KEY, [])
+        if table_name not in tables:
+            tables.append(table_name)
+        self.max_depth = max(self.max_depth, len(tokens))
+
+    def match(self, query: str) -> List[str]:
+        """
+        Return the table names mentioned in the query, in order of first mention.
+        """
+        tokens = tokenize(query)
+        matches = []
+        seen = set()
+
+        for start in range(len(tokens)):
+            node = self.trie
+            for token in tokens[start : start + self.max_depth]:
+                node = node.get(token)
+                if node is None:
+                    break
+                for table_name in node.get(TABLES_KEY, []):
+                    if table_name not in seen:
+                        seen.add(table_name)
+                        matches.append(table_name)
+
+        return matches
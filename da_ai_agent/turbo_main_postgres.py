@@ -1,11 +1,15 @@
 from da_ai_agent.agents.turbo4 import Turbo4
 from da_ai_agent.data_types import Chat, TurboTool
-from typing import List, Callable
+from typing import List, Callable, Tuple
 import os
 from da_ai_agent.agents.instruments import PostgresAgentInstruments
+from da_ai_agent.modules import cost_ledger
 from da_ai_agent.modules import llm
+from da_ai_agent.modules import model_router
 from da_ai_agent.modules import rand
 from da_ai_agent.modules import embeddings_postgres
+from da_ai_agent.modules import schema_index
+from da_ai_agent.modules import schema_render
 import argparse
 
 DB_URL = os.environ.get("DATABASE_URL")
@@ -51,6 +55,49 @@ def store_fact(fact: str):
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--prompt", help="The prompt for the AI")
+    parser.add_argument(
+        "--quantize-embeddings",
+        action="store_true",
+        help="Run the table embedding model with int8 quantization (faster on CPU)",
+    )
+    parser.add_argument(
+        "--max-columns",
+        type=int,
+        default=None,
+        help="Prune each table definition to its key columns plus the N most relevant columns",
+    )
+    parser.add_argument(
+        "--hybrid-retrieval",
+        action="store_true",
+        help="Rank tables with BM25 over identifiers fused with embedding similarity",
+    )
+    parser.add_argument(
+        "--pgvector-store",
+        action="store_true",
+        help="Keep table and column embeddings in a shared pgvector table",
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=None,
+        help="Max prompt tokens for table definitions - prunes columns, then drops the least relevant tables",
+    )
+    parser.add_argument(
+        "--schema-dialect",
+        choices=schema_render.DIALECTS,
+        default=schema_render.DIALECT_DDL,
+        help="How table definitions are rendered in the prompt",
+    )
+    parser.add_argument(
+        "--size-hints",
+        action="store_true",
+        help="Add row count estimates and indexed columns under each table definition",
+    )
+    parser.add_argument(
+        "--schema-index",
+        default=os.environ.get("SCHEMA_INDEX_DIR"),
+        help="Load the prebuilt schema index from this directory (see index_schema)",
+    )
     args = parser.parse_args()
 
     if not args.prompt:
@@ -67,11 +114,26 @@ def main():
 
     session_id = rand.generate_session_id(assistant_name + raw_prompt)
 
-    with PostgresAgentInstruments(DB_URL, session_id) as (agent_instruments, db):
-        database_embedder = embeddings.DatabaseEmbedder(db)
+    # the Turbo4 runs and every llm.* call in the block count toward the session
+    with cost_ledger.scope(session_id=session_id), PostgresAgentInstruments(DB_URL, session_id) as (agent_instruments, db):
+        database_embedder = embeddings_postgres.DatabaseEmbedder(
+            db,
+            quantize=args.quantize_embeddings,
+            use_pgvector=args.pgvector_store,
+            dialect=args.schema_dialect,
+            size_hints=args.size_hints,
+        )
+
+        if args.schema_index:
+            schema_index.load_index(
+                database_embedder, args.schema_index, schema_index.DATABASE_POSTGRES
+            )
 
         table_definitions = database_embedder.get_similar_table_defs_for_prompt(
-            raw_prompt
+            raw_prompt,
+            n_columns=args.max_columns,
+            hybrid=args.hybrid_retrieval,
+            token_budget=args.token_budget,
         )
 
         prompt = llm.add_cap_ref(
@@ -85,28 +147,45 @@ def main():
             TurboTool("run_sql", run_sql_tool_config, agent_instruments.run_sql),
         ]
 
-        (
-            assistant.get_or_create_assistant(assistant_name)
-            .set_instructions(
-                "You're an elite SQL developer. You generate the most concise and performant SQL queries."
-            )
-            .equip_tools(tools)
-            .make_thread()
-            .add_message(prompt)
-            .run_thread()
-            .add_message(
-                "Use the run_sql function to run the SQL you've just generated.",
-            )
-            .run_thread(toolbox=[tools[0].name])
-            .run_validation(agent_instruments.validate_run_sql)
-            .spy_on_assistant(agent_instruments.make_agent_chat_file(assistant_name))
-            .get_costs_and_tokens(
-                agent_instruments.make_agent_cost_file(assistant_name)
+        router = model_router.router_from_env()
+
+        def run_sql_generation(model: str) -> Tuple[float, float]:
+            # a failed attempt may leave the transaction aborted
+            db.roll_back()
+            return (
+                assistant.get_or_create_assistant(assistant_name, model=model)
+                .set_instructions(
+                    "You're an elite SQL developer. You generate the most concise and performant SQL queries."
+                )
+                .equip_tools(tools)
+                .make_thread()
+                .add_message(prompt)
+                .run_thread()
+                .add_message(
+                    "Use the run_sql function to run the SQL you've just generated.",
+                )
+                .run_thread(toolbox=[tools[0].name])
+                .run_validation(agent_instruments.validate_run_sql)
+                .spy_on_assistant(agent_instruments.make_agent_chat_file(assistant_name))
+                .get_costs_and_tokens(
+                    agent_instruments.make_agent_cost_file(assistant_name)
+                )
             )
+
+        # a stronger model takes over when the SQL doesn't validate
+        router.run(
+            model_router.ROUTE_SQL_GENERATION,
+            run_sql_generation,
+            succeeded=lambda _: agent_instruments.validate_run_sql()[0],
         )
 
         print(f"✅ Turbo4 Assistant finished.")
 
+        session_usage = llm.usage_ledger.map_session_to_totals[session_id]
+        print(
+            f"💰📊 Session cost: {session_usage.cost:.4f}, prompt tokens: {session_usage.prompt_tokens}, completion tokens: {session_usage.completion_tokens}"
+        )
+
         # ---------- Simple Prompt Solution - Same thing, only 2 api calls instead of 8+ ------------
         # sql_response = llm.prompt(
         #     prompt,
@@ -6,6 +6,7 @@ from da_ai_agent.agents.instruments import PrestoAgentInstruments
 from da_ai_agent.modules import llm
 from da_ai_agent.modules import rand
 from da_ai_agent.modules import embeddings_presto
+from da_ai_agent.modules import schema_index
 import argparse
 import dotenv
 import prestodb
@@ -36,6 +37,9 @@ PRESTO_DB_CONFIG = {
 
 PRESTO_TABLE_DEFINITIONS_CAP_REF = "TABLE_DEFINITIONS"
 
+# prebuilt by the index_schema script, optional
+SCHEMA_INDEX_DIR = os.environ.get("SCHEMA_INDEX_DIR")
+
 custom_function_tool_config = {
     "type": "function",
     "function": {
@@ -85,6 +89,11 @@ def run_framework(query: str):
     with PrestoAgentInstruments(PRESTO_DB_CONFIG, session_id) as (agent_instruments, db):
         database_embedder = embeddings_presto.DatabaseEmbedder(db)
 
+        if SCHEMA_INDEX_DIR:
+            schema_index.load_index(
+                database_embedder, SCHEMA_INDEX_DIR, schema_index.DATABASE_PRESTO
+            )
+
         # table_definitions = database_embedder.get_similar_table_defs_for_prompt(raw_prompt)
 
         # Retrieve all table definitions
@@ -0,0 +1,78 @@
+"""
+Compare embedding, BM25 and hybrid (reciprocal rank fusion) table retrieval.
+
+Reports recall@k and the prompt tokens needed to reach a target recall
+on a labeled prompt set.
+
+    python scripts/bench_hybrid_retrieval.py --labeled-prompts prompts.json --target-recall 0.9
+"""
+
+import argparse
+import os
+
+import dotenv
+
+from da_ai_agent.modules import bench, llm
+from da_ai_agent.modules.db_postgres import PostgresManager
+from da_ai_agent.modules.embeddings_postgres import DatabaseEmbedder
+
+dotenv.load_dotenv()
+
+assert os.environ.get("DATABASE_URL"), "POSTGRES_CONNECTION_URL not found in .env file"
+
+DB_URL = os.environ.get("DATABASE_URL")
+
+REPORT_KS = [1, 3, 5, 10]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labeled-prompts", required=True, help="Labeled prompt set (json)")
+    parser.add_argument("--target-recall", type=float, default=0.9)
+    parser.add_argument("--max-k", type=int, default=20)
+    args = parser.parse_args()
+
+    labeled_prompts = bench.load_labeled_prompts(args.labeled_prompts)
+
+    with PostgresManager() as db:
+        db.connect_with_url(DB_URL)
+        embedder = DatabaseEmbedder(db)
+        for name, table_def in db.get_table_definition_map_for_embeddings().items():
+            embedder.add_table(name, table_def)
+        embedder.index_columns()
+
+    map_name_to_tokens = {
+        name: llm.count_tokens(table_def)
+        for name, table_def in embedder.map_name_to_table_def.items()
+    }
+
+    strategies = {
+        "embeddings": embedder.get_similar_tables_via_embeddings,
+        "bm25": embedder.get_similar_tables_via_bm25,
+        "hybrid": embedder.get_similar_tables_via_hybrid,
+    }
+
+    print(f"{len(map_name_to_tokens)} tables, {len(labeled_prompts)} labeled prompts\n")
+    header = " ".join(f"{f'R@{k}':>6}" for k in REPORT_KS)
+    print(f"{'strategy':<11} {header} {'k@target':>9} {'tokens@target':>14}")
+
+    for label, rank_func in strategies.items():
+        rankings = [rank_func(lp.prompt, args.max_k) for lp in labeled_prompts]
+
+        recalls = " ".join(
+            f"{bench.mean_recall_at_k(rankings, labeled_prompts, k):>6.3f}"
+            for k in REPORT_KS
+        )
+        k_target = bench.min_k_for_recall(
+            rankings, labeled_prompts, args.target_recall, args.max_k
+        )
+        tokens_target = (
+            f"{bench.mean_prompt_tokens_at_k(rankings, map_name_to_tokens, k_target):>14.0f}"
+            if k_target > 0
+            else f"{'n/a':>14}"
+        )
+        print(f"{label:<11} {recalls} {k_target:>9} {tokens_target}")
+
+
+if __name__ == "__main__":
+    main()
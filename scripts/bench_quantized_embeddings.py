@@ -0,0 +1,91 @@
+"""
+Compare fp32 and int8 quantized BERT for table retrieval.
+
+Reports per-query embedding latency, model size, top-k agreement with the
+fp32 model and recall@k against a labeled prompt set.
+
+    python scripts/bench_quantized_embeddings.py --labeled-prompts prompts.json --k 5
+"""
+
+import argparse
+import os
+
+import dotenv
+
+from da_ai_agent.modules import bench, bert
+from da_ai_agent.modules.db_postgres import PostgresManager
+from da_ai_agent.modules.embeddings_postgres import DatabaseEmbedder
+
+dotenv.load_dotenv()
+
+assert os.environ.get("DATABASE_URL"), "POSTGRES_CONNECTION_URL not found in .env file"
+
+DB_URL = os.environ.get("DATABASE_URL")
+
+
+def build_embedder(db: PostgresManager, table_defs: dict, quantize: bool):
+    embedder = DatabaseEmbedder(db, quantize=quantize)
+    _, index_ms = bench.timed(
+        lambda: [embedder.add_table(name, d) for name, d in table_defs.items()]
+    )
+    return embedder, index_ms
+
+
+def run_prompts(embedder: DatabaseEmbedder, labeled_prompts, k: int):
+    rankings = []
+    latencies_ms = []
+    for labeled_prompt in labeled_prompts:
+        ranked, elapsed_ms = bench.timed(
+            embedder.get_similar_tables_via_embeddings, labeled_prompt.prompt, k
+        )
+        rankings.append(ranked)
+        latencies_ms.append(elapsed_ms)
+    return rankings, latencies_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labeled-prompts", required=True, help="Labeled prompt set (json)")
+    parser.add_argument("--k", type=int, default=5, help="Number of tables to retrieve")
+    args = parser.parse_args()
+
+    labeled_prompts = bench.load_labeled_prompts(args.labeled_prompts)
+
+    with PostgresManager() as db:
+        db.connect_with_url(DB_URL)
+        table_defs = db.get_table_definition_map_for_embeddings()
+
+        results = {}
+        for label, quantize in [("fp32", False), ("int8", True)]:
+            embedder, index_ms = build_embedder(db, table_defs, quantize)
+            rankings, latencies_ms = run_prompts(embedder, labeled_prompts, args.k)
+            results[label] = {
+                "size_mb": bert.model_size_bytes(embedder.model) / 1024 / 1024,
+                "index_ms": index_ms,
+                "rankings": rankings,
+                "latencies_ms": latencies_ms,
+            }
+
+    print(f"{len(table_defs)} tables, {len(labeled_prompts)} labeled prompts, k={args.k}\n")
+    print(f"{'model':<6} {'size MB':>9} {'index ms':>10} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9} {'agree@k':>8}")
+
+    for label, result in results.items():
+        recall = sum(
+            bench.recall_at_k(ranked, lp.expected_tables, args.k)
+            for ranked, lp in zip(result["rankings"], labeled_prompts)
+        ) / max(1, len(labeled_prompts))
+        agreement = sum(
+            bench.overlap_at_k(fp32_ranked, ranked, args.k)
+            for fp32_ranked, ranked in zip(results["fp32"]["rankings"], result["rankings"])
+        ) / max(1, len(labeled_prompts))
+
+        print(
+            f"{label:<6} {result['size_mb']:>9.1f} {result['index_ms']:>10.0f} "
+            f"{bench.percentile(result['latencies_ms'], 50):>8.1f} "
+            f"{bench.percentile(result['latencies_ms'], 95):>8.1f} "
+            f"{recall:>9.3f} {agreement:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
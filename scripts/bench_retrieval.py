@@ -0,0 +1,102 @@
+"""
+Offline retrieval benchmark - no database, no LLM calls.
+
+Generates a synthetic schema and labeled prompt set (or reads --labeled-prompts
+written for the same schema), then reports recall@k, MRR, prompt tokens of the
+top k tables and p50/p95 retrieval latency for every retrieval strategy.
+
+    python scripts/bench_retrieval.py --n-tables 200 --n-columns 30 --naming-style abbreviated
+"""
+
+import argparse
+
+from da_ai_agent.modules import bench, synthetic_schema, token_counter
+from da_ai_agent.modules.embeddings_postgres import DatabaseEmbedder
+
+REPORT_KS = [1, 3, 5, 10]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n-tables", type=int, default=60)
+    parser.add_argument("--n-columns", type=int, default=12)
+    parser.add_argument(
+        "--naming-style",
+        choices=synthetic_schema.NAMING_STYLES,
+        default=synthetic_schema.NAMING_SNAKE,
+    )
+    parser.add_argument("--n-prompts", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--k", type=int, default=5, help="Tables sent to the model, for the token column")
+    parser.add_argument("--labeled-prompts", help="Use this labeled prompt set instead of generating one")
+    parser.add_argument("--save-prompts", help="Write the generated labeled prompt set here (json)")
+    parser.add_argument("--quantize-embeddings", action="store_true")
+    args = parser.parse_args()
+
+    tables = synthetic_schema.generate_schema(
+        args.n_tables, args.n_columns, args.naming_style, args.seed
+    )
+    db = synthetic_schema.SyntheticDatabase(tables)
+
+    if args.labeled_prompts:
+        labeled_prompts = bench.load_labeled_prompts(args.labeled_prompts)
+    else:
+        labeled_prompts = synthetic_schema.generate_labeled_prompts(
+            tables, args.n_prompts, args.seed
+        )
+    if args.save_prompts:
+        bench.save_labeled_prompts(args.save_prompts, labeled_prompts)
+
+    # cache_size=0 - every call pays the full retrieval cost
+    embedder = DatabaseEmbedder(db, quantize=args.quantize_embeddings, cache_size=0)
+    _, index_ms = bench.timed(embedder.add_tables, db.get_table_definition_map_for_embeddings())
+    embedder.index_columns()
+
+    map_name_to_tokens = {
+        name: token_counter.count_tokens(table_def)
+        for name, table_def in embedder.map_name_to_table_def.items()
+    }
+
+    max_k = max(REPORT_KS + [args.k])
+    strategies = {
+        "word_match": lambda query, n: embedder.get_similar_table_names_via_word_match(query)[:n],
+        "embeddings": embedder.get_similar_tables_via_embeddings,
+        "bm25": embedder.get_similar_tables_via_bm25,
+        "hybrid": embedder.get_similar_tables_via_hybrid,
+        "candidates": lambda query, n: [
+            candidate.table_name
+            for candidate in embedder.get_table_candidates(query, n=n, hybrid=True)
+        ],
+    }
+
+    print(
+        f"{len(tables)} tables x {args.n_columns} columns ({args.naming_style}), "
+        f"{len(labeled_prompts)} labeled prompts, indexed in {index_ms:.0f}ms\n"
+    )
+    header = " ".join(f"{f'R@{k}':>6}" for k in REPORT_KS)
+    print(
+        f"{'strategy':<11} {header} {'MRR':>6} {f'tokens@{args.k}':>10} {'p50 ms':>8} {'p95 ms':>8}"
+    )
+
+    for label, rank_func in strategies.items():
+        rankings = []
+        latencies_ms = []
+        for labeled_prompt in labeled_prompts:
+            ranked, elapsed_ms = bench.timed(rank_func, labeled_prompt.prompt, max_k)
+            rankings.append(ranked)
+            latencies_ms.append(elapsed_ms)
+
+        recalls = " ".join(
+            f"{bench.mean_recall_at_k(rankings, labeled_prompts, k):>6.3f}"
+            for k in REPORT_KS
+        )
+        mrr = bench.mean_reciprocal_rank(rankings, labeled_prompts)
+        tokens = bench.mean_prompt_tokens_at_k(rankings, map_name_to_tokens, args.k)
+        print(
+            f"{label:<11} {recalls} {mrr:>6.3f} {tokens:>10.0f} "
+            f"{bench.percentile(latencies_ms, 50):>8.2f} {bench.percentile(latencies_ms, 95):>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compare schema rendering dialects: prompt tokens and (optionally) LLM accuracy.
+
+For every labeled prompt the expected tables are rendered in each dialect.
+With --with-llm the model generates SQL from each rendering; a prompt counts as
+correct when the generated SQL returns the same rows as the labeled "sql".
+
+    python scripts/bench_schema_dialects.py --labeled-prompts prompts.json --with-llm
+"""
+
+import argparse
+import json
+import os
+
+import dotenv
+
+from da_ai_agent.modules import bench, llm, schema_render
+from da_ai_agent.modules.db_postgres import PostgresManager
+from da_ai_agent.modules.embeddings_postgres import DatabaseEmbedder
+
+dotenv.load_dotenv()
+
+assert os.environ.get("DATABASE_URL"), "POSTGRES_CONNECTION_URL not found in .env file"
+
+DB_URL = os.environ.get("DATABASE_URL")
+
+SQL_INSTRUCTIONS = "You're an elite SQL developer. You generate the most concise and performant SQL queries. Respond with a single ```sql code block."
+
+
+def run_rows(db: PostgresManager, sql: str):
+    """
+    Result rows as a sorted list of value tuples, or None if the query fails.
+    """
+    try:
+        rows = json.loads(db.run_sql(sql))
+    except Exception:
+        db.roll_back()
+        return None
+    return sorted(tuple(str(value) for value in row.values()) for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labeled-prompts", required=True, help="Labeled prompt set (json)")
+    parser.add_argument("--with-llm", action="store_true", help="Also score generated SQL per dialect")
+    parser.add_argument("--model", default="gpt-4-1106-preview")
+    args = parser.parse_args()
+
+    labeled_prompts = bench.load_labeled_prompts(args.labeled_prompts)
+
+    with PostgresManager() as db:
+        db.connect_with_url(DB_URL)
+        embedder = DatabaseEmbedder(db)
+        embedder.add_tables(db.get_table_definition_map_for_embeddings())
+        embedder.load_columns()
+
+        print(f"{len(labeled_prompts)} labeled prompts\n")
+        print(f"{'dialect':<12} {'avg tokens':>11} {'vs ddl':>8} {'accuracy':>9}")
+
+        ddl_tokens = None
+        for dialect in schema_render.DIALECTS:
+            tokens = []
+            correct = 0
+            scored = 0
+
+            for labeled_prompt in labeled_prompts:
+                table_definitions = embedder.get_table_definitions_from_names(
+                    labeled_prompt.expected_tables, dialect=dialect
+                )
+                tokens.append(llm.count_tokens(table_definitions))
+
+                if not args.with_llm or not labeled_prompt.expected_sql:
+                    continue
+
+                prompt = llm.add_cap_ref(
+                    f"Fulfill this database query: {labeled_prompt.prompt}. ",
+                    "Use these TABLE_DEFINITIONS to satisfy the database query.",
+                    "TABLE_DEFINITIONS",
+                    table_definitions,
+                )
+                response = llm.prompt(prompt, model=args.model, instructions=SQL_INSTRUCTIONS)
+                generated_sql = llm.extract_code_block(response) or response
+
+                scored += 1
+                expected_rows = run_rows(db, labeled_prompt.expected_sql)
+                if expected_rows is not None and run_rows(db, generated_sql) == expected_rows:
+                    correct += 1
+
+            avg_tokens = sum(tokens) / max(1, len(tokens))
+            ddl_tokens = ddl_tokens or avg_tokens
+            accuracy = f"{correct / scored:>9.3f}" if scored else f"{'n/a':>9}"
+            print(
+                f"{dialect:<12} {avg_tokens:>11.1f} {avg_tokens / ddl_tokens:>7.0%} {accuracy}"
+            )
+
+
+if __name__ == "__main__":
+    main()
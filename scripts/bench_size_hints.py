@@ -0,0 +1,156 @@
+"""
+Execution time of generated SQL with and without size / index hints.
+
+Run against a local fixture database - --build-fixture creates two large
+bench_ tables (a 100K row users table and an events table with an index on
+user_id and created_at only) and ANALYZEs them. For every labeled prompt the
+expected tables are rendered with and without hints, the model generates SQL
+and the SQL is run and timed under --statement-timeout.
+
+    python scripts/bench_size_hints.py --build-fixture --fixture-rows 5000000
+"""
+
+import argparse
+import json
+import os
+
+import dotenv
+
+from da_ai_agent.data_types import LabeledPrompt
+from da_ai_agent.modules import bench, llm
+from da_ai_agent.modules.db_postgres import PostgresManager
+from da_ai_agent.modules.embeddings_postgres import DatabaseEmbedder
+
+dotenv.load_dotenv()
+
+assert os.environ.get("DATABASE_URL"), "POSTGRES_CONNECTION_URL not found in .env file"
+
+DB_URL = os.environ.get("DATABASE_URL")
+
+SQL_INSTRUCTIONS = "You're an elite SQL developer. You generate the most concise and performant SQL queries. Respond with a single ```sql code block."
+
+# run with query parameters, so literal modulo operators are written as %%
+FIXTURE_SQL = """
+DROP TABLE IF EXISTS bench_events;
+DROP TABLE IF EXISTS bench_users;
+CREATE TABLE bench_users (
+    id integer PRIMARY KEY,
+    email text,
+    country text,
+    created_at timestamp
+);
+INSERT INTO bench_users
+SELECT g, 'user' || g || '@example.com', (ARRAY['us', 'de', 'fr', 'br', 'jp'])[1 + g %% 5], now() - g * interval '1 minute'
+FROM generate_series(1, 100000) g;
+CREATE TABLE bench_events (
+    id bigint PRIMARY KEY,
+    user_id integer REFERENCES bench_users(id),
+    event_type text,
+    payload text,
+    created_at timestamp
+);
+INSERT INTO bench_events
+SELECT g, 1 + g %% 100000, (ARRAY['view', 'click', 'signup', 'purchase', 'refund'])[1 + g %% 5], md5(g::text), now() - (g %% 525600) * interval '1 minute'
+FROM generate_series(1, %(fixture_rows)s) g;
+CREATE INDEX bench_events_user_id_idx ON bench_events (user_id);
+CREATE INDEX bench_events_created_at_idx ON bench_events (created_at);
+ANALYZE bench_users;
+ANALYZE bench_events;
+"""
+
+FIXTURE_PROMPTS = [
+    LabeledPrompt("how many events did user 4242 have in the last 7 days", ["bench_events"]),
+    LabeledPrompt("number of purchase events yesterday", ["bench_events"]),
+    LabeledPrompt("the 10 most recent events of the user with email user77@example.com", ["bench_events", "bench_users"]),
+    LabeledPrompt("count signup events per country over the last 30 days", ["bench_events", "bench_users"]),
+    LabeledPrompt("which event types did user 31337 trigger this month", ["bench_events"]),
+    LabeledPrompt("total refunds in the last hour", ["bench_events"]),
+]
+
+
+def build_fixture(db: PostgresManager, fixture_rows: int):
+    print(f"Building fixture tables with {fixture_rows} events...")
+    db.cur.execute(FIXTURE_SQL, {"fixture_rows": fixture_rows})
+    db.conn.commit()
+
+
+def run_timed(db: PostgresManager, sql: str, timeout_ms: int):
+    """
+    (rows, elapsed ms, status) - status is 'ok', 'timeout' or 'error'.
+    """
+    try:
+        result, elapsed_ms = bench.timed(db.run_sql, sql)
+        return json.loads(result), elapsed_ms, "ok"
+    except Exception as error:
+        db.roll_back()
+        if "statement timeout" in str(error):
+            return None, float(timeout_ms), "timeout"
+        return None, 0.0, "error"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labeled-prompts", help="Labeled prompt set (json), defaults to the fixture prompts")
+    parser.add_argument("--build-fixture", action="store_true", help="(Re)create the bench_ fixture tables")
+    parser.add_argument("--fixture-rows", type=int, default=5_000_000)
+    parser.add_argument("--statement-timeout", type=int, default=30_000, help="ms")
+    parser.add_argument("--model", default="gpt-4-1106-preview")
+    args = parser.parse_args()
+
+    labeled_prompts = (
+        bench.load_labeled_prompts(args.labeled_prompts)
+        if args.labeled_prompts
+        else FIXTURE_PROMPTS
+    )
+
+    with PostgresManager() as db:
+        db.connect_with_url(DB_URL)
+        if args.build_fixture:
+            build_fixture(db, args.fixture_rows)
+
+        # committed, so the roll_back after a failed query doesn't undo it
+        db.cur.execute(f"SET statement_timeout = {int(args.statement_timeout)}")
+        db.conn.commit()
+
+        embedder = DatabaseEmbedder(db)
+        embedder.add_tables(db.get_table_definition_map_for_embeddings())
+        embedder.load_size_hints()
+
+        print(f"{len(labeled_prompts)} labeled prompts\n")
+        print(f"{'hints':<6} {'avg tokens':>11} {'p50 ms':>9} {'p95 ms':>9} {'timeouts':>9} {'errors':>7}")
+
+        for size_hints in (False, True):
+            embedder.size_hints = size_hints
+            tokens = []
+            latencies_ms = []
+            statuses = []
+
+            for labeled_prompt in labeled_prompts:
+                table_definitions = embedder.get_table_definitions_from_names(
+                    labeled_prompt.expected_tables
+                )
+                tokens.append(llm.count_tokens(table_definitions))
+
+                prompt = llm.add_cap_ref(
+                    f"Fulfill this database query: {labeled_prompt.prompt}. ",
+                    "Use these TABLE_DEFINITIONS to satisfy the database query.",
+                    "TABLE_DEFINITIONS",
+                    table_definitions,
+                )
+                response = llm.prompt(prompt, model=args.model, instructions=SQL_INSTRUCTIONS)
+                generated_sql = llm.extract_code_block(response) or response
+
+                _, elapsed_ms, status = run_timed(db, generated_sql, args.statement_timeout)
+                statuses.append(status)
+                if status != "error":
+                    latencies_ms.append(elapsed_ms)
+
+            print(
+                f"{'on' if size_hints else 'off':<6} {sum(tokens) / max(1, len(tokens)):>11.1f} "
+                f"{bench.percentile(latencies_ms, 50):>9.1f} {bench.percentile(latencies_ms, 95):>9.1f} "
+                f"{statuses.count('timeout'):>9} {statuses.count('error'):>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
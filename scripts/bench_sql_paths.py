@@ -0,0 +1,121 @@
+"""
+End to end latency of the SQL generation paths: one round trip (tool_call,
+code_block) vs the two step flow.
+
+For every labeled prompt the expected tables are rendered into the prompt,
+each path generates and runs SQL (response cache off), and the p50/p95
+latency, round trips, fallbacks and (when the prompt has "sql") result
+accuracy are reported per path.
+
+    python scripts/bench_sql_paths.py --labeled-prompts prompts.json --repeat 3
+"""
+
+import argparse
+import json
+import os
+
+import dotenv
+
+from da_ai_agent.data_types import TurboTool
+from da_ai_agent.modules import bench, llm, sql_generation
+from da_ai_agent.modules.db_postgres import PostgresManager
+from da_ai_agent.modules.embeddings_postgres import DatabaseEmbedder
+
+dotenv.load_dotenv()
+
+assert os.environ.get("DATABASE_URL"), "POSTGRES_CONNECTION_URL not found in .env file"
+
+DB_URL = os.environ.get("DATABASE_URL")
+
+
+def run_rows(db: PostgresManager, sql: str):
+    """
+    Result rows as a sorted list of value tuples, or None if the query fails.
+    """
+    try:
+        rows = json.loads(db.run_sql(sql))
+    except Exception:
+        db.roll_back()
+        return None
+    return sorted(tuple(str(value) for value in row.values()) for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labeled-prompts", required=True, help="Labeled prompt set (json)")
+    parser.add_argument("--paths", nargs="+", default=sql_generation.PATHS, choices=sql_generation.PATHS)
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per prompt and path")
+    parser.add_argument("--model", default="gpt-4-1106-preview")
+    parser.add_argument("--tool-model", default="gpt-4-1106-preview", help="Model of the run_sql hop in two_step")
+    args = parser.parse_args()
+
+    labeled_prompts = bench.load_labeled_prompts(args.labeled_prompts)
+
+    with PostgresManager() as db:
+        db.connect_with_url(DB_URL)
+        embedder = DatabaseEmbedder(db)
+        embedder.add_tables(db.get_table_definition_map_for_embeddings())
+
+        print(f"{len(labeled_prompts)} labeled prompts x {args.repeat}\n")
+        print(f"{'path':<12} {'p50 ms':>9} {'p95 ms':>9} {'trips':>6} {'fallback':>9} {'errors':>7} {'accuracy':>9}")
+
+        for path in args.paths:
+            latencies_ms = []
+            round_trips = []
+            fallbacks = 0
+            errors = 0
+            correct = 0
+            scored = 0
+
+            for labeled_prompt in labeled_prompts:
+                prompt = llm.add_cap_ref(
+                    f"Fulfill this database query: {labeled_prompt.prompt}. ",
+                    "Use these TABLE_DEFINITIONS to satisfy the database query.",
+                    "TABLE_DEFINITIONS",
+                    embedder.get_table_definitions_from_names(labeled_prompt.expected_tables),
+                )
+
+                for _ in range(args.repeat):
+                    executed = {}
+
+                    def run_sql(sql: str) -> str:
+                        executed["sql"] = sql
+                        executed["rows"] = run_rows(db, sql)
+                        return "Successfully ran the query"
+
+                    tool = TurboTool("run_sql", sql_generation.run_sql_tool_config, run_sql)
+
+                    try:
+                        result = sql_generation.generate_and_run_sql(
+                            prompt,
+                            tool,
+                            path=path,
+                            model=args.model,
+                            tool_model=args.tool_model,
+                            use_cache=False,
+                        )
+                    except Exception as error:
+                        print(f"❌ {path}: {error}")
+                        errors += 1
+                        continue
+
+                    latencies_ms.append(result.latency_ms)
+                    round_trips.append(result.round_trips)
+                    fallbacks += int(result.fell_back)
+
+                    if labeled_prompt.expected_sql:
+                        scored += 1
+                        expected_rows = run_rows(db, labeled_prompt.expected_sql)
+                        if expected_rows is not None and executed.get("rows") == expected_rows:
+                            correct += 1
+
+            avg_round_trips = sum(round_trips) / max(1, len(round_trips))
+            accuracy = f"{correct / scored:>9.3f}" if scored else f"{'n/a':>9}"
+            print(
+                f"{path:<12} {bench.percentile(latencies_ms, 50):>9.0f} {bench.percentile(latencies_ms, 95):>9.0f}"
+                f" {avg_round_trips:>6.2f} {fallbacks:>9} {errors:>7} {accuracy}"
+            )
+
+
+if __name__ == "__main__":
+    main()
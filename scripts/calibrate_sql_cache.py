@@ -0,0 +1,49 @@
+"""
+Calibrate the similarity threshold of a semantic SQL cache file on a paraphrase set.
+
+The lowest threshold at which at most --max-false-positive-rate of the
+non-equivalent pairs would be hits is saved in the cache file, for the
+embedding model used here. main_postgres then uses it unless
+--sql-cache-threshold is given.
+
+    python scripts/calibrate_sql_cache.py --sql-cache .sql_cache.sqlite --paraphrases paraphrases.json
+"""
+
+import argparse
+import os
+
+import dotenv
+
+from da_ai_agent.modules import bench, sql_cache
+from da_ai_agent.modules.embeddings_postgres import DatabaseEmbedder
+
+dotenv.load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sql-cache", default=os.environ.get("SQL_CACHE_PATH"), required=not os.environ.get("SQL_CACHE_PATH"))
+    parser.add_argument("--paraphrases", required=True, help="Paraphrase pair set (json), see bench.load_paraphrase_pairs")
+    parser.add_argument("--max-false-positive-rate", type=float, default=sql_cache.DEFAULT_MAX_FALSE_POSITIVE_RATE)
+    parser.add_argument("--quantize-embeddings", action="store_true", help="Calibrate for the int8 model")
+    args = parser.parse_args()
+
+    pairs = bench.load_paraphrase_pairs(args.paraphrases)
+
+    # only the embedding model is needed, no database connection
+    embedder = DatabaseEmbedder(None, quantize=args.quantize_embeddings)
+    cache = sql_cache.SemanticSQLCache(embedder, args.sql_cache, threshold=sql_cache.DEFAULT_SIMILARITY_THRESHOLD)
+
+    report = cache.calibrate(pairs, args.max_false_positive_rate)
+
+    print(f"{len(pairs)} paraphrase pairs")
+    print(
+        f"✅ threshold {report['threshold']:.4f} for {cache.threshold_key()}: "
+        f"recall {report['recall']:.1%}, false positives {report['false_positive_rate']:.1%} "
+        f"({report['equivalent_pairs']} equivalent, {report['non_equivalent_pairs']} non-equivalent, "
+        f"{report['literal_rejected_pairs']} rejected by literals)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Hit rate and false positive audit report of a semantic SQL cache file.
+
+    python scripts/sql_cache_report.py --sql-cache .sql_cache.sqlite --false-positives
+"""
+
+import argparse
+import os
+import sqlite3
+
+import dotenv
+
+dotenv.load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sql-cache", default=os.environ.get("SQL_CACHE_PATH"), required=not os.environ.get("SQL_CACHE_PATH"))
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--false-positives", action="store_true", help="Only list disagreeing audits")
+    args = parser.parse_args()
+
+    # read the file directly - no embedding model needed for a report
+    conn = sqlite3.connect(args.sql_cache)
+
+    n_entries, n_hits = conn.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM sql_cache").fetchone()
+    n_audits, n_false_positives = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(1 - agreed), 0) FROM sql_cache_audits"
+    ).fetchone()
+
+    print(f"{n_entries} cached prompts, {n_hits} hits served")
+    print(
+        f"{n_audits} audits, {n_false_positives} false positives"
+        + (f" ({n_false_positives / n_audits:.1%})" if n_audits else "")
+    )
+
+    where = "WHERE agreed = 0" if args.false_positives else ""
+    rows = conn.execute(
+        f"""
+        SELECT similarity, agreed, prompt, cached_prompt
+        FROM sql_cache_audits {where}
+        ORDER BY id DESC LIMIT ?
+        """,
+        (args.limit,),
+    ).fetchall()
+
+    if rows:
+        print(f"\n{'sim':>6} {'ok':>3}  prompt  <-  cached prompt")
+    for similarity, agreed, prompt, cached_prompt in rows:
+        print(f"{similarity:>6.3f} {'✅' if agreed else '❌':>3}  {prompt}  <-  {cached_prompt}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import zlib
+
+import numpy as np
+import pytest
+
+from da_ai_agent.modules import bert, embeddings_postgres
+from da_ai_agent.modules.word_match import tokenize
+
+FAKE_EMBEDDING_SIZE = 64
+
+
+def fake_compute_embeddings(tokenizer, model, texts, *args, **kwargs) -> np.ndarray:
+    """
+    Bag of identifier tokens hashed into a small vector - texts sharing words are similar.
+    """
+    if isinstance(texts, str):
+        texts = [texts]
+    embeddings = np.zeros((len(texts), FAKE_EMBEDDING_SIZE), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for token in tokenize(text):
+            embeddings[i, zlib.crc32(token.encode("utf-8")) % FAKE_EMBEDDING_SIZE] += 1.0
+    return embeddings
+
+
+@pytest.fixture
+def make_embedder(monkeypatch):
+    """
+    DatabaseEmbedder factory that skips loading BERT and embeds with fake_compute_embeddings.
+    """
+    monkeypatch.setattr(bert, "load_tokenizer_and_model", lambda quantize=False: (None, None))
+    monkeypatch.setattr(bert, "compute_embeddings", fake_compute_embeddings)
+
+    def make(map_table_name_to_table_def, **kwargs):
+        embedder = embeddings_postgres.DatabaseEmbedder(None, **kwargs)
+        embedder.add_tables(map_table_name_to_table_def)
+        return embedder
+
+    return make
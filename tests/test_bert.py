@@ -0,0 +1,90 @@
+import pytest
+import torch
+from transformers import BertConfig, BertModel, BertTokenizer
+
+from da_ai_agent.modules import bert
+
+TINY_VOCAB = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "order", "items", "user", "id", "name"]
+
+
+@pytest.fixture
+def tiny_bert(tmp_path):
+    """
+    Randomly initialized one layer BERT over a ten word vocab - no download needed.
+    """
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(TINY_VOCAB) + "\n")
+    tokenizer = BertTokenizer(str(vocab_file))
+
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(TINY_VOCAB),
+        hidden_size=16,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=32,
+        max_position_embeddings=64,
+    )
+    return tokenizer, BertModel(config).eval()
+
+
+def test_quantize_model_shrinks_the_model_and_keeps_the_vector_size(tiny_bert):
+    tokenizer, model = tiny_bert
+    quantized = bert.quantize_model(model)
+
+    assert bert.model_size_bytes(quantized) < bert.model_size_bytes(model)
+    assert bert.compute_embeddings(tokenizer, quantized, ["order items"]).shape == (1, 16)
+
+
+def test_model_key_keeps_fp32_and_int8_vectors_apart():
+    assert bert.model_key() != bert.model_key(quantize=True)
+    assert bert.model_key(quantize=True).endswith("-int8")
+
+
+def test_split_into_chunks_keeps_short_inputs_whole():
+    assert bert.split_into_chunks(list(range(10)), max_length=12) == [list(range(10))]
+
+
+def test_split_into_chunks_overlaps_and_covers_every_token():
+    token_ids = list(range(25))
+    chunks = bert.split_into_chunks(token_ids, max_length=12, overlap=4)
+
+    assert chunks == [list(range(0, 10)), list(range(6, 16)), list(range(12, 22)), list(range(18, 25))]
+    assert all(len(chunk) <= 10 for chunk in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous[-4:] == chunk[:4]
+
+
+def test_split_into_chunks_stops_at_the_chunk_that_reaches_the_end():
+    assert bert.split_into_chunks(list(range(16)), max_length=12, overlap=4) == [
+        list(range(0, 10)),
+        list(range(6, 16)),
+    ]
+
+
+def test_compute_embeddings_short_text_matches_a_single_forward_pass(tiny_bert):
+    tokenizer, model = tiny_bert
+    inputs = tokenizer("order items", return_tensors="pt")
+    with torch.no_grad():
+        expected = model(**inputs)["pooler_output"].numpy()[0]
+
+    assert bert.compute_embeddings(tokenizer, model, "order items")[0] == pytest.approx(expected, abs=1e-5)
+
+
+def test_compute_embeddings_long_text_is_the_weighted_mean_of_its_chunks(tiny_bert):
+    tokenizer, model = tiny_bert
+    text = "user id name " * 8
+    token_ids = tokenizer(text, add_special_tokens=False)["input_ids"]
+    chunks = bert.split_into_chunks(token_ids, max_length=12, overlap=4)
+    assert len(chunks) > 1
+
+    chunk_vectors = [
+        bert.compute_embeddings(tokenizer, model, tokenizer.decode(chunk))[0] for chunk in chunks
+    ]
+    expected = sum(len(c) * v for c, v in zip(chunks, chunk_vectors)) / sum(len(c) for c in chunks)
+
+    embeddings = bert.compute_embeddings(
+        tokenizer, model, ["order items", text], max_length=12, overlap=4, batch_size=2
+    )
+    assert embeddings.shape == (2, 16)
+    assert embeddings[1] == pytest.approx(expected, abs=1e-5)
@@ -0,0 +1,43 @@
+import pytest
+
+from da_ai_agent.modules.bm25 import BM25Index, reciprocal_rank_fusion
+
+DOCUMENTS = {
+    "customer_orders": "customer_orders id customer_id order_date total",
+    "customers": "customers id name email",
+    "products": "products id name price",
+}
+
+
+def test_bm25_matches_split_and_singularized_identifiers():
+    index = BM25Index(DOCUMENTS)
+
+    assert index.rank("customerOrders placed last week") == ["customer_orders", "customers"]
+    assert index.rank("price of each product") == ["products"]
+
+
+def test_bm25_skips_documents_without_query_terms():
+    index = BM25Index(DOCUMENTS)
+
+    assert index.score("weather forecast") == {}
+    assert "products" not in index.score("customer email")
+
+
+def test_bm25_rarer_terms_score_higher():
+    index = BM25Index(DOCUMENTS)
+    scores = index.score("email name")
+
+    # 'email' is in one document, 'name' in two
+    assert scores["customers"] > scores["products"]
+
+
+def test_reciprocal_rank_fusion_sums_weighted_reciprocal_ranks():
+    fused = reciprocal_rank_fusion([["a", "b"], ["b", "c"]], weights=[1.0, 2.0], k=1)
+
+    assert fused == pytest.approx({"a": 1 / 2, "b": 1 / 3 + 2 / 2, "c": 2 / 3})
+
+
+def test_reciprocal_rank_fusion_favors_items_ranked_by_both():
+    fused = reciprocal_rank_fusion([["a", "b", "c", "d"], ["d", "b", "e"]])
+
+    assert max(fused, key=fused.get) == "b"
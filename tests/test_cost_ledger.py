@@ -0,0 +1,101 @@
+import pytest
+
+from da_ai_agent.data_types import UsageTotals
+from da_ai_agent.modules import cost_ledger
+from da_ai_agent.modules.cost_ledger import CostLedger
+
+
+def test_price_uses_separate_input_and_output_rates():
+    assert cost_ledger.price("gpt-4", 1000, 1000) == pytest.approx(0.03 + 0.06)
+    assert cost_ledger.price("gpt-3.5-turbo-1106", 2000, 500) == pytest.approx(0.002 + 0.001)
+
+
+def test_resolve_pricing_model():
+    assert cost_ledger.resolve_pricing_model("gpt-4-0613") == "gpt-4"
+    assert cost_ledger.resolve_pricing_model("gpt-3.5-turbo-16k-0613") == "gpt-3.5-turbo"
+    assert cost_ledger.resolve_pricing_model("unknown-model") == cost_ledger.FALLBACK_PRICING_MODEL
+
+
+def test_read_usage_from_dict_object_and_none():
+    class Usage:
+        prompt_tokens = 3
+        completion_tokens = 4
+
+    assert cost_ledger.read_usage({"prompt_tokens": 1, "completion_tokens": 2}) == (1, 2)
+    assert cost_ledger.read_usage(Usage()) == (3, 4)
+    assert cost_ledger.read_usage(None) == (0, 0)
+
+
+def test_records_roll_up_per_label():
+    ledger = CostLedger()
+
+    with cost_ledger.scope(team="data_eng", session_id="s1"):
+        ledger.record("gpt-4", 100, 10)
+        with cost_ledger.scope(route="gate"):
+            ledger.record("gpt-3.5-turbo-1106", 50, 5)
+    ledger.record("gpt-4", 1, 1, tenant="acme")
+
+    assert ledger.totals.calls == 3
+    assert ledger.map_team_to_totals["data_eng"].calls == 2
+    assert ledger.map_session_to_totals["s1"].prompt_tokens == 150
+    assert ledger.map_route_to_totals["gate"].completion_tokens == 5
+    assert ledger.map_tenant_to_totals["acme"].calls == 1
+    assert ledger.map_model_to_totals["gpt-4"].calls == 2
+    assert ledger.totals.cost == pytest.approx(sum(t.cost for t in ledger.map_model_to_totals.values()))
+
+
+def test_explicit_labels_override_the_scope():
+    ledger = CostLedger()
+
+    with cost_ledger.scope(team="data_eng"):
+        record = ledger.record("gpt-4", 1, 1, team="insights")
+
+    assert record.team == "insights"
+    assert "data_eng" not in ledger.map_team_to_totals
+
+
+def test_record_response_skips_responses_without_usage():
+    ledger = CostLedger()
+
+    assert ledger.record_response({"model": "gpt-4"}) is None
+    record = ledger.record_response(
+        {"model": "gpt-4", "usage": {"prompt_tokens": 7, "completion_tokens": 3}}
+    )
+
+    assert (record.prompt_tokens, record.completion_tokens) == (7, 3)
+    assert ledger.totals.calls == 1
+
+
+def test_collect_adds_records_made_inside_the_block():
+    ledger = CostLedger()
+    outer = UsageTotals()
+    inner = UsageTotals()
+
+    with cost_ledger.collect(outer):
+        ledger.record("gpt-4", 10, 1)
+        with cost_ledger.collect(inner):
+            ledger.record("gpt-4", 20, 2)
+    ledger.record("gpt-4", 40, 4)
+
+    assert (outer.calls, outer.prompt_tokens) == (2, 30)
+    assert (inner.calls, inner.prompt_tokens) == (1, 20)
+
+
+def test_ledger_appends_records_to_its_path(tmp_path):
+    path = tmp_path / "ledger.jsonl"
+    ledger = CostLedger(str(path))
+
+    ledger.record("gpt-4", 1, 1)
+    ledger.record("gpt-4", 2, 2)
+
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_ledger_keeps_only_recent_records_but_totals_everything():
+    ledger = CostLedger(max_records=2)
+
+    for prompt_tokens in [1, 2, 3]:
+        ledger.record("gpt-4", prompt_tokens, 0)
+
+    assert [record.prompt_tokens for record in ledger.records] == [2, 3]
+    assert (ledger.totals.calls, ledger.totals.prompt_tokens) == (3, 6)
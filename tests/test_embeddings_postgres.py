@@ -0,0 +1,64 @@
+from da_ai_agent.modules.embeddings_postgres import (
+    LEXICAL_MATCH_SCORE,
+    SOURCE_EMBEDDING,
+    SOURCE_FK,
+    SOURCE_LEXICAL,
+    normalize_prompt,
+)
+
+MAP_TABLE_NAME_TO_TABLE_DEF = {
+    "users": "CREATE TABLE users (id int, email text, signup_date date)",
+    "orders": "CREATE TABLE orders (id int, user_id int, total numeric, order_date date)",
+    "order_items": "CREATE TABLE order_items (id int, order_id int, product_id int, quantity int)",
+    "products": "CREATE TABLE products (id int, name text, price numeric)",
+}
+
+
+def test_normalize_prompt():
+    assert normalize_prompt("  Top 5   Users? ") == "top 5 users"
+
+
+def test_table_candidates_are_deduplicated_with_provenance(make_embedder):
+    embedder = make_embedder(MAP_TABLE_NAME_TO_TABLE_DEF)
+
+    candidates = embedder.get_table_candidates("total of the orders", n=2)
+    table_names = [c.table_name for c in candidates]
+
+    assert len(table_names) == len(set(table_names))
+    orders = candidates[table_names.index("orders")]
+    assert orders.score == LEXICAL_MATCH_SCORE
+    assert orders.sources == [SOURCE_EMBEDDING, SOURCE_LEXICAL]
+
+
+def test_table_candidates_put_foreign_key_tables_last_by_name(make_embedder):
+    embedder = make_embedder(MAP_TABLE_NAME_TO_TABLE_DEF)
+    embedder.map_name_to_related_tables = {"orders": ["users", "order_items"]}
+
+    candidates = embedder.get_table_candidates("orders", n=1, n_foreign=1)
+
+    assert [c.table_name for c in candidates] == ["orders", "order_items", "users"]
+    assert [c.sources for c in candidates[1:]] == [[SOURCE_FK], [SOURCE_FK]]
+
+
+def test_table_candidates_are_stable_across_calls(make_embedder):
+    embedder = make_embedder(MAP_TABLE_NAME_TO_TABLE_DEF)
+
+    first = embedder.get_table_candidates("products in each order", n=3)
+    second = embedder.get_table_candidates("Products in each order?", n=3)
+
+    assert first == second
+    assert embedder.similar_tables_cache.stats()["hits"] == 1
+
+
+def test_cached_table_candidates_are_copies(make_embedder):
+    embedder = make_embedder(MAP_TABLE_NAME_TO_TABLE_DEF)
+
+    first = embedder.get_table_candidates("orders", n=2)
+    expected = [(c.table_name, c.score, list(c.sources)) for c in first]
+    first[0].score = -1.0
+    first[0].sources.append("edited")
+    first.pop()
+
+    second = embedder.get_table_candidates("orders", n=2)
+
+    assert [(c.table_name, c.score, c.sources) for c in second] == expected
@@ -0,0 +1,82 @@
+import itertools
+
+import pytest
+
+from da_ai_agent.modules import llm_cache
+from da_ai_agent.modules.llm_cache import ResponseCache, make_cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    llm_cache's time.time, advanced by one second per call unless set.
+    """
+
+    class Clock:
+        def __init__(self):
+            self.ticks = itertools.count()
+            self.offset = 0.0
+
+        def time(self):
+            return next(self.ticks) + self.offset
+
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock.time)
+    return clock
+
+
+def test_make_cache_key_ignores_ordering_and_none_values():
+    a = {"model": "gpt-4", "messages": [{"role": "user", "content": "hi"}], "tools": None}
+    b = {"messages": [{"role": "user", "content": "hi"}], "model": "gpt-4"}
+
+    assert make_cache_key(a) == make_cache_key(b)
+    assert make_cache_key(a) != make_cache_key({**b, "model": "gpt-3.5-turbo"})
+
+
+def test_get_returns_what_put_stored(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    cache.put("k", "gpt-4", {"choices": [{"message": {"content": "hi"}}]})
+
+    assert cache.get("k") == {"choices": [{"message": {"content": "hi"}}]}
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl_seconds=60)
+    cache.put("k", "gpt-4", {"content": "hi"})
+
+    clock.offset = 120
+    assert cache.get("k") is None
+    assert cache.expirations == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted_past_max_entries(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    cache.put("a", "gpt-4", {"content": "a"})
+    cache.put("b", "gpt-4", {"content": "b"})
+    # reading 'a' makes 'b' the least recently used
+    cache.get("a")
+    cache.put("c", "gpt-4", {"content": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"content": "a"}
+    assert cache.get("c") == {"content": "c"}
+    assert cache.evictions == 1
+
+
+def test_entries_are_evicted_past_max_bytes(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=50)
+    cache.put("a", "gpt-4", {"content": "a" * 30})
+    cache.put("b", "gpt-4", {"content": "b" * 30})
+
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_cache_is_shared_through_the_file(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    ResponseCache(path).put("k", "gpt-4", {"content": "hi"})
+
+    assert ResponseCache(path).get("k") == {"content": "hi"}
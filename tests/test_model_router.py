@@ -0,0 +1,63 @@
+import pytest
+
+from da_ai_agent.data_types import MAX_ROUTE_LATENCIES, RouteAttempt, RouteStats
+from da_ai_agent.modules import model_router
+from da_ai_agent.modules.model_router import ModelRouter
+
+
+def test_escalation_chain_moves_up_the_tiers_without_repeats():
+    router = ModelRouter(max_escalations=2)
+
+    assert router.escalation_chain(model_router.ROUTE_GATE) == ["gpt-3.5-turbo-1106", "gpt-4-1106-preview", "gpt-4"]
+    assert router.escalation_chain(model_router.ROUTE_SELF_CORRECTION) == ["gpt-4"]
+
+
+def test_run_returns_the_first_result_that_succeeded():
+    router = ModelRouter()
+    models = []
+
+    def call(model):
+        models.append(model)
+        return "3"
+
+    assert router.run(model_router.ROUTE_GATE, call, succeeded=str.isdigit) == "3"
+    assert models == ["gpt-3.5-turbo-1106"]
+
+
+def test_run_escalates_a_failed_result_and_records_each_attempt():
+    router = ModelRouter()
+    replies = iter(["maybe", "4"])
+
+    result = router.run(model_router.ROUTE_GATE, lambda model: next(replies), succeeded=str.isdigit)
+
+    stats = router.map_route_to_stats[model_router.ROUTE_GATE]
+    assert result == "4"
+    assert (stats.calls, stats.successes, stats.escalations) == (2, 1, 1)
+    assert stats.map_model_to_calls == {"gpt-3.5-turbo-1106": 1, "gpt-4-1106-preview": 1}
+
+
+def test_run_returns_the_last_result_when_every_model_failed():
+    router = ModelRouter()
+
+    assert router.run(model_router.ROUTE_GATE, lambda model: "maybe", succeeded=str.isdigit) == "maybe"
+
+
+def test_run_escalates_errors_and_reraises_on_the_strongest_model():
+    router = ModelRouter()
+
+    def call(model):
+        raise RuntimeError(model)
+
+    with pytest.raises(RuntimeError, match="gpt-4-1106-preview"):
+        router.run(model_router.ROUTE_GATE, call)
+    assert router.map_route_to_stats[model_router.ROUTE_GATE].calls == 2
+
+
+def test_route_stats_keep_only_recent_latencies():
+    stats = RouteStats()
+    for i in range(MAX_ROUTE_LATENCIES + 10):
+        stats.add(RouteAttempt(model_router.ROUTE_GATE, "gpt-4", 0, latency_ms=float(i)))
+
+    assert stats.calls == MAX_ROUTE_LATENCIES + 10
+    assert len(stats.latencies_ms) == MAX_ROUTE_LATENCIES
+    assert stats.latencies_ms[0] == 10.0
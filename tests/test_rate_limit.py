@@ -0,0 +1,131 @@
+import threading
+import time
+
+import httpx
+import openai
+import pytest
+
+from da_ai_agent.modules import rate_limit
+from da_ai_agent.modules.rate_limit import RateLimitScheduler, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    rate_limit's time.monotonic, moved by hand.
+    """
+
+    class Clock:
+        now = 1000.0
+
+        def monotonic(self):
+            return self.now
+
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock.monotonic)
+    return clock
+
+
+def test_token_bucket_refills_at_the_per_minute_rate(clock):
+    bucket = TokenBucket(per_minute=60)
+    bucket.take(60)
+
+    assert bucket.wait_time(30) == pytest.approx(30)
+    clock.now += 10
+    assert bucket.wait_time(30) == pytest.approx(20)
+    clock.now += 20
+    assert bucket.wait_time(30) == 0.0
+
+
+def test_token_bucket_never_refills_past_capacity(clock):
+    bucket = TokenBucket(per_minute=60)
+    clock.now += 600
+    bucket.refill()
+    bucket.give_back(100)
+
+    assert bucket.level == 60
+
+
+def test_token_bucket_request_larger_than_capacity_waits_for_a_full_bucket(clock):
+    bucket = TokenBucket(per_minute=60)
+    bucket.take(30)
+
+    assert bucket.wait_time(1000) == pytest.approx(30)
+
+
+def test_settle_replaces_the_estimate_with_the_actual_usage():
+    scheduler = RateLimitScheduler(requests_per_minute=0, tokens_per_minute=1000)
+    scheduler.acquire(estimated_tokens=400)
+    scheduler.settle(400, 100)
+
+    assert scheduler.token_bucket.level == pytest.approx(900, abs=1)
+
+
+def test_priority_context_sets_the_default_priority():
+    assert rate_limit.current_priority.get() == rate_limit.PRIORITY_INTERACTIVE
+    with rate_limit.priority(rate_limit.PRIORITY_INSIGHTS):
+        assert rate_limit.current_priority.get() == rate_limit.PRIORITY_INSIGHTS
+    assert rate_limit.current_priority.get() == rate_limit.PRIORITY_INTERACTIVE
+
+
+def test_waiting_interactive_requests_go_before_earlier_insights_requests():
+    # 10 requests a second, the bucket is empty for the next 0.2s
+    scheduler = RateLimitScheduler(requests_per_minute=600, tokens_per_minute=0)
+    scheduler.request_bucket.level = -1
+    served = []
+
+    def request(level, name):
+        scheduler.acquire(priority=level)
+        served.append(name)
+
+    def start_and_wait_until_queued(level, name, n_queued):
+        thread = threading.Thread(target=request, args=(level, name))
+        thread.start()
+        while len(scheduler.queue) < n_queued:
+            time.sleep(0.001)
+        return thread
+
+    threads = [
+        start_and_wait_until_queued(rate_limit.PRIORITY_INSIGHTS, "insights", 1),
+        start_and_wait_until_queued(rate_limit.PRIORITY_INTERACTIVE, "interactive", 2),
+    ]
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert served == ["interactive", "insights"]
+
+
+def test_submit_retries_retryable_errors_and_gives_back_their_tokens():
+    scheduler = RateLimitScheduler(requests_per_minute=0, tokens_per_minute=1000, base_delay=0)
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com"))
+        return {"usage": {"total_tokens": 50}}
+
+    assert scheduler.submit(call, estimated_tokens=200) == {"usage": {"total_tokens": 50}}
+    assert len(attempts) == 3
+    assert scheduler.counters["retries"] == 2
+    assert scheduler.token_bucket.level == pytest.approx(950, abs=1)
+
+
+def test_submit_raises_after_max_retries():
+    scheduler = RateLimitScheduler(requests_per_minute=0, tokens_per_minute=0, max_retries=1, base_delay=0)
+
+    def call():
+        raise openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com"))
+
+    with pytest.raises(openai.APIConnectionError):
+        scheduler.submit(call)
+
+
+def test_retry_after_seconds_reads_the_headers():
+    class Error:
+        def __init__(self, headers):
+            self.response = httpx.Response(429, headers=headers)
+
+    assert rate_limit.retry_after_seconds(Error({"retry-after-ms": "1500"})) == 1.5
+    assert rate_limit.retry_after_seconds(Error({"retry-after": "7"})) == 7.0
+    assert rate_limit.retry_after_seconds(Error({})) is None
@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+
+from da_ai_agent.modules import schema_index, synthetic_schema
+
+MAP_TABLE_NAME_TO_TABLE_DEF = {
+    "users": "CREATE TABLE users (id int, email text, signup_date date)",
+    "orders": "CREATE TABLE orders (id int, user_id int, total numeric, order_date date)",
+    "products": "CREATE TABLE products (id int, name text, price numeric)",
+}
+FOREIGN_KEY_GRAPH = {"orders": ["users"]}
+
+
+def test_save_and_load_round_trip(make_embedder, tmp_path):
+    embedder = make_embedder(MAP_TABLE_NAME_TO_TABLE_DEF)
+    schema_index.save_index(embedder, str(tmp_path), schema_index.DATABASE_POSTGRES, FOREIGN_KEY_GRAPH)
+
+    loaded = make_embedder({})
+    manifest = schema_index.load_index(loaded, str(tmp_path), schema_index.DATABASE_POSTGRES)
+
+    assert manifest["n_tables"] == 3
+    assert loaded.map_name_to_table_def == embedder.map_name_to_table_def
+    assert loaded.map_name_to_related_tables == FOREIGN_KEY_GRAPH
+    assert sorted(loaded.map_name_to_embeddings) == sorted(embedder.map_name_to_embeddings)
+    for name, embeddings in embedder.map_name_to_embeddings.items():
+        np.testing.assert_array_equal(loaded.map_name_to_embeddings[name], embeddings)
+    assert loaded.get_similar_tables("total of the orders") == embedder.get_similar_tables(
+        "total of the orders"
+    )
+
+
+def test_save_and_load_round_trip_the_column_index(make_embedder, tmp_path):
+    db = synthetic_schema.SyntheticDatabase(synthetic_schema.generate_schema(n_tables=4, n_columns=5))
+    embedder = make_embedder(db.get_table_definition_map_for_embeddings())
+    embedder.db = db
+    embedder.index_columns()
+    schema_index.save_index(embedder, str(tmp_path), schema_index.DATABASE_POSTGRES)
+
+    loaded = make_embedder({})
+    manifest = schema_index.load_index(loaded, str(tmp_path), schema_index.DATABASE_POSTGRES)
+
+    assert manifest["n_columns"] == 20
+    assert loaded.columns_indexed
+    assert loaded.map_name_to_columns == embedder.map_name_to_columns
+    assert loaded.map_name_to_key_columns == embedder.map_name_to_key_columns
+    for name, embeddings in embedder.map_name_to_column_embeddings.items():
+        np.testing.assert_array_equal(loaded.map_name_to_column_embeddings[name], embeddings)
+
+
+def test_save_reuses_the_version_of_an_unchanged_schema(make_embedder, tmp_path):
+    embedder = make_embedder(MAP_TABLE_NAME_TO_TABLE_DEF)
+    first = schema_index.save_index(embedder, str(tmp_path), schema_index.DATABASE_POSTGRES)
+    second = schema_index.save_index(embedder, str(tmp_path), schema_index.DATABASE_POSTGRES)
+
+    altered = make_embedder({**MAP_TABLE_NAME_TO_TABLE_DEF, "products": "CREATE TABLE products (id int)"})
+    third = schema_index.save_index(altered, str(tmp_path), schema_index.DATABASE_POSTGRES)
+
+    assert first == second
+    assert third != first
+    assert schema_index.get_latest_version_dir(str(tmp_path)) == third
+    assert not any(".tmp" in name for name in os.listdir(tmp_path))
+
+
+def test_load_ignores_a_missing_index_or_another_database(make_embedder, tmp_path):
+    embedder = make_embedder(MAP_TABLE_NAME_TO_TABLE_DEF)
+    loaded = make_embedder({})
+
+    assert schema_index.load_index(loaded, str(tmp_path), schema_index.DATABASE_POSTGRES) is None
+
+    schema_index.save_index(embedder, str(tmp_path), schema_index.DATABASE_POSTGRES)
+    assert schema_index.load_index(loaded, str(tmp_path), schema_index.DATABASE_PRESTO) is None
+    assert loaded.map_name_to_table_def == {}
@@ -0,0 +1,52 @@
+import json
+
+from da_ai_agent.modules.sql_cache import SemanticSQLCache, extract_literals, results_match
+
+TABLES = {"customers": "CREATE TABLE customers (id int, name text, revenue numeric)"}
+
+
+def test_extract_literals_quoted_dates_and_numbers():
+    assert extract_literals("top 5 customers in 'EMEA' since 2023-01-01") == ('"EMEA"', "2023-01-01", "5")
+    assert extract_literals('orders over 1,000 for "Acme Corp"') == ('"Acme Corp"', "1000")
+
+
+def test_extract_literals_number_and_month_words():
+    assert extract_literals("top five customers") == ("5",)
+    assert extract_literals("Top 5 customers") == extract_literals("top five customers")
+    assert extract_literals("sales in March") == ("month 3",)
+
+
+def test_extract_literals_prompts_differing_in_a_literal_differ():
+    assert extract_literals("top 5 customers") != extract_literals("top 10 customers")
+    assert extract_literals("sales in 2022") != extract_literals("sales in 2023")
+    assert extract_literals("all customers") == ()
+
+
+def test_results_match_ignores_row_order_and_column_names():
+    a = json.dumps([{"name": "a", "total": 1}, {"name": "b", "total": 2}])
+    b = json.dumps([{"customer": "b", "sum": 2}, {"customer": "a", "sum": 1}])
+
+    assert results_match(a, b)
+    assert not results_match(a, json.dumps([{"name": "a", "total": 1}]))
+    assert not results_match(a, "not json")
+
+
+def test_lookup_reuses_sql_only_when_the_literals_match(make_embedder):
+    # the fake embedding puts one differing word out of five at 0.8
+    cache = SemanticSQLCache(make_embedder(TABLES), threshold=0.75, audit_rate=0.0)
+    cache.store("top 5 customers by revenue", "SELECT name FROM customers ORDER BY revenue DESC LIMIT 5")
+
+    hit = cache.lookup("Top five customers by revenue")
+    assert hit is not None
+    assert hit.sql.endswith("LIMIT 5")
+
+    assert cache.lookup("top 10 customers by revenue") is None
+    assert cache.literal_rejects == 1
+
+
+def test_lookup_bypass_skips_the_cache(make_embedder):
+    cache = SemanticSQLCache(make_embedder(TABLES), threshold=0.9)
+    cache.store("all customers", "SELECT * FROM customers")
+
+    assert cache.lookup("all customers", bypass=True) is None
+    assert (cache.lookups, cache.bypasses) == (0, 1)
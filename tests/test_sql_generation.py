@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from da_ai_agent.data_types import TurboTool
+from da_ai_agent.modules import llm, sql_generation
+
+
+def tool_call_response(arguments):
+    return {
+        "choices": [
+            {
+                "message": {
+                    "role": "assistant",
+                    "tool_calls": [
+                        {"id": "call_1", "type": "function", "function": {"name": "run_sql", "arguments": arguments}}
+                    ],
+                }
+            }
+        ]
+    }
+
+
+@pytest.fixture
+def executed():
+    return []
+
+
+@pytest.fixture
+def run_sql_tool(executed):
+    def run_sql(sql: str) -> str:
+        executed.append(sql)
+        return "[]"
+
+    return TurboTool("run_sql", sql_generation.run_sql_tool_config, run_sql)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """
+    Serves the tool_call response set in fake_llm["response"], and a canned two step flow.
+    """
+    calls = {"response": None, "two_step": 0}
+
+    def prompt_func(prompt, turbo_tools, **kwargs):
+        calls["two_step"] += 1
+        return [turbo_tools[0].function(sql="SELECT 2")]
+
+    monkeypatch.setattr(llm, "create_chat_completion", lambda use_cache=True, **request: calls["response"])
+    monkeypatch.setattr(llm, "prompt", lambda prompt, **kwargs: "SELECT 2")
+    monkeypatch.setattr(llm, "prompt_func", prompt_func)
+    return calls
+
+
+def test_parse_tool_call_sql():
+    assert sql_generation.parse_tool_call_sql(tool_call_response(json.dumps({"sql": "SELECT 1"})), "run_sql") == "SELECT 1"
+    assert sql_generation.parse_tool_call_sql(tool_call_response(json.dumps({"sql": "SELECT 1"})), "other") is None
+    assert sql_generation.parse_tool_call_sql(tool_call_response("{not json"), "run_sql") is None
+    assert sql_generation.parse_tool_call_sql(tool_call_response(json.dumps(["SELECT 1"])), "run_sql") is None
+    assert sql_generation.parse_tool_call_sql(tool_call_response(json.dumps({"query": "SELECT 1"})), "run_sql") is None
+    assert sql_generation.parse_tool_call_sql(tool_call_response(json.dumps({"sql": " "})), "run_sql") is None
+    assert sql_generation.parse_tool_call_sql({"choices": [{"message": {"content": "hi"}}]}, "run_sql") is None
+
+
+def test_tool_call_path_runs_the_sql_in_one_round_trip(fake_llm, run_sql_tool, executed):
+    fake_llm["response"] = tool_call_response(json.dumps({"sql": "SELECT 1"}))
+
+    result = sql_generation.generate_and_run_sql("top users", run_sql_tool)
+
+    assert executed == ["SELECT 1"]
+    assert (result.path, result.round_trips, result.fell_back) == ("tool_call", 1, False)
+
+
+@pytest.mark.parametrize("arguments", ["{not json", json.dumps({"query": "SELECT 1"}), json.dumps([1])])
+def test_tool_call_path_falls_back_when_the_call_cant_be_parsed(fake_llm, run_sql_tool, executed, arguments):
+    fake_llm["response"] = tool_call_response(arguments)
+
+    result = sql_generation.generate_and_run_sql("top users", run_sql_tool)
+
+    assert executed == ["SELECT 2"]
+    assert fake_llm["two_step"] == 1
+    assert (result.round_trips, result.fell_back) == (3, True)
+
+
+def test_tool_call_path_raises_errors_of_the_tool_itself(fake_llm):
+    fake_llm["response"] = tool_call_response(json.dumps({"sql": "SELECT 1"}))
+
+    def broken_run_sql(sql: str) -> str:
+        raise TypeError("bug in run_sql")
+
+    tool = TurboTool("run_sql", sql_generation.run_sql_tool_config, broken_run_sql)
+
+    with pytest.raises(TypeError):
+        sql_generation.generate_and_run_sql("top users", tool)
+    assert fake_llm["two_step"] == 0
+
+
+def test_code_block_path(fake_llm, run_sql_tool, executed, monkeypatch):
+    monkeypatch.setattr(llm, "prompt", lambda prompt, **kwargs: "Here:\n```sql\nSELECT 3;\n```")
+
+    result = sql_generation.generate_and_run_sql("top users", run_sql_tool, path=sql_generation.PATH_CODE_BLOCK)
+
+    assert executed == ["SELECT 3;"]
+    assert (result.round_trips, result.fell_back) == (1, False)
+
+
+def test_unknown_path_raises(run_sql_tool):
+    with pytest.raises(ValueError):
+        sql_generation.generate_and_run_sql("top users", run_sql_tool, path="telepathy")
@@ -0,0 +1,56 @@
+import pytest
+
+from da_ai_agent.modules.word_match import TableNameMatcher, normalize_token, tokenize
+
+
+@pytest.mark.parametrize(
+    "plural, singular",
+    [
+        ("orders", "order"),
+        ("purchases", "purchase"),
+        ("matches", "match"),
+        ("boxes", "box"),
+        ("classes", "class"),
+        ("statuses", "status"),
+        ("categories", "category"),
+        ("companies", "company"),
+        ("movies", "movie"),
+        ("cookies", "cookie"),
+        ("series", "series"),
+        ("keys", "key"),
+        ("days", "day"),
+    ],
+)
+def test_normalize_token_plural_and_singular_share_a_stem(plural, singular):
+    assert normalize_token(plural) == normalize_token(singular)
+
+
+def test_normalize_token_keeps_short_and_non_plural_words():
+    assert normalize_token("is") == "is"
+    assert normalize_token("bus") == "bus"
+    assert normalize_token("analysis") == "analysis"
+    assert normalize_token("Status") == "status"
+
+
+def test_tokenize_splits_identifiers():
+    assert tokenize("OrderItems in user_accounts") == ["order", "item", "in", "user", "account"]
+    assert tokenize("HTTPLogs") == ["http", "log"]
+
+
+def test_matcher_matches_plural_and_singular_mentions():
+    matcher = TableNameMatcher(["movie", "product_categories", "purchases"])
+
+    assert matcher.match("top movies per product category") == ["movie", "product_categories"]
+    assert matcher.match("show each purchase") == ["purchases"]
+
+
+def test_matcher_matches_multi_token_names_in_order_of_mention():
+    matcher = TableNameMatcher(["users", "user_accounts", "OrderItems"])
+
+    assert matcher.match("orderitems for each user account") == ["OrderItems", "users", "user_accounts"]
+
+
+def test_matcher_ignores_partial_multi_token_names():
+    matcher = TableNameMatcher(["user_accounts"])
+
+    assert matcher.match("accounts of the user") == []